@@ -1,17 +1,18 @@
+import os
+import sys
 import streamlit as st
-import joblib
-import folium
 from streamlit_folium import st_folium
-import osmnx as ox
-import networkx as nx
-from networkx.algorithms.simple_paths import shortest_simple_paths
-from geopy.geocoders import Nominatim
 import pandas as pd
-import math
 from streamlit_geolocation import streamlit_geolocation
-import random
 from streamlit_autorefresh import st_autorefresh
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+import metrics
+from live_navigation import NavigationSession
+from map_render import MAP_HEIGHT, MAP_WIDTH, base_map, fit_zoom, result_key, route_layer
+from safepath_router import SafePathRouter
+from routing_client import RoutingClient
+
 st.set_page_config(page_title="🚦 SafePathAI – Route Risk Recommender", layout="wide")
 
 # CSS styling for neat UI
@@ -44,57 +45,56 @@ st.markdown('''
 ''', unsafe_allow_html=True)
 
 # Helper functions
-def to_simple_digraph(G_multi):
-    G_simple = nx.DiGraph()
-    for u, v, data in G_multi.edges(data=True):
-        length = data.get('length', 1)
-        if G_simple.has_edge(u, v):
-            if G_simple[u][v]['length'] > length:
-                G_simple[u][v].update(data)
-        else:
-            G_simple.add_edge(u, v, **data)
-    for node, data in G_multi.nodes(data=True):
-        G_simple.add_node(node, **data)
-    G_simple.graph.update(G_multi.graph)
-    return G_simple
-
-def haversine(coord1, coord2):
-    R = 6371
-    lat1, lon1 = coord1
-    lat2, lon2 = coord2
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
 def geocode_place(place):
-    try:
-        location = geolocator.geocode(place, timeout=10)
-        if location:
-            return (location.latitude, location.longitude)
-    except:
-        return None
-    return None
-
-# Fixed simulation function - removed keys=True
-def simulate_traffic(G):
-    for u, v, data in G.edges(data=True):
-        congestion = random.choices(['Low', 'Medium', 'High'], weights=[0.6, 0.3, 0.1])[0]
-        data['congestion'] = congestion
-        base_len = data.get('length', 1)
-        factor = {'Low': 1, 'Medium': 1.5, 'High': 2}[congestion]
-        data['length'] = base_len * factor
+    # Memory/gazetteer/SQLite first; Nominatim only for places never seen before
+    return router.geocode(place)
 
 @st.cache_resource(show_spinner="Loading road network and model...")
-def load_data():
-    G_multi = ox.load_graphml("chennai_drive.graphml")
-    G = to_simple_digraph(G_multi)
-    model = joblib.load("model.pkl")
-    return G, model
-
-G, model = load_data()
-geolocator = Nominatim(user_agent="route_app")
+def load_router():
+    # With SAFEPATH_SERVICE_URL set, routing runs in the headless service (src/routing_service.py);
+    # otherwise the same router is loaded in-process. One instance serves every session: its graph and
+    # weight arrays are read-only, and each request works on its own weight overlay
+    service_url = os.environ.get("SAFEPATH_SERVICE_URL")
+    if service_url:
+        return RoutingClient(service_url)
+    return SafePathRouter.load("chennai_drive.compiled", "chennai_drive.graphml", "data/accidents.csv",
+                               "model_forest.npz", "model.pkl", "geocode_cache.sqlite")
+
+@st.cache_resource
+def start_metrics():
+    # SAFEPATH_METRICS=1 enables stage timing; export via /metrics on a port and/or a rotating file
+    if os.environ.get("SAFEPATH_METRICS_PORT"):
+        metrics.serve_http(int(os.environ["SAFEPATH_METRICS_PORT"]))
+    if os.environ.get("SAFEPATH_METRICS_FILE"):
+        metrics.start_file_writer(os.environ["SAFEPATH_METRICS_FILE"])
+    return True
+
+def route_table(routes):
+    return [{
+        "Route": f"R{i+1}",
+        "Distance (km)": f"{r['distance_km']:.2f}",
+        "Congested Distance (km)": f"{r['congested_km']:.2f}",
+        "Travel Time (min)": f"{r['travel_time_min']:.1f}" if "travel_time_min" in r else "-",
+        "Congestion": r["congestion"],
+        "Accidents": r["accidents"],
+        "Turns": r.get("turns", "-"),
+        "Predicted Risk": r["risk"],
+    } for i, r in enumerate(routes)]
+
+def show_routes(routes, source_coord):
+    # Store results for session persistence
+    results = route_table(routes)
+    coord_routes = [r["coords"] for r in routes]
+    st.session_state.results_df = pd.DataFrame(results)
+    st.session_state.coord_routes = coord_routes
+    st.session_state.source_coord_saved = source_coord
+    st.session_state.colors_saved = ['#ef4444', '#f59e0b', '#10b981']
+    st.session_state.route_results = results
+    st.session_state.map_key = result_key(routes)
+    st.session_state.map_view = fit_zoom(coord_routes, MAP_WIDTH, MAP_HEIGHT)
+
+router = load_router()
+start_metrics()
 
 default_places = [
     "T Nagar, Chennai, India",
@@ -108,15 +108,13 @@ default_places = [
     "Mylapore, Chennai, India",
 ]
 
-congestion_map = {"Low": 0, "Medium": 1, "High": 2}
-time_map = {"Morning": 0, "Afternoon": 1, "Evening": 2, "Night": 3}
-
 # Initialize session state keys
-for key in ["results_df", "coord_routes", "source_coord_saved", "colors_saved", "route_results"]:
+for key in ["results_df", "coord_routes", "source_coord_saved", "colors_saved", "route_results", "timings",
+            "map_key", "map_view", "nav", "nav_target"]:
     if key not in st.session_state:
         st.session_state[key] = None
 
-st.title("🚦 SafePathAI – Route Risk Recommender with Simulated Traffic")
+st.title("🚦 SafePathAI – Route Risk Recommender with Live Traffic")
 
 # Sidebar controls with periodic refresh for live location (every 5s)
 with st.sidebar:
@@ -139,6 +137,10 @@ with st.sidebar:
         source_place = st.selectbox("📍 Source", default_places)
         source_coord = geocode_place(source_place)
 
+    # Live navigation keeps one route and only reroutes when the position leaves it
+    navigate = use_live_location and isinstance(router, SafePathRouter) and \
+        st.toggle("🧭 Live navigation (reroute only when off route)")
+
     if not use_live_location:
         destination_place = st.selectbox("🎯 Destination", [p for p in default_places if p != source_place])
     else:
@@ -151,6 +153,29 @@ with st.sidebar:
 
     generate_button = st.button("🚦 Generate Safe Routes", key="generate")
 
+    cache_stats = router.stats()["route_cache"]
+    st.caption(f"Route cache: {cache_stats['entries']} entries, "
+               f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+
+# Each refresh tick only matches the new fix against the current route (no search)
+if navigate and source_coord is not None:
+    target = (destination_place, time_of_travel)
+    if st.session_state.nav is None or st.session_state.nav_target != target:
+        destination_coord = geocode_place(destination_place)
+        if destination_coord is not None:
+            st.session_state.nav = NavigationSession(router, destination_coord, time_of_travel)
+            st.session_state.nav_target = target
+    if st.session_state.nav is not None:
+        update = st.session_state.nav.update(*source_coord)
+        if update["changed"] and update["route"] is not None:
+            show_routes([update["route"]], source_coord)
+        if update["remaining_km"] is not None:
+            st.sidebar.caption(f"🧭 {update['status'].replace('_', ' ')} · {update['remaining_km']:.2f} km to go")
+        else:
+            st.sidebar.warning("No route from the current position.")
+elif st.session_state.nav is not None:
+    st.session_state.nav = st.session_state.nav_target = None
+
 # Show results from session state if available
 if st.session_state.results_df is not None:
     df = st.session_state.results_df
@@ -164,6 +189,11 @@ if st.session_state.results_df is not None:
     best_route_id = df.loc[best_idx, "Route"]
     st.success(f"**Safest Route:** {best_route_id}")
 
+    if st.session_state.timings:
+        with st.expander("⏱️ Timing breakdown"):
+            st.dataframe(pd.DataFrame(st.session_state.timings, columns=["Stage", "ms"]).round(2),
+                         hide_index=True)
+
     tabs_labels = []
     if show_table:
         tabs_labels.append("📝 Route Table")
@@ -179,21 +209,18 @@ if st.session_state.results_df is not None:
             tab_index += 1
         if show_map:
             with tabs[tab_index if show_table else 0]:
-                map_obj = folium.Map(location=source_coord, zoom_start=13)
-                for i, coords in enumerate(coord_routes):
-                    popup = folium.Popup(f"<b>Route: R{i+1}</b><br>Distance: {results[i]['Distance (km)']} km<br>Risk: {results[i]['Predicted Risk']}", max_width=300)
-                    folium.PolyLine(coords, color=colors[i % len(colors)], weight=7, opacity=0.8, popup=popup).add_to(map_obj)
-                    folium.Marker(coords[0], popup=f"Start - R{i+1}", icon=folium.Icon(color="blue", icon="play")).add_to(map_obj)
-                    folium.Marker(coords[-1], popup=f"End - R{i+1}", icon=folium.Icon(color="red", icon="stop")).add_to(map_obj)
-                folium.LayerControl().add_to(map_obj)
-                st_folium(map_obj, width=900, height=600)
-
-# Compute routes and simulate traffic on button press
+                # Simplified route layer is built once per result; reruns (e.g. the 5s refresh) reuse it,
+                # and st_folium only pushes the layer when it changes instead of re-sending the map
+                center, zoom = st.session_state.map_view
+                popups = [f"<b>Route: R{i+1}</b><br>Distance: {r['Distance (km)']} km<br>Risk: {r['Predicted Risk']}"
+                          for i, r in enumerate(results)]
+                layer = route_layer(st.session_state.map_key, coord_routes, colors, popups, zoom)
+                st_folium(base_map(center, zoom), key="route_map", width=MAP_WIDTH, height=MAP_HEIGHT,
+                          feature_group_to_add=layer, returned_objects=[])
+
+# Compute routes on the current traffic scenario (or live congestion) on button press
 if generate_button:
-    with st.spinner("Simulating traffic, calculating safest routes..."):
-        # Simulate traffic congestion on graph edges before routing
-        simulate_traffic(G)
-
+    with st.spinner("Applying current traffic, calculating safest routes..."), metrics.trace() as request_trace:
         # Determine source coordinates from live or geocoded input
         if use_live_location:
             if source_coord is None:
@@ -210,41 +237,15 @@ if generate_button:
             st.error("Could not geocode destination.")
             st.stop()
 
-        source_node = ox.distance.nearest_nodes(G, X=source_coord[1], Y=source_coord[0])
-        dest_node = ox.distance.nearest_nodes(G, X=destination_coord[1], Y=destination_coord[0])
-
-        try:
-            path_gen = shortest_simple_paths(G, source_node, dest_node, weight='length')
-            routes = [next(path_gen) for _ in range(3)]
-            results = []
-            coord_routes = []
-
-            colors = ['#ef4444', '#f59e0b', '#10b981']
-            congestion_vals = ["Medium", "High", "Low"]
-
-            for i, path in enumerate(routes):
-                coords = [[G.nodes[n]['y'], G.nodes[n]['x']] for n in path]
-                coord_routes.append(coords)
-                dist_km = sum(haversine(coords[j], coords[j+1]) for j in range(len(coords)-1))
-                features = [dist_km, congestion_map[congestion_vals[i % len(congestion_vals)]], 0, time_map[time_of_travel]]
-                prediction = model.predict([features])[0]
-                results.append({
-                    "Route": f"R{i+1}",
-                    "Distance (km)": f"{dist_km:.2f}",
-                    "Congestion": congestion_vals[i % len(congestion_vals)],
-                    "Accidents": 0,
-                    "Predicted Risk": prediction
-                })
-
-            df = pd.DataFrame(results)
-
-            # Store results for session persistence
-            st.session_state.results_df = df
-            st.session_state.coord_routes = coord_routes
-            st.session_state.source_coord_saved = source_coord
-            st.session_state.colors_saved = colors
-            st.session_state.route_results = results
-
-            st.stop()
-        except nx.NetworkXNoPath:
+        # Snapping, the route cache and scoring all live in the router
+        with metrics.span("request_routes"):
+            response = router.alternatives(source_coord, destination_coord, time_of_travel, k=3)
+        if not response["routes"]:
             st.error("No path found between source and destination.")
+            st.stop()
+
+        show_routes(response["routes"], source_coord)
+        # Stages timed in this process, plus those reported back by the routing service
+        st.session_state.timings = request_trace.breakdown() + response.get("timings_ms", [])
+
+        st.stop()
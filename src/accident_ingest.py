@@ -0,0 +1,274 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from compiled_graph import compiled_dir, graph_stamp, load_compiled_graph
+from edge_risk import BUCKET_INDEX, RISK_RADIUS, TIME_BUCKETS, save_edge_risk, spread_risk
+
+# ---------------- CONFIG ----------------
+CHUNK_ROWS     = 200_000   # accident rows read per chunk
+HALF_LIFE_DAYS = 365.0     # an accident counts half as much after this long (0 = no decay)
+GRID_DEG       = 1e-4      # points are merged on a ~11 m grid before the spatial join
+# ----------------------------------------
+
+DAY_S = 86400.0
+LEDGER = "accident_ingest.json"
+PARTS_DIR = "accident_parts"
+
+
+def hour_bucket(hours):
+    """Time-of-day bucket index for hours 0-23 (Morning 5-12, Afternoon 12-17, Evening 17-21, Night)."""
+    hours = np.asarray(hours)
+    return np.select([(hours >= 5) & (hours < 12), (hours >= 12) & (hours < 17), (hours >= 17) & (hours < 21)],
+                     [0, 1, 2], 3)
+
+
+def epoch_seconds(stamps):
+    """Unix seconds of a datetime Series (NaN where missing), whatever its unit (ns, us, ...) or time zone."""
+    if stamps.dt.tz is not None:
+        stamps = stamps.dt.tz_convert("UTC").dt.tz_localize(None)
+    return (stamps - pd.Timestamp("1970-01-01")).dt.total_seconds().to_numpy(dtype=np.float64)
+
+
+def read_chunks(csv_path, chunk_rows=CHUNK_ROWS):
+    """Accident rows in chunks as (lat, lon, count, bucket, timestamp) arrays.
+
+    Needs latitude/longitude; accident_count defaults to 1 per row. The bucket comes
+    from time_of_day or, failing that, the hour of a timestamp/date column, which also
+    dates the row for decay (NaN = undated).
+    """
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows):
+        stamp_col = next((c for c in ("timestamp", "datetime", "date") if c in chunk.columns), None)
+        stamps = pd.to_datetime(chunk[stamp_col], errors="coerce") if stamp_col else None
+        if "time_of_day" in chunk.columns:
+            bucket = chunk["time_of_day"].map(BUCKET_INDEX).to_numpy(dtype=np.float64)
+        elif stamps is not None:
+            bucket = np.where(stamps.isna(), np.nan, hour_bucket(stamps.dt.hour.fillna(0).to_numpy()))
+        else:
+            raise ValueError(f"{csv_path} has neither a time_of_day nor a timestamp column")
+        ts = epoch_seconds(stamps) if stamps is not None else np.full(len(chunk), np.nan)
+        count = (chunk["accident_count"].to_numpy(dtype=np.float64) if "accident_count" in chunk.columns
+                 else np.ones(len(chunk)))
+        lat = chunk["latitude"].to_numpy(dtype=np.float64)
+        lon = chunk["longitude"].to_numpy(dtype=np.float64)
+        ok = np.isfinite(lat) & np.isfinite(lon) & np.isfinite(bucket) & np.isfinite(count)
+        yield lat[ok], lon[ok], count[ok], bucket[ok].astype(np.int64), ts[ok]
+
+
+def decay(age_s, half_life_days=HALF_LIFE_DAYS):
+    """Weight of an accident age_s seconds old (1 for undated or future rows)."""
+    if not half_life_days:
+        return np.ones_like(np.asarray(age_s, dtype=np.float64))
+    age = np.nan_to_num(np.asarray(age_s, dtype=np.float64), nan=0.0)
+    return np.exp2(-np.maximum(age, 0.0) / (half_life_days * DAY_S))
+
+
+def aggregate(graph, csv_path, as_of, half_life_days=HALF_LIFE_DAYS, chunk_rows=CHUNK_ROWS, grid=GRID_DEG):
+    """Read a file in chunks into its per-edge counts and the points it spreads risk from.
+
+    Returns (edges, (lat, lon, bucket, weight), rows): edges maps (bucket, edge) to the
+    accident counts decayed to as_of, each row matched to its own nearest edge; risk
+    points are merged per ~GRID_DEG cell and bucket, since accident logs repeat the same
+    junctions over and over and the radius search then only sees the distinct cells.
+    """
+    index = graph.spatial_index()
+    edges, cells = {}, {}
+    rows = 0
+    for lat, lon, count, bucket, ts in read_chunks(csv_path, chunk_rows):
+        rows += len(lat)
+        if not len(lat):
+            continue
+        weight = count * decay(as_of - ts, half_life_days)
+        # Logs geocode many rows to the same spot: snap each distinct coordinate once
+        coords, where = np.unique(np.column_stack([lat, lon]), axis=0, return_inverse=True)
+        nearest = index.nearest_edges(coords[:, 0], coords[:, 1])[0][where.ravel()]
+        for table, key in ((edges, np.column_stack([bucket, nearest])),
+                           (cells, np.column_stack([np.round(lat / grid), np.round(lon / grid), bucket]))):
+            uniq, inverse = np.unique(key.astype(np.int64), axis=0, return_inverse=True)
+            for k, w in zip(map(tuple, uniq), np.bincount(inverse.ravel(), weights=weight)):
+                table[k] = table.get(k, 0.0) + w
+    cell = np.array(list(cells), dtype=np.int64).reshape(-1, 3)
+    points = (cell[:, 0] * grid, cell[:, 1] * grid, cell[:, 2], np.fromiter(cells.values(), dtype=np.float64))
+    return edges, points, rows
+
+
+class AccidentStore:
+    """Per-edge, per-bucket accident counts/risk kept up to date file by file.
+
+    Arrays are edge_accidents.npy / edge_risk.npy next to the compiled graph, the same
+    files load_edge_risk() and EdgeRisk read. Every ingested file leaves its per-edge
+    counts and merged risk points in accident_parts/, so re-ingesting a changed file
+    subtracts its old contribution and adds the new one instead of rebuilding from
+    every log. All values
+    are stored decayed to the ledger's as_of time; moving as_of forward scales
+    everything by one factor.
+    """
+
+    def __init__(self, graph, half_life_days=HALF_LIFE_DAYS, radius=RISK_RADIUS):
+        self.graph = graph
+        self.path = graph.path
+        self.radius = radius
+        ledger = os.path.join(self.path, LEDGER)
+        self.ledger = {"as_of": None, "half_life_days": half_life_days, "generation": 0, "files": {},
+                       "graph": graph_stamp(graph)}
+        if os.path.exists(ledger):
+            with open(ledger) as f:
+                saved = json.load(f)
+            if saved.get("graph") == self.ledger["graph"]:
+                self.ledger = saved
+            else:
+                # Parts hold edge ids of the graph they were ingested on; after a recompile
+                # every file has to be snapped again
+                print(f"⚠️ {LEDGER} was written for another graph, starting over: "
+                      f"{len(saved['files'])} previously ingested files must be ingested again")
+                self.ledger["generation"] = saved.get("generation", 0)
+        self.half_life_days = self.ledger["half_life_days"]
+        self._pending = {}     # file key -> part not yet written to accident_parts/
+        shape = (len(TIME_BUCKETS), graph.num_edges)
+        self.counts = np.zeros(shape, dtype=np.float32)
+        self.risk = np.zeros(shape, dtype=np.float32)
+        if not self.ledger["files"]:
+            # Nothing ingested yet: start empty rather than on top of a CSV-built risk file
+            return
+        if self._saved_generation() == self.ledger["generation"]:
+            self.counts = np.load(os.path.join(self.path, "edge_accidents.npy")).astype(np.float32)
+            self.risk = np.load(os.path.join(self.path, "edge_risk.npy")).astype(np.float32)
+        else:
+            # A save was interrupted: the arrays may hold a run the ledger never committed
+            print("⚠️ Edge risk arrays do not match the ingest ledger, rebuilding them from accident_parts/")
+            for entry in self.ledger["files"].values():
+                with np.load(self._part_file(entry["part"])) as part:
+                    self._add(part, decay(self.ledger["as_of"] - entry["as_of"], self.half_life_days))
+
+    def _saved_generation(self):
+        meta = os.path.join(self.path, "edge_risk_meta.json")
+        if not os.path.exists(meta) or not os.path.exists(os.path.join(self.path, "edge_risk.npy")):
+            return None
+        try:
+            with open(meta) as f:
+                return json.load(f).get("generation")
+        except ValueError:
+            return None
+
+    def advance(self, as_of):
+        """Decay everything stored to a later as_of time."""
+        previous = self.ledger["as_of"]
+        if previous is not None and as_of > previous:
+            factor = np.float32(decay(as_of - previous, self.half_life_days))
+            self.counts *= factor
+            self.risk *= factor
+        if previous is None or as_of > previous:
+            self.ledger["as_of"] = as_of
+
+    def _add(self, part, scale=1.0):
+        """Add one file's contribution times scale (negative to take it back out)."""
+        np.add.at(self.counts, (part["count_bucket"], part["count_edge"]), scale * part["count"])
+        spread_risk(self.graph, part["lat"], part["lon"], scale * part["weight"], part["bucket"],
+                    self.risk, self.radius)
+
+    def _part_file(self, name):
+        return os.path.join(self.path, PARTS_DIR, name)
+
+    def ingest(self, csv_path, as_of=None, force=False):
+        """Add one accident file; a file already ingested unchanged is skipped. Returns rows read (0 if skipped).
+
+        Files are told apart by absolute path, so logs with the same name in different
+        folders are separate files.
+        """
+        key = os.path.abspath(csv_path)
+        stat = os.stat(csv_path)
+        signature = {"size": stat.st_size, "mtime": stat.st_mtime}
+        entry = self.ledger["files"].get(key)
+        if entry is not None and not force and all(entry[k] == v for k, v in signature.items()):
+            return 0
+        self.advance(time.time() if as_of is None else as_of)
+        as_of = self.ledger["as_of"]
+
+        if entry is not None:
+            # Take the file's previous contribution back out, decayed the same way as the rest
+            factor = -decay(as_of - entry["as_of"], self.half_life_days)
+            if key in self._pending:
+                self._add(self._pending[key], factor)
+            else:
+                with np.load(self._part_file(entry["part"])) as old:
+                    self._add(old, factor)
+            np.maximum(self.counts, 0, out=self.counts)
+            np.maximum(self.risk, 0, out=self.risk)
+
+        edges, (lat, lon, bucket, weight), rows = aggregate(self.graph, csv_path, as_of, self.half_life_days)
+        cells = np.array(list(edges), dtype=np.int64).reshape(-1, 2)
+        part = {"count_bucket": cells[:, 0], "count_edge": cells[:, 1],
+                "count": np.fromiter(edges.values(), dtype=np.float64, count=len(edges)),
+                "lat": lat, "lon": lon, "bucket": bucket, "weight": weight}
+        self._add(part)
+        self._pending[key] = part
+        self.ledger["files"][key] = dict(signature, as_of=as_of, rows=rows, cells=len(lat))
+        return rows
+
+    def save(self):
+        """Write parts, arrays and ledger so that a crash at any point leaves a state __init__ can recover.
+
+        New parts get new file names (old ones stay until the ledger moves on), the
+        arrays are written with their meta last and tagged with the next generation,
+        and the ledger is replaced last: it is the commit. If the arrays' generation
+        does not match the ledger on the next start, they are rebuilt from its parts.
+        """
+        generation = self.ledger.get("generation", 0) + 1
+        os.makedirs(os.path.join(self.path, PARTS_DIR), exist_ok=True)
+        for key, part in self._pending.items():
+            name = f"{hashlib.sha1(key.encode()).hexdigest()[:16]}-{generation}.npz"
+            tmp = self._part_file(name + ".tmp")
+            with open(tmp, "wb") as f:
+                np.savez(f, **part)
+            os.replace(tmp, self._part_file(name))
+            self.ledger["files"][key]["part"] = name
+
+        # Without meta the arrays count as uncommitted until the new meta lands
+        meta = os.path.join(self.path, "edge_risk_meta.json")
+        if os.path.exists(meta):
+            os.remove(meta)
+        save_edge_risk(self.counts, self.risk, self.graph, self.path,
+                       meta={"source": "ingest", "as_of": self.ledger["as_of"], "generation": generation,
+                             "half_life_days": self.half_life_days, "files": sorted(self.ledger["files"])})
+        self.ledger["generation"] = generation
+        tmp = os.path.join(self.path, LEDGER + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.ledger, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, LEDGER))
+        self._pending = {}
+
+        # Parts no committed file points to any more (replaced, or left by an interrupted run)
+        live = {entry["part"] for entry in self.ledger["files"].values()}
+        for name in os.listdir(os.path.join(self.path, PARTS_DIR)):
+            if name not in live:
+                os.remove(self._part_file(name))
+
+
+def ingest_files(graph, csv_paths, as_of=None, force=False, half_life_days=HALF_LIFE_DAYS):
+    """Ingest several accident files and save once; returns {file: rows read (0 = unchanged, skipped)}."""
+    store = AccidentStore(graph, half_life_days)
+    rows = {path: store.ingest(path, as_of, force) for path in csv_paths}
+    if any(rows.values()) or force:
+        store.save()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream accident logs onto the compiled graph's edges")
+    parser.add_argument("files", nargs="+", help="accident CSVs (latitude, longitude, time_of_day or timestamp)")
+    parser.add_argument("--compiled", default=compiled_dir)
+    parser.add_argument("--half-life", type=float, default=HALF_LIFE_DAYS, help="days; 0 disables decay")
+    parser.add_argument("--force", action="store_true", help="re-ingest files even if unchanged")
+    args = parser.parse_args()
+
+    graph = load_compiled_graph(args.compiled)
+    started = time.time()
+    rows = ingest_files(graph, args.files, force=args.force, half_life_days=args.half_life)
+    for path, n in rows.items():
+        print(f"✅ {os.path.basename(path)}: {n} rows" if n else f"⏭️ {os.path.basename(path)}: unchanged, skipped")
+    print(f"✅ Edge accident arrays in {args.compiled} updated in {time.time() - started:.1f}s")
@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+
+from shortest_path import shortest_path
+from weight_overlay import WeightOverlay
+
+# ---------------- CONFIG ----------------
+MAX_OVERLAP = 0.6    # max share of a new route's length that may overlap an accepted route
+MAX_STRETCH = 1.4    # max cost of an alternative relative to the optimal route
+PENALTY = 1.6        # weight multiplier applied to edges of every route already found
+TIME_BUDGET = 0.25   # seconds to spend looking for alternatives after the first route
+# ----------------------------------------
+
+
+def overlap_ratio(edges, other_edges, lengths):
+    """Share of a route's length (edges) that is also used by other_edges."""
+    total = lengths[edges].sum(dtype=np.float64)
+    if total <= 0:
+        return 1.0
+    shared = edges[np.isin(edges, other_edges)]
+    return float(lengths[shared].sum(dtype=np.float64) / total)
+
+
+def alternative_routes(graph, source, target, k=3, weights=None, max_overlap=MAX_OVERLAP,
+                       max_stretch=MAX_STRETCH, penalty=PENALTY, time_budget=TIME_BUDGET,
+                       max_rounds=None, first=None):
+    """Up to k diverse routes from source to target (node indices) using the penalty method.
+
+    After each search the edges of the route just found are made more expensive, so
+    the next search is pushed onto different roads. A candidate is kept only if its
+    real cost is within max_stretch of the optimum and at most max_overlap of its
+    length is shared with any route already kept. The search stops after k routes,
+    max_rounds searches or time_budget seconds, whichever comes first.
+
+    first: optional (path, cost) for the optimal route if the caller already has it.
+    Returns a list of node-index arrays, best route first. Empty if there is no path.
+    """
+    lengths = np.asarray(graph.edge_length, dtype=np.float64)
+    base = lengths if weights is None else np.asarray(weights, dtype=np.float64)
+    start = time.perf_counter()
+
+    path, best_cost = first if first is not None else shortest_path(graph, source, target, base)
+    if path is None:
+        return []
+    routes = [path]
+    kept_edges = [graph.path_edges(path)]
+    if k <= 1 or source == target:
+        return routes
+
+    # Penalties go in this request's own copy; the caller's weights are shared and never modified
+    penalized = WeightOverlay(base).multiply(kept_edges[0], penalty)
+    max_rounds = 4 * k if max_rounds is None else max_rounds
+    for _ in range(max_rounds):
+        if len(routes) >= k or time.perf_counter() - start > time_budget:
+            break
+        path, _ = shortest_path(graph, source, target, penalized.array())
+        if path is None:
+            break
+        edges = graph.path_edges(path)
+        penalized.multiply(edges, penalty)
+        cost = base[edges].sum()
+        if cost > max_stretch * best_cost:
+            continue
+        if any(overlap_ratio(edges, other, lengths) > max_overlap for other in kept_edges):
+            continue
+        routes.append(path)
+        kept_edges.append(edges)
+    return routes
@@ -0,0 +1,229 @@
+import heapq
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from compiled_graph import compiled_dir, graph_stamp, load_compiled_graph
+from shortest_path import graph_matrix
+
+# ---------------- CONFIG ----------------
+NUM_LANDMARKS = 16     # landmarks stored per metric
+ACTIVE        = 4      # landmarks used for one query (the ones with the best bound for it)
+# ----------------------------------------
+
+# Base metrics the lower bounds are computed on. Any weights >= a metric (e.g. length with
+# risk or congestion factors >= 1, profile travel times) can be searched with its bounds.
+METRICS = ("length", "travel_time")
+EARTH_RADIUS_M = 6371000.0
+
+
+def metric_weights(graph, metric):
+    return np.asarray(graph.edge_length if metric == "length" else graph.edge_travel_time, dtype=np.float64)
+
+
+def build_landmarks(graph, metric="length", k=NUM_LANDMARKS, seed=0):
+    """Farthest-point landmarks: (ids, table) with table[v] = [d(L_0, v) .. d(L_k-1, v), d(v, L_0) .. d(v, L_k-1)].
+
+    The table is node-major, so a query reads one contiguous row per node it touches.
+    """
+    weights = metric_weights(graph, metric)
+    forward, backward = graph_matrix(graph, weights), graph_matrix(graph, weights, reverse=True)
+    landmarks = []
+    # Start far from a random node, then keep adding the node farthest from all landmarks so far
+    dist = dijkstra(forward, indices=int(np.random.default_rng(seed).integers(graph.num_nodes)))
+    nearest = np.where(np.isfinite(dist), dist, -1.0)
+    table = np.empty((graph.num_nodes, 2 * k), dtype=np.float32)
+    for i in range(k):
+        landmark = int(np.argmax(nearest))
+        landmarks.append(landmark)
+        table[:, i] = dijkstra(forward, indices=landmark)
+        table[:, k + i] = dijkstra(backward, indices=landmark)
+        reach = np.minimum(table[:, i], table[:, k + i])
+        nearest = np.minimum(nearest, np.where(np.isfinite(reach), reach, np.inf))
+        nearest[landmarks] = -1.0
+    return np.array(landmarks, dtype=np.int32), table
+
+
+def save_landmarks(graph, ids, table, metric, path=None):
+    path = graph.path if path is None else path
+    np.save(os.path.join(path, f"alt_{metric}.npy"), table.astype(np.float32))
+    meta_path = os.path.join(path, "alt_meta.json")
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+    meta[metric] = {"landmarks": ids.tolist(), "graph": graph_stamp(graph)}
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def load_landmarks(graph, path=None):
+    """{metric: (num_nodes, 2K) table} stored next to the graph ({} if none were built).
+
+    Tables built for another graph (different size or source, e.g. before a
+    recompile) are skipped with a warning instead of giving wrong bounds.
+    """
+    path = graph.path if path is None else path
+    meta_path = os.path.join(path, "alt_meta.json") if path else None
+    if not meta_path or not os.path.exists(meta_path):
+        return {}
+    with open(meta_path) as f:
+        meta = json.load(f)
+    tables = {}
+    for metric in METRICS:
+        file = os.path.join(path, f"alt_{metric}.npy")
+        if metric not in meta or not os.path.exists(file):
+            continue
+        if meta[metric].get("graph") != graph_stamp(graph):
+            print(f"⚠️ {metric} landmarks in {path} were built for another graph, skipping them "
+                  f"(rebuild with: python src/astar.py {path})")
+            continue
+        tables[metric] = np.load(file, mmap_mode="r")
+    return tables
+
+
+class AStar:
+    """Point-to-point shortest paths by bidirectional A* with straight-line and ALT landmark bounds.
+
+    Both searches use the average potential p(v) = (to_t(v) - from_s(v)) / 2, which
+    keeps them consistent with each other, and stop once the two queue minimums
+    add up to the best path found. Potentials are computed only for nodes the
+    search touches, so a query costs in proportion to the nodes it settles,
+    not to the size of the graph.
+    """
+
+    def __init__(self, graph, landmarks=None):
+        self.graph = graph
+        tables = load_landmarks(graph) if landmarks is None else landmarks
+        self.landmarks = {metric: np.asarray(table, dtype=np.float32) for metric, table in tables.items()}
+        # Equirectangular meters: a plane metric, so straight-line bounds stay consistent
+        lat0 = math.radians(float(np.mean(graph.node_lat)))
+        x = np.radians(graph.node_lon) * EARTH_RADIUS_M * math.cos(lat0)
+        y = np.radians(graph.node_lat) * EARTH_RADIUS_M
+        straight = np.hypot(x[graph.edge_target] - x[graph.edge_source], y[graph.edge_target] - y[graph.edge_source])
+        ok = straight > 0
+        # Largest factor keeping factor * straight-line distance below every edge's cost
+        self.scale = {metric: float(np.min(metric_weights(graph, metric)[ok] / straight[ok])) if ok.any() else 0.0
+                      for metric in METRICS}
+        self._x, self._y = x.tolist(), y.tolist()
+        self._offset = graph.edge_offset.tolist()
+        self._target = graph.edge_target.tolist()
+        self._rev_offset = graph.rev_offset.tolist()
+        self._rev_edge = graph.rev_edge.tolist()
+        self._source = graph.edge_source.tolist()
+        self._base = {}
+
+    def _active(self, table, s, t):
+        """Landmarks giving the best lower bound for this pair."""
+        k = table.shape[1] // 2
+        with np.errstate(invalid="ignore"):
+            score = np.fmax(table[t, :k] - table[s, :k], table[s, k:] - table[t, k:])
+        score = np.where(np.isfinite(score), score, -np.inf)
+        return np.sort(np.argsort(-score)[:ACTIVE]).tolist()
+
+    def path(self, s, t, weights=None, metric="length"):
+        """(node-index path, cost) like shortest_path.shortest_path; (None, inf) if there is none.
+
+        weights must be >= the metric's base weights edge by edge (length or free-flow
+        travel time; risk and congestion multipliers >= 1 qualify), otherwise the
+        bounds would not hold.
+        """
+        s, t = int(s), int(t)
+        if weights is None:
+            if metric not in self._base:
+                self._base[metric] = metric_weights(self.graph, metric)
+            weights = self._base[metric]
+        # Read edge by edge: converting the whole array (float32 risk/profile weights) would be O(E) per query
+        weight = np.asarray(weights).item
+        if s == t:
+            return np.array([s], dtype=np.int64), 0.0
+
+        x, y, scale = self._x, self._y, self.scale[metric]
+        xs, ys, xt, yt = x[s], y[s], x[t], y[t]
+        table = self.landmarks.get(metric)
+        if table is not None:
+            k = table.shape[1] // 2
+            active = self._active(table, s, t)
+            row_s, row_t = table[s].tolist(), table[t].tolist()
+            terms = [(row_t[i], row_t[k + i], row_s[i], row_s[k + i], i, k + i) for i in active]
+        potential = {}
+
+        def p(v):
+            value = potential.get(v)
+            if value is None:
+                to_t = scale * math.hypot(x[v] - xt, y[v] - yt)
+                from_s = scale * math.hypot(x[v] - xs, y[v] - ys)
+                if table is not None:
+                    row = table[v].tolist()
+                    for lt, tl, ls, sl, i, j in terms:
+                        # d(v,t) >= d(L,t) - d(L,v) and d(v,L) - d(t,L); d(s,v) >= d(L,v) - d(L,s) and d(s,L) - d(v,L)
+                        a, b = lt - row[i], row[j] - tl
+                        if a > to_t:
+                            to_t = a
+                        if b > to_t:
+                            to_t = b
+                        a, b = row[i] - ls, sl - row[j]
+                        if a > from_s:
+                            from_s = a
+                        if b > from_s:
+                            from_s = b
+                value = potential[v] = (to_t - from_s) / 2
+            return value
+
+        dist = ({s: 0.0}, {t: 0.0})
+        parent = ({s: -1}, {t: -1})
+        heaps = ([(p(s), s)], [(-p(t), t)])
+        rows = ((self._offset, None, self._target), (self._rev_offset, self._rev_edge, self._source))
+        best, meet = math.inf, -1
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            key, u = heapq.heappop(heaps[side])
+            d = dist[side][u]
+            if key > d + (p(u) if side == 0 else -p(u)) + 1e-9:
+                continue   # stale queue entry
+            offset, edges, heads = rows[side]
+            mine, other = dist[side], dist[1 - side]
+            for slot in range(offset[u], offset[u + 1]):
+                e = edges[slot] if edges is not None else slot
+                v = heads[e]
+                nd = d + weight(e)
+                if nd < mine.get(v, math.inf):
+                    pv = p(v)
+                    if not math.isfinite(pv):
+                        # A landmark proves v is cut off from s or t
+                        continue
+                    mine[v] = nd
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (nd + (pv if side == 0 else -pv), v))
+                    if v in other and nd + other[v] < best:
+                        best, meet = nd + other[v], v
+        if meet < 0:
+            return None, math.inf
+
+        forward = [meet]
+        while parent[0][forward[-1]] >= 0:
+            forward.append(parent[0][forward[-1]])
+        backward = [meet]
+        while parent[1][backward[-1]] >= 0:
+            backward.append(parent[1][backward[-1]])
+        return np.array(forward[::-1] + backward[1:], dtype=np.int64), float(best)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else compiled_dir
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else NUM_LANDMARKS
+    graph = load_compiled_graph(path)
+    for metric in METRICS:
+        start = time.time()
+        ids, table = build_landmarks(graph, metric, k)
+        save_landmarks(graph, ids, table, metric, path)
+        print(f"✅ {k} {metric} landmarks saved to {path} ({time.time() - start:.1f}s, "
+              f"{table.nbytes / 2 ** 20:.1f} MB)")
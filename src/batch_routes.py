@@ -0,0 +1,200 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from alternatives import alternative_routes
+from compiled_graph import compiled_dir, graphml_file, load_compiled_graph, load_or_compile
+from route_store import RouteStore, RouteWriter, open_routes
+
+# ---------------- CONFIG ----------------
+input_csv  = "routes.csv"                  # origin_lat/origin_lon/dest_lat/dest_lon, source/destination names, or paths
+output_csv = "routes_with_alternative_paths.routes"   # route store
+k_routes   = 3        # alternative routes per OD pair
+CHUNK_SIZE = 500      # OD pairs per work unit (and per part file)
+WORKERS    = max(1, (os.cpu_count() or 2) - 1)
+# ----------------------------------------
+
+COORD_COLUMNS = ["origin_lat", "origin_lon", "dest_lat", "dest_lon"]
+
+# Per-worker graph: arrays are memory-mapped read-only, so all workers share one copy
+_graph = None
+
+
+def _init_worker(path):
+    global _graph
+    _graph = load_compiled_graph(path)
+
+
+def route_chunk(chunk_id, rows, source_nodes, dest_nodes, parts_dir, k=k_routes, weight="length"):
+    """Alternatives for one chunk of OD pairs, written to its own part store.
+
+    The worker writes the part itself (to a temporary directory renamed into place,
+    so a crash never leaves a half-written part); returns (chunk_id, number of routes).
+    """
+    graph = _graph
+    weights = graph.edge_travel_time if weight == "travel_time" else graph.edge_length
+    out = []
+    coords = []
+    nodes = []
+    done = {}
+    for row, s, t in zip(rows, source_nodes, dest_nodes):
+        key = (int(s), int(t))
+        # Duplicate OD pairs inside a chunk are routed once
+        if key not in done:
+            try:
+                done[key] = alternative_routes(graph, key[0], key[1], k=k, weights=weights)
+            except Exception as e:
+                print(f"⚠️ Skipping row {row}: {e}")
+                done[key] = []
+        for i, path in enumerate(done[key]):
+            edges = graph.path_edges(path)
+            out.append({
+                "row": int(row),
+                "route_id": i + 1,
+                "length_m": round(float(graph.edge_length[edges].sum(dtype=np.float64)), 2),
+                "travel_time_s": round(float(graph.edge_travel_time[edges].sum(dtype=np.float64)), 1),
+            })
+            coords.append(np.column_stack((graph.node_lat[path], graph.node_lon[path])))
+            nodes.append(graph.node_id[path])
+
+    path = part_file(parts_dir, chunk_id)
+    shutil.rmtree(path + ".tmp", ignore_errors=True)
+    with RouteWriter(path + ".tmp") as writer:
+        writer.write_many(pd.DataFrame(out, columns=["row", "route_id", "length_m", "travel_time_s"]),
+                          coords, nodes)
+    os.replace(path + ".tmp", path)
+    return chunk_id, len(out)
+
+
+def part_file(parts_dir, chunk_id):
+    return os.path.join(parts_dir, f"part-{chunk_id:06d}.routes")
+
+
+def batch_manifest(rows, source_nodes, dest_nodes, graph, k, weight, chunk_size):
+    """What the part files depend on: the snapped OD pairs, the graph and the routing options."""
+    digest = hashlib.sha1()
+    for array in (rows, source_nodes, dest_nodes):
+        digest.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+    return {"input_sha1": digest.hexdigest(), "num_nodes": int(graph.num_nodes), "num_edges": int(graph.num_edges),
+            "k": int(k), "weight": weight, "chunk_size": int(chunk_size)}
+
+
+def read_od(input_path):
+    """(input rows, OD coordinates) from a CSV or a route store."""
+    if not os.path.isdir(input_path):
+        df = pd.read_csv(input_path, nrows=1)
+        if all(c in df.columns for c in COORD_COLUMNS) or "path" not in df.columns:
+            df = pd.read_csv(input_path)
+            return df, od_coordinates(df)
+    # Routes: OD pairs are the first and last point of every path
+    store = open_routes(input_path)
+    starts, ends = store.endpoints()
+    df = store.attrs
+    return df, pd.DataFrame(np.column_stack((starts, ends)), columns=COORD_COLUMNS, index=df.index)
+
+
+def od_coordinates(df, geocoder=None):
+    """(origin_lat, origin_lon, dest_lat, dest_lon) columns, geocoding place names once each."""
+    if all(c in df.columns for c in COORD_COLUMNS):
+        return df[COORD_COLUMNS].astype(float)
+    if geocoder is None:
+        from geocoding import Geocoder, load_gazetteer
+        geocoder = Geocoder(gazetteer=load_gazetteer(compiled_dir, "data/accidents.csv"))
+    coords = geocoder.geocode_many(pd.concat([df["source"], df["destination"]]))
+    origin = df["source"].map(coords)
+    dest = df["destination"].map(coords)
+    nan = (np.nan, np.nan)
+    return pd.DataFrame({
+        "origin_lat": [(c or nan)[0] for c in origin], "origin_lon": [(c or nan)[1] for c in origin],
+        "dest_lat": [(c or nan)[0] for c in dest], "dest_lon": [(c or nan)[1] for c in dest],
+    }, index=df.index)
+
+
+def run_batch(input_path=input_csv, output_path=output_csv, compiled_path=compiled_dir, k=k_routes,
+              weight="length", chunk_size=CHUNK_SIZE, workers=WORKERS, parts_dir=None):
+    """Route every OD pair of input_path on the local compiled graph, in parallel.
+
+    Finished chunks are written to parts_dir as they complete; a rerun with the same
+    input, graph and options skips chunks whose part store already exists, so an
+    interrupted batch resumes where it stopped (parts from a different run are
+    cleared). The merged result (input columns + one row per route) is written to
+    the route store output_path, and parts_dir is removed.
+    """
+    graph = load_or_compile(graphml_file, compiled_path)
+    parts_dir = parts_dir or output_path + ".parts"
+
+    df, od = read_od(input_path)
+    ok = od.notna().all(axis=1).to_numpy()
+    if not ok.all():
+        print(f"⚠️ {int((~ok).sum())} rows without coordinates are skipped")
+    rows = np.flatnonzero(ok)
+
+    # Snap every endpoint in two vectorized calls on the prebuilt grid index
+    source_nodes = graph.nearest_nodes(od["origin_lat"].to_numpy()[rows], od["origin_lon"].to_numpy()[rows])
+    dest_nodes = graph.nearest_nodes(od["dest_lat"].to_numpy()[rows], od["dest_lon"].to_numpy()[rows])
+
+    # Resume only parts made from the same input and options
+    manifest = batch_manifest(rows, source_nodes, dest_nodes, graph, k, weight, chunk_size)
+    manifest_path = os.path.join(parts_dir, "manifest.json")
+    if os.path.isdir(parts_dir):
+        previous = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                previous = json.load(f)
+        if previous != manifest:
+            print(f"⚠️ {parts_dir} holds parts from a different input or options, starting over")
+            shutil.rmtree(parts_dir)
+    os.makedirs(parts_dir, exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    chunks = [(i, slice(start, start + chunk_size)) for i, start in enumerate(range(0, len(rows), chunk_size))]
+    todo = [(i, sl) for i, sl in chunks if not os.path.exists(part_file(parts_dir, i))]
+    print(f"📦 {len(rows)} OD pairs in {len(chunks)} chunks, {len(chunks) - len(todo)} already done")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(compiled_path,)) as pool:
+        futures = [pool.submit(route_chunk, i, rows[sl], source_nodes[sl], dest_nodes[sl], parts_dir, k, weight)
+                   for i, sl in todo]
+        for n, future in enumerate(as_completed(futures), 1):
+            chunk_id, count = future.result()
+            print(f"✅ Chunk {chunk_id + 1}/{len(chunks)}: {count} routes ({n}/{len(todo)} this run, "
+                  f"{time.perf_counter() - started:.1f}s)")
+
+    # Parts are in row order, so merging is a straight append of their flat arrays
+    inputs = df.join(od[[c for c in COORD_COLUMNS if c not in df.columns]]).reset_index(drop=True)
+    total = 0
+    with RouteWriter(output_path) as writer:
+        for i, _ in chunks:
+            part = RouteStore(part_file(parts_dir, i))
+            routes = part.attrs
+            attrs = inputs.iloc[routes["row"].to_numpy()].reset_index(drop=True)
+            if "route_id" in attrs.columns:
+                # Input already names its routes: R1 -> R1_1, R1_2, ...
+                routes = routes.assign(route_id=attrs["route_id"].astype(str) + "_" + routes["route_id"].astype(str))
+                attrs = attrs.drop(columns="route_id")
+            writer.copy_from(part, pd.concat([attrs, routes.drop(columns="row")], axis=1))
+            total += len(part)
+    shutil.rmtree(parts_dir)
+    print(f"✅ Saved {total} routes for {len(rows)} OD pairs to {output_path}")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch alternative-route generation on the compiled graph")
+    parser.add_argument("input", nargs="?", default=input_csv)
+    parser.add_argument("output", nargs="?", default=output_csv)
+    parser.add_argument("--compiled", default=compiled_dir)
+    parser.add_argument("-k", type=int, default=k_routes)
+    parser.add_argument("--weight", choices=["length", "travel_time"], default="length")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    run_batch(args.input, args.output, args.compiled, args.k, args.weight, args.chunk_size, args.workers)
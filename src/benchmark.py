@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+from alternatives import alternative_routes
+from astar import AStar, build_landmarks
+from compiled_graph import ARRAYS, CompiledGraph, compiled_dir, graphml_file, load_compiled_graph, load_or_compile
+from compiled_graph import save_compiled_graph
+from edge_risk import build_edge_risk, load_edge_risk, save_edge_risk
+from forest_inference import PackedForest, packed_file
+from shortest_path import shortest_path
+from spatial_index import build_spatial_index, save_spatial_index
+from traffic import simulate_traffic
+
+# ---------------- CONFIG ----------------
+GRID_SIZES = [50, 150]     # synthetic n x n street grids
+REPEATS    = 30            # timed calls per stage (after one warm-up call)
+SEED       = 7
+RESULTS_DIR = "benchmarks"
+REGRESSION = 1.25          # p50 slowdown that counts as a regression in --compare
+# ----------------------------------------
+
+HIGHWAYS = ["residential", "tertiary", "secondary", "primary"]
+
+
+def synthetic_grid(n, seed=SEED, oneway=0.1):
+    """n x n street grid around Chennai's latitude (~110 m blocks), as an OSMnx-like MultiDiGraph."""
+    rng = np.random.default_rng(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    ids = 10 ** 6 + np.arange(n * n)
+    rows, cols = np.divmod(np.arange(n * n), n)
+    G.add_nodes_from((int(i), {"x": 80.2 + 0.001 * c, "y": 13.0 + 0.001 * r})
+                     for i, r, c in zip(ids, rows, cols))
+    right = ids[cols < n - 1]
+    down = ids[rows < n - 1]
+    u = np.concatenate([right, down])
+    v = np.concatenate([right + 1, down + n])
+    length = rng.uniform(90, 130, len(u))
+    highway = rng.integers(len(HIGHWAYS), size=len(u))
+    both = rng.random(len(u)) > oneway
+    for a, b, w, h, two in zip(u.tolist(), v.tolist(), length.tolist(), highway.tolist(), both.tolist()):
+        G.add_edge(a, b, length=w, highway=HIGHWAYS[h])
+        if two:
+            G.add_edge(b, a, length=w, highway=HIGHWAYS[h])
+    return G
+
+
+def synthetic_accidents(graph, n=200, seed=SEED):
+    rng = np.random.default_rng(seed)
+    nodes = rng.integers(graph.num_nodes, size=n)
+    return pd.DataFrame({
+        "location": [f"P{i}" for i in range(n)],
+        "latitude": graph.node_lat[nodes] + rng.normal(0, 0.0003, n),
+        "longitude": graph.node_lon[nodes] + rng.normal(0, 0.0003, n),
+        "accident_count": rng.integers(1, 8, n),
+        "time_of_day": rng.choice(["Morning", "Afternoon", "Evening", "Night"], n),
+    })
+
+
+def measure(fn, repeats=REPEATS, items=1):
+    """Latency percentiles (ms), throughput (items/s) and peak traced memory (MB) of fn()."""
+    fn()  # warm-up: page in mapped arrays, fill lazy caches
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    ms = times * 1000
+    return {
+        "repeats": repeats,
+        "items": items,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "throughput_per_s": float(items * repeats / times.sum()),
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def _cycle(values):
+    """Callable returning the next value on every call, so repeated calls do different work."""
+    state = {"i": 0}
+
+    def next_value():
+        value = values[state["i"] % len(values)]
+        state["i"] += 1
+        return value
+    return next_value
+
+
+def bench_graph(graph, G=None, model=None, repeats=REPEATS, seed=SEED, log=print):
+    """Time every hot path on one compiled graph (G: the NetworkX source, if any)."""
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    def run(name, fn, repeats=repeats, items=1):
+        results[name] = measure(fn, repeats, items)
+        r = results[name]
+        log(f"   {name:<22} p50 {r['p50_ms']:9.3f} ms  p99 {r['p99_ms']:9.3f} ms  "
+            f"{r['throughput_per_s']:12.1f}/s  peak {r['peak_mb']:8.2f} MB")
+
+    if G is not None:
+        # Replaces the old to_simple_digraph step: NetworkX -> CSR arrays
+        run("compile_networkx", lambda: CompiledGraph.from_networkx(G), repeats=max(3, repeats // 10))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = graph.path
+        if path is None:
+            path = os.path.join(tmp, "graph.compiled")
+            save_compiled_graph({name: getattr(graph, name) for name in ARRAYS}, path)
+            graph = load_compiled_graph(path)
+            save_spatial_index(build_spatial_index(graph), path)
+            counts, risk = build_edge_risk(graph, synthetic_accidents(graph))
+            save_edge_risk(counts, risk, graph)
+
+        # Everything the app's load step does, from files on disk
+        def load_data():
+            g = load_compiled_graph(path)
+            g.spatial_index()
+            load_edge_risk(g)
+            return g
+        run("load_data", load_data, repeats=max(3, repeats // 3))
+
+        graph = load_compiled_graph(path)
+        edge_risk = load_edge_risk(graph)
+        run("build_spatial_index", lambda: build_spatial_index(graph), repeats=max(3, repeats // 10))
+        index = graph.spatial_index()
+
+        lat_lo, lon_lo, lat_hi, lon_hi = graph.node_lat.min(), graph.node_lon.min(), graph.node_lat.max(), graph.node_lon.max()
+        lats = rng.uniform(lat_lo, lat_hi, 1000)
+        lons = rng.uniform(lon_lo, lon_hi, 1000)
+        run("nearest_node", _single_snap(index, lats, lons))
+        run("nearest_nodes_1000", lambda: index.nearest_nodes(lats, lons), items=1000)
+
+        pairs = rng.integers(graph.num_nodes, size=(repeats + 2, 2))
+        next_pair = _cycle(pairs)
+        run("shortest_path", lambda: shortest_path(graph, *next_pair()))
+        engine = AStar(graph, {"length": build_landmarks(graph, "length")[1]})
+        run("astar_path", lambda: engine.path(*next_pair()))
+        # Same pairs on the router's float32 risk weights (>= length, so the length bounds hold)
+        risk_weights = edge_risk.weights(graph.edge_length, "Evening")
+        run("shortest_path_risk", lambda: shortest_path(graph, *next_pair(), risk_weights))
+        run("astar_path_risk", lambda: engine.path(*next_pair(), risk_weights))
+        # City trips of a few km, where a point-to-point search stops long before covering the graph
+        starts = pairs[:, 0]
+        ends = graph.nearest_nodes(graph.node_lat[starts] + rng.uniform(-0.015, 0.015, len(starts)),
+                                   graph.node_lon[starts] + rng.uniform(-0.015, 0.015, len(starts)))
+        next_local = _cycle(np.column_stack([starts, ends]))
+        run("shortest_path_local", lambda: shortest_path(graph, *next_local(), risk_weights))
+        run("astar_path_local", lambda: engine.path(*next_local(), risk_weights))
+        for name, speedup in astar_speedup(results).items():
+            log(f"   astar vs dijkstra ({name}): x{speedup:.2f}")
+        run("get_k_routes", lambda: alternative_routes(graph, *next_pair(), k=3))
+
+        epochs = _cycle(np.arange(repeats + 2))
+        run("simulate_traffic", lambda: simulate_traffic(graph, "Evening", epoch=int(epochs())))
+        _, traffic_weights = simulate_traffic(graph, "Evening", epoch=0)
+        run("risk_weights", lambda: edge_risk.weights(traffic_weights, "Evening"))
+
+        if model is not None:
+            serving = np.column_stack([rng.uniform(0, 30, 3), rng.integers(0, 3, 3),
+                                       rng.integers(0, 10, 3), rng.integers(0, 4, 3)])
+            bulk = np.column_stack([rng.uniform(0, 30, 10000), rng.integers(0, 3, 10000),
+                                    rng.integers(0, 10, 10000), rng.integers(0, 4, 10000)])
+            run("model_predict_3", lambda: model.predict(serving), items=3)
+            run("model_predict_10000", lambda: model.predict(bulk), repeats=max(3, repeats // 10), items=10000)
+
+            from safepath_router import SafePathRouter
+            router = SafePathRouter(graph, edge_risk, model)
+            ends = _cycle(np.column_stack([lats, lons, lats[::-1], lons[::-1]]))
+
+            def route_request():
+                a = ends()
+                # A new epoch every call, so the route cache never answers
+                return router.alternatives(a[:2], a[2:], "Evening", k=3, epoch=int(epochs()))
+            run("route_request", route_request)
+    return results
+
+
+def astar_speedup(stages):
+    """p50 of scipy's one-to-all Dijkstra over p50 of A*, per weight kind (> 1: A* is faster)."""
+    pairs = {"length": ("shortest_path", "astar_path"), "risk": ("shortest_path_risk", "astar_path_risk"),
+             "local": ("shortest_path_local", "astar_path_local")}
+    return {name: stages[dijkstra]["p50_ms"] / max(stages[astar]["p50_ms"], 1e-9)
+            for name, (dijkstra, astar) in pairs.items() if dijkstra in stages and astar in stages}
+
+
+def _single_snap(index, lats, lons):
+    point = _cycle(np.column_stack([lats, lons]))
+    return lambda: index.nearest_node(*point())
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                               text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(sizes=GRID_SIZES, repeats=REPEATS, chennai=True, model_path=packed_file):
+    model = PackedForest.load(model_path) if model_path and os.path.exists(model_path) else None
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeats": repeats,
+        "graphs": {},
+    }
+    for n in sizes:
+        G = synthetic_grid(n)
+        graph = CompiledGraph.from_networkx(G)
+        name = f"grid_{n}x{n}"
+        print(f"⏱️ {name}: {graph.num_nodes} nodes, {graph.num_edges} edges")
+        stages = bench_graph(graph, G, model, repeats)
+        report["graphs"][name] = {"num_nodes": graph.num_nodes, "num_edges": graph.num_edges,
+                                  "stages": stages, "astar_speedup": astar_speedup(stages)}
+    if chennai and (os.path.exists(os.path.join(compiled_dir, "meta.json")) or os.path.exists(graphml_file)):
+        graph = load_or_compile(graphml_file, compiled_dir)
+        print(f"⏱️ chennai: {graph.num_nodes} nodes, {graph.num_edges} edges")
+        stages = bench_graph(graph, None, model, repeats)
+        report["graphs"]["chennai"] = {"num_nodes": graph.num_nodes, "num_edges": graph.num_edges,
+                                       "stages": stages, "astar_speedup": astar_speedup(stages)}
+    report["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return report
+
+
+def compare(old, new, threshold=REGRESSION):
+    """Print p50 ratios new/old per stage; returns the list of regressed (graph, stage)."""
+    regressions = []
+    print(f"Comparing {old.get('commit')} -> {new.get('commit')} (p50, ratio > {threshold} is a regression)")
+    for graph, data in new["graphs"].items():
+        before = old.get("graphs", {}).get(graph, {}).get("stages", {})
+        for stage, r in data["stages"].items():
+            if stage not in before:
+                continue
+            ratio = r["p50_ms"] / max(before[stage]["p50_ms"], 1e-9)
+            flag = "❌" if ratio > threshold else "✅"
+            if ratio > threshold:
+                regressions.append((graph, stage))
+            print(f"{flag} {graph:<14} {stage:<22} {before[stage]['p50_ms']:9.3f} -> {r['p50_ms']:9.3f} ms "
+                  f"(x{ratio:.2f})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SafePathAI hot-path benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="*", default=GRID_SIZES, help="synthetic grid sizes")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--no-chennai", action="store_true", help="skip the bundled Chennai graph")
+    parser.add_argument("--out", default=None, help="results JSON (default: benchmarks/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.repeats, not args.no_chennai)
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {out} (max RSS {report['max_rss_mb']:.0f} MB)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
@@ -1,6 +1,5 @@
-import osmnx as ox
+from compiled_graph import load_or_compile
 
-G = ox.load_graphml("chennai_drive.graphml")
-gdf_nodes = ox.graph_to_gdfs(G, edges=False)
+G = load_or_compile("chennai_drive.graphml", "chennai_drive.compiled")
 print("Graph extent (minx, miny, maxx, maxy):")
-print(gdf_nodes.total_bounds)
+print(G.bounds())
@@ -0,0 +1,300 @@
+import json
+import os
+import sys
+import uuid
+
+import numpy as np
+
+from weight_overlay import frozen
+
+# ---------------- CONFIG ----------------
+graphml_file  = "chennai_drive.graphml"
+compiled_dir  = "chennai_drive.compiled"
+FORMAT_VERSION = 1
+# ----------------------------------------
+
+# Road classes we keep per edge (index = code stored in edge_highway)
+HIGHWAY_CLASSES = [
+    "other", "motorway", "trunk", "primary", "secondary", "tertiary",
+    "unclassified", "residential", "living_street", "service",
+    "motorway_link", "trunk_link", "primary_link", "secondary_link", "tertiary_link",
+]
+HIGHWAY_CODES = {name: code for code, name in enumerate(HIGHWAY_CLASSES)}
+
+# Fallback free-flow speeds (km/h) when the source graph has no speed_kph
+DEFAULT_SPEEDS = {
+    "motorway": 80, "trunk": 60, "primary": 50, "secondary": 40, "tertiary": 35,
+    "motorway_link": 50, "trunk_link": 40, "primary_link": 35, "secondary_link": 30,
+    "tertiary_link": 30, "unclassified": 30, "residential": 25, "living_street": 15,
+    "service": 15, "other": 25,
+}
+
+# name -> dtype of every array in a compiled graph directory
+ARRAYS = {
+    "node_id": np.int64,        # OSM node id, sorted ascending
+    "node_lat": np.float64,
+    "node_lon": np.float64,
+    "edge_offset": np.int64,    # CSR row pointer, len = num_nodes + 1
+    "edge_source": np.int32,
+    "edge_target": np.int32,
+    "edge_length": np.float32,  # meters
+    "edge_highway": np.uint8,   # index into HIGHWAY_CLASSES
+    "edge_speed_kph": np.float32,
+    "edge_travel_time": np.float32,  # seconds
+    "rev_offset": np.int64,     # reverse CSR row pointer (edges grouped by target)
+    "rev_edge": np.int32,       # forward edge ids grouped by target
+}
+
+
+def _highway_code(value):
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    return HIGHWAY_CODES.get(value, 0)
+
+
+def _to_float(value, default=np.nan):
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def arrays_from_networkx(G):
+    """Flatten a (Multi)DiGraph into CSR arrays, keeping the shortest edge between nodes."""
+    node_id = np.array(sorted(G.nodes), dtype=np.int64)
+    node_lat = np.array([float(G.nodes[n]["y"]) for n in node_id], dtype=np.float64)
+    node_lon = np.array([float(G.nodes[n]["x"]) for n in node_id], dtype=np.float64)
+
+    # Per (u, v) keep the edge with the smallest length
+    best = {}
+    for u, v, data in G.edges(data=True):
+        length = _to_float(data.get("length", 1), 1.0)
+        if (u, v) not in best or best[(u, v)][0] > length:
+            best[(u, v)] = (length, data)
+
+    keys = list(best)
+    num_edges = len(keys)
+    u_ids = np.fromiter((u for u, _ in keys), dtype=np.int64, count=num_edges)
+    v_ids = np.fromiter((v for _, v in keys), dtype=np.int64, count=num_edges)
+    source = np.searchsorted(node_id, u_ids).astype(np.int32)
+    target = np.searchsorted(node_id, v_ids).astype(np.int32)
+
+    length = np.empty(num_edges, dtype=np.float32)
+    highway = np.empty(num_edges, dtype=np.uint8)
+    speed = np.empty(num_edges, dtype=np.float32)
+    for i, key in enumerate(keys):
+        edge_length, data = best[key]
+        length[i] = edge_length
+        highway[i] = _highway_code(data.get("highway"))
+        speed[i] = _to_float(data.get("speed_kph"))
+
+    missing = np.isnan(speed)
+    if missing.any():
+        defaults = np.array([DEFAULT_SPEEDS[name] for name in HIGHWAY_CLASSES], dtype=np.float32)
+        speed[missing] = defaults[highway[missing]]
+    travel_time = length / (speed / 3.6)
+
+    # Sort edges by (source, target) so each node's out-edges are contiguous
+    order = np.lexsort((target, source))
+    source, target = source[order], target[order]
+    num_nodes = len(node_id)
+    edge_offset = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=num_nodes), out=edge_offset[1:])
+
+    rev_edge = np.lexsort((source, target)).astype(np.int32)
+    rev_offset = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(target, minlength=num_nodes), out=rev_offset[1:])
+
+    return {
+        "node_id": node_id,
+        "node_lat": node_lat,
+        "node_lon": node_lon,
+        "edge_offset": edge_offset,
+        "edge_source": source,
+        "edge_target": target,
+        "edge_length": length[order],
+        "edge_highway": highway[order],
+        "edge_speed_kph": speed[order],
+        "edge_travel_time": travel_time[order].astype(np.float32),
+        "rev_offset": rev_offset,
+        "rev_edge": rev_edge,
+    }
+
+
+def save_compiled_graph(arrays, out_dir, meta=None):
+    """Write compiled arrays as .npy files plus a meta.json describing them."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, dtype in ARRAYS.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(arrays[name], dtype=dtype))
+    info = {
+        "format_version": FORMAT_VERSION,
+        "num_nodes": int(len(arrays["node_id"])),
+        "num_edges": int(len(arrays["edge_target"])),
+        "highway_classes": HIGHWAY_CLASSES,
+        # New for every compile, so artifacts derived from an earlier one are seen as stale
+        "build_id": uuid.uuid4().hex,
+    }
+    info.update(meta or {})
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(info, f, indent=2)
+    return out_dir
+
+
+def compile_graph(graphml_path=graphml_file, out_dir=compiled_dir):
+    """One-time step: parse the GraphML once and write the compiled CSR artifact."""
+    import osmnx as ox
+
+    G = ox.load_graphml(graphml_path)
+    G = ox.add_edge_speeds(G)
+    G = ox.add_edge_travel_times(G)
+    arrays = arrays_from_networkx(G)
+    save_compiled_graph(arrays, out_dir, meta={"source": os.path.basename(graphml_path)})
+
+    # Street and place names for offline geocoding
+    from geocoding import Gazetteer, gazetteer_entries_from_networkx
+    Gazetteer(gazetteer_entries_from_networkx(G)).save(os.path.join(out_dir, "gazetteer.json"))
+
+    # The snapping index is saved with the graph so loading never rebuilds it
+    from spatial_index import build_spatial_index, save_spatial_index
+    save_spatial_index(build_spatial_index(load_compiled_graph(out_dir)), out_dir)
+    return out_dir
+
+
+class CompiledGraph:
+    """Read-only CSR road graph. Nodes and edges are addressed by dense integer indices.
+
+    Every array is a read-only view, so one instance can be shared by all sessions
+    and threads; per-request weights go in a WeightOverlay or a separate array.
+    """
+
+    def __init__(self, arrays, meta=None, path=None):
+        self.path = path
+        self.meta = meta or {}
+        for name in ARRAYS:
+            setattr(self, name, frozen(arrays[name]))
+        self.num_nodes = len(self.node_id)
+        self.num_edges = len(self.edge_target)
+        self._spatial_index = None
+
+    @classmethod
+    def from_networkx(cls, G):
+        """In-memory compile, for graphs that were never written to disk."""
+        return cls(arrays_from_networkx(G), meta={"highway_classes": HIGHWAY_CLASSES})
+
+    def node_index(self, osm_ids):
+        """Map OSM node ids to dense indices (vectorized)."""
+        osm_ids = np.asarray(osm_ids, dtype=np.int64)
+        idx = np.searchsorted(self.node_id, osm_ids)
+        idx = np.minimum(idx, self.num_nodes - 1)
+        if not np.all(self.node_id[idx] == osm_ids):
+            raise KeyError("node id not in compiled graph")
+        return idx
+
+    def out_edges(self, node):
+        return np.arange(self.edge_offset[node], self.edge_offset[node + 1])
+
+    def in_edges(self, node):
+        return self.rev_edge[self.rev_offset[node]:self.rev_offset[node + 1]]
+
+    def edge_id(self, u, v):
+        lo, hi = self.edge_offset[u], self.edge_offset[u + 1]
+        pos = lo + np.searchsorted(self.edge_target[lo:hi], v)
+        if pos >= hi or self.edge_target[pos] != v:
+            raise KeyError(f"no edge {u} -> {v}")
+        return int(pos)
+
+    def path_edges(self, path):
+        """Edge ids along a node-index path (vectorized over the path)."""
+        path = np.asarray(path, dtype=np.int64)
+        u, v = path[:-1], path[1:]
+        lo = self.edge_offset[u]
+        degree = self.edge_offset[u + 1] - lo
+        eid = np.full(len(u), -1, dtype=np.int64)
+        # Out-degree is tiny on road graphs, so scan each row slot in lock-step
+        for j in range(int(degree.max()) if len(u) else 0):
+            pos = np.minimum(lo + j, self.num_edges - 1)
+            hit = (eid < 0) & (j < degree) & (self.edge_target[pos] == v)
+            eid[hit] = pos[hit]
+        if (eid < 0).any():
+            raise KeyError("path uses an edge that is not in the graph")
+        return eid
+
+    def path_length(self, path, weights=None):
+        weights = self.edge_length if weights is None else weights
+        return float(np.sum(weights[self.path_edges(path)], dtype=np.float64))
+
+    def path_coords(self, path):
+        """[[lat, lon], ...] for a node-index path, ready for folium."""
+        path = np.asarray(path, dtype=np.int64)
+        return np.column_stack((self.node_lat[path], self.node_lon[path])).tolist()
+
+    def spatial_index(self):
+        """Grid index over node/edge coordinates, loaded from disk or built on first use."""
+        if self._spatial_index is None:
+            from spatial_index import load_spatial_index
+            self._spatial_index = load_spatial_index(self)
+        return self._spatial_index
+
+    def nearest_node(self, lat, lon):
+        return self.spatial_index().nearest_node(lat, lon)
+
+    def nearest_nodes(self, lats, lons):
+        """Nearest node index for every (lat, lon) pair in one vectorized call."""
+        return self.spatial_index().nearest_nodes(lats, lons)
+
+    def bounds(self):
+        """(minx, miny, maxx, maxy) like GeoDataFrame.total_bounds."""
+        return (float(self.node_lon.min()), float(self.node_lat.min()),
+                float(self.node_lon.max()), float(self.node_lat.max()))
+
+    def to_networkx(self):
+        """Slim nx.DiGraph (x, y, length) for code that still needs NetworkX."""
+        import networkx as nx
+
+        G = nx.DiGraph()
+        ids = self.node_id.tolist()
+        G.add_nodes_from((n, {"x": x, "y": y}) for n, x, y in
+                         zip(ids, self.node_lon.tolist(), self.node_lat.tolist()))
+        G.add_edges_from(
+            (ids[u], ids[v], {"length": w, "eid": e})
+            for e, (u, v, w) in enumerate(zip(self.edge_source.tolist(),
+                                              self.edge_target.tolist(),
+                                              self.edge_length.tolist()))
+        )
+        G.graph["crs"] = "epsg:4326"
+        return G
+
+
+def graph_stamp(graph):
+    """What an artifact derived from a graph (landmarks, CH) was built for; any other stamp means stale."""
+    return {"num_nodes": int(graph.num_nodes), "num_edges": int(graph.num_edges),
+            "source": graph.meta.get("source"), "build_id": graph.meta.get("build_id")}
+
+
+def load_compiled_graph(path=compiled_dir, mmap=True):
+    """Open a compiled graph. Arrays are numpy.memmap views, shared across processes."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} was compiled with an incompatible format, recompile it")
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode) for name in ARRAYS}
+    return CompiledGraph(arrays, meta=meta, path=path)
+
+
+def load_or_compile(graphml_path=graphml_file, path=compiled_dir):
+    """Load the compiled graph, compiling it from GraphML the first time."""
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        print(f"⚙️ Compiling {graphml_path} -> {path} (one-time)...")
+        compile_graph(graphml_path, path)
+    return load_compiled_graph(path)
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else graphml_file
+    dst = sys.argv[2] if len(sys.argv) > 2 else compiled_dir
+    compile_graph(src, dst)
+    G = load_compiled_graph(dst)
+    print(f"✅ Compiled {src} -> {dst}: {G.num_nodes} nodes, {G.num_edges} edges")
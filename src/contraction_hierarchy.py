@@ -0,0 +1,282 @@
+import heapq
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from compiled_graph import compiled_dir, graph_stamp, load_compiled_graph
+
+# ---------------- CONFIG ----------------
+HOP_LIMIT = 6           # max edges in a witness path
+SETTLE_LIMIT = 80       # max nodes a witness search may settle when contracting
+ESTIMATE_LIMIT = 15     # cheaper witness searches when only estimating node priority
+# ----------------------------------------
+
+# name -> dtype of the arrays written next to the compiled graph (as ch_<name>.npy)
+CH_ARRAYS = {
+    "rank": np.int32,
+    "up_offset": np.int64,     # per node: edges to higher-ranked nodes, forward direction
+    "up_target": np.int32,
+    "up_weight": np.float64,
+    "up_mid": np.int32,        # contracted middle node of a shortcut, -1 for a real edge
+    "down_offset": np.int64,   # per node: edges from higher-ranked nodes, stored at the head
+    "down_source": np.int32,
+    "down_weight": np.float64,
+    "down_mid": np.int32,
+}
+
+
+def _witness_search(out_adj, contracted, source, skip, targets, max_cost, settle_limit):
+    """Bounded Dijkstra from source that avoids skip. Returns distances to targets found."""
+    dist = {source: 0.0}
+    heap = [(0.0, 0, source)]
+    remaining = set(targets)
+    settled = 0
+    while heap and remaining and settled < settle_limit:
+        d, hops, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > max_cost:
+            break
+        remaining.discard(u)
+        settled += 1
+        if hops >= HOP_LIMIT:
+            continue
+        for v, (w, _) in out_adj[u].items():
+            if v == skip or contracted[v]:
+                continue
+            nd = d + w
+            if nd < dist.get(v, np.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, hops + 1, v))
+    return dist
+
+
+def _shortcuts(out_adj, in_adj, contracted, v, settle_limit=SETTLE_LIMIT):
+    """Shortcuts (u, x, weight) needed if v were contracted now."""
+    needed = []
+    outs = [(x, w) for x, (w, _) in out_adj[v].items() if not contracted[x]]
+    if not outs:
+        return needed
+    for u, (w_in, _) in in_adj[v].items():
+        if contracted[u]:
+            continue
+        max_cost = w_in + max(w for _, w in outs)
+        dist = _witness_search(out_adj, contracted, u, v, [x for x, _ in outs if x != u],
+                               max_cost, settle_limit)
+        for x, w_out in outs:
+            if x == u:
+                continue
+            via = w_in + w_out
+            if dist.get(x, np.inf) > via:
+                needed.append((u, x, via))
+    return needed
+
+
+def build_hierarchy(graph, weights=None, verbose=True):
+    """Contract every node of the compiled graph. Returns a dict of CH_ARRAYS."""
+    n = graph.num_nodes
+    weights = np.asarray(graph.edge_length if weights is None else weights, dtype=np.float64)
+    out_adj = [dict() for _ in range(n)]
+    in_adj = [dict() for _ in range(n)]
+    for u, v, w in zip(graph.edge_source.tolist(), graph.edge_target.tolist(), weights.tolist()):
+        if u != v:
+            out_adj[u][v] = (w, -1)
+            in_adj[v][u] = (w, -1)
+
+    contracted = bytearray(n)
+    deleted_neighbors = [0] * n
+
+    def priority(v):
+        degree = len(out_adj[v]) + len(in_adj[v])
+        added = len(_shortcuts(out_adj, in_adj, contracted, v, ESTIMATE_LIMIT))
+        return added - degree + deleted_neighbors[v]
+
+    heap = [(priority(v), v) for v in range(n)]
+    heapq.heapify(heap)
+    rank = np.empty(n, dtype=np.int32)
+    up = [None] * n
+    down = [None] * n
+    start = time.time()
+    order = 0
+    while heap:
+        _, v = heapq.heappop(heap)
+        if contracted[v]:
+            continue
+        # Lazy update: re-evaluate and requeue if v is no longer the cheapest node
+        p = priority(v)
+        if heap and p > heap[0][0]:
+            heapq.heappush(heap, (p, v))
+            continue
+
+        for u, x, w in _shortcuts(out_adj, in_adj, contracted, v):
+            if w < out_adj[u].get(x, (np.inf, -1))[0]:
+                out_adj[u][x] = (w, v)
+                in_adj[x][u] = (w, v)
+
+        up[v] = [(x, w, mid) for x, (w, mid) in out_adj[v].items() if not contracted[x]]
+        down[v] = [(u, w, mid) for u, (w, mid) in in_adj[v].items() if not contracted[u]]
+        for x, _, _ in up[v]:
+            del in_adj[x][v]
+            deleted_neighbors[x] += 1
+        for u, _, _ in down[v]:
+            del out_adj[u][v]
+            deleted_neighbors[u] += 1
+        out_adj[v] = {}
+        in_adj[v] = {}
+        contracted[v] = 1
+        rank[v] = order
+        order += 1
+        if verbose and order % 10000 == 0:
+            print(f"  contracted {order}/{n} nodes ({time.time() - start:.0f}s)")
+
+    arrays = {"rank": rank}
+    for prefix, rows, col in (("up", up, "target"), ("down", down, "source")):
+        counts = np.array([len(r) for r in rows], dtype=np.int64)
+        offset = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=offset[1:])
+        flat = [e for r in rows for e in r]
+        arrays[f"{prefix}_offset"] = offset
+        arrays[f"{prefix}_{col}"] = np.array([e[0] for e in flat], dtype=np.int32)
+        arrays[f"{prefix}_weight"] = np.array([e[1] for e in flat], dtype=np.float64)
+        arrays[f"{prefix}_mid"] = np.array([e[2] for e in flat], dtype=np.int32)
+    return arrays
+
+
+def save_hierarchy(arrays, graph, path=None, meta=None):
+    path = graph.path if path is None else path
+    for name, dtype in CH_ARRAYS.items():
+        np.save(os.path.join(path, f"ch_{name}.npy"), np.ascontiguousarray(arrays[name], dtype=dtype))
+    info = {"num_nodes": int(len(arrays["rank"])),
+            "num_up_edges": int(len(arrays["up_target"])),
+            "num_down_edges": int(len(arrays["down_source"])),
+            "graph": graph_stamp(graph)}
+    info.update(meta or {})
+    with open(os.path.join(path, "ch_meta.json.tmp"), "w") as f:
+        json.dump(info, f, indent=2)
+    os.replace(os.path.join(path, "ch_meta.json.tmp"), os.path.join(path, "ch_meta.json"))
+
+
+class ContractionHierarchy:
+    """Point-to-point shortest distance/path queries on a contracted graph."""
+
+    def __init__(self, arrays, meta=None):
+        self.meta = meta or {}
+        for name in CH_ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, graph, weights=None, verbose=False):
+        return cls(build_hierarchy(graph, weights, verbose=verbose))
+
+    def _search(self, s, t):
+        """Bidirectional upward Dijkstra. Returns (distance, meeting node, parents)."""
+        dist = ({s: 0.0}, {t: 0.0})
+        parent = ({s: -1}, {t: -1})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        rows = ((self.up_offset, self.up_target, self.up_weight),
+                (self.down_offset, self.down_source, self.down_weight))
+        best, meet = np.inf, -1
+        side = 0
+        while heaps[0] or heaps[1]:
+            if not heaps[side]:
+                side = 1 - side
+            d, u = heapq.heappop(heaps[side])
+            if d >= best:
+                # Nothing left in this direction can improve the answer
+                heaps[side].clear()
+                side = 1 - side
+                continue
+            if d > dist[side][u]:
+                continue
+            other = dist[1 - side].get(u)
+            if other is not None and d + other < best:
+                best, meet = d + other, u
+            offset, heads, weights = rows[side]
+            lo, hi = int(offset[u]), int(offset[u + 1])
+            for v, w in zip(heads[lo:hi].tolist(), weights[lo:hi].tolist()):
+                nd = d + w
+                if nd < dist[side].get(v, np.inf):
+                    dist[side][v] = nd
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (nd, v))
+            side = 1 - side
+        return best, meet, parent
+
+    def distance(self, s, t):
+        """Shortest distance between node indices s and t (inf if unreachable)."""
+        if s == t:
+            return 0.0
+        return float(self._search(s, t)[0])
+
+    def _mid(self, a, b):
+        if self.rank[a] < self.rank[b]:
+            lo, hi = int(self.up_offset[a]), int(self.up_offset[a + 1])
+            row = self.up_target[lo:hi].tolist()
+            return int(self.up_mid[lo + row.index(b)])
+        lo, hi = int(self.down_offset[b]), int(self.down_offset[b + 1])
+        row = self.down_source[lo:hi].tolist()
+        return int(self.down_mid[lo + row.index(a)])
+
+    def _unpack(self, a, b, out):
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            mid = self._mid(a, b)
+            if mid < 0:
+                out.append(b)
+            else:
+                stack.append((mid, b))
+                stack.append((a, mid))
+
+    def path(self, s, t):
+        """(node-index path, distance) like shortest_path.shortest_path; (None, inf) if none."""
+        if s == t:
+            return np.array([s], dtype=np.int64), 0.0
+        best, meet, parent = self._search(s, t)
+        if meet < 0:
+            return None, np.inf
+        up_chain = [meet]
+        while parent[0][up_chain[-1]] >= 0:
+            up_chain.append(parent[0][up_chain[-1]])
+        up_chain.reverse()
+        down_chain = [meet]
+        while parent[1][down_chain[-1]] >= 0:
+            down_chain.append(parent[1][down_chain[-1]])
+        chain = up_chain + down_chain[1:]
+
+        nodes = [chain[0]]
+        for a, b in zip(chain[:-1], chain[1:]):
+            self._unpack(a, b, nodes)
+        return np.array(nodes, dtype=np.int64), float(best)
+
+
+def load_hierarchy(path=compiled_dir, mmap=True, graph=None):
+    """Open the CH written by this module's preprocessing command (FileNotFoundError if missing).
+
+    The CH must have been built for graph (default: the compiled graph in path);
+    a stale one, e.g. from before a recompile, raises ValueError.
+    """
+    with open(os.path.join(path, "ch_meta.json")) as f:
+        meta = json.load(f)
+    graph = load_compiled_graph(path) if graph is None else graph
+    if meta.get("graph") != graph_stamp(graph):
+        raise ValueError(f"contraction hierarchy in {path} was built for another graph, "
+                         f"rebuild it with: python src/contraction_hierarchy.py {path}")
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(path, f"ch_{name}.npy"), mmap_mode=mode) for name in CH_ARRAYS}
+    return ContractionHierarchy(arrays, meta=meta)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else compiled_dir
+    graph = load_compiled_graph(path)
+    print(f"⚙️ Contracting {graph.num_nodes} nodes ({graph.num_edges} edges)...")
+    start = time.time()
+    arrays = build_hierarchy(graph)
+    save_hierarchy(arrays, graph, path, meta={"weight": "length", "build_seconds": round(time.time() - start, 1)})
+    print(f"✅ Saved contraction hierarchy to {path} "
+          f"({len(arrays['up_target']) + len(arrays['down_source'])} upward edges, "
+          f"{time.time() - start:.0f}s)")
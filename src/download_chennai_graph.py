@@ -1,6 +1,11 @@
 import osmnx as ox
+from compiled_graph import compile_graph
 
 # This creates a new, full driving road network for all of Chennai
 G = ox.graph_from_place('Chennai, India', network_type='drive')
 ox.save_graphml(G, 'chennai_drive.graphml')
 print("Downloaded and saved Chennai driving graph as chennai_drive.graphml")
+
+# Compile once so the app and scripts can memory-map it instead of parsing GraphML
+compile_graph('chennai_drive.graphml', 'chennai_drive.compiled')
+print("Compiled road graph to chennai_drive.compiled")
@@ -0,0 +1,148 @@
+import json
+import os
+import sys
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from compiled_graph import compiled_dir, graph_stamp, load_compiled_graph
+from weight_overlay import frozen
+
+# ---------------- CONFIG ----------------
+accidents_csv = "data/accidents.csv"
+RISK_RADIUS   = 750.0   # meters an accident hotspot spreads risk along nearby roads
+RISK_WEIGHT   = 0.3     # extra cost per unit of edge risk: cost = length * (1 + RISK_WEIGHT * risk)
+# ----------------------------------------
+
+TIME_BUCKETS = ["Morning", "Afternoon", "Evening", "Night"]
+BUCKET_INDEX = {name: i for i, name in enumerate(TIME_BUCKETS)}
+
+
+def spread_risk(graph, lat, lon, n, bucket, risk, radius=RISK_RADIUS):
+    """Add n of each point to every edge within radius of it, with a Gaussian falloff."""
+    sigma = radius / 2.0
+    point, edges, dist = graph.spatial_index().edges_within(lat, lon, radius)
+    np.add.at(risk, (bucket[point], edges), n[point] * np.exp(-0.5 * (dist / sigma) ** 2))
+    return risk
+
+
+def accumulate(graph, lat, lon, n, bucket, counts=None, risk=None, radius=RISK_RADIUS):
+    """Add weighted accident points to (counts, risk) arrays of shape (len(TIME_BUCKETS), num_edges).
+
+      counts - n of each point added to its nearest edge
+      risk   - n spread to every edge within radius with a Gaussian falloff
+    """
+    if counts is None:
+        counts = np.zeros((len(TIME_BUCKETS), graph.num_edges), dtype=np.float32)
+    if risk is None:
+        risk = np.zeros((len(TIME_BUCKETS), graph.num_edges), dtype=np.float32)
+    if len(lat) == 0:
+        return counts, risk
+    np.add.at(counts, (bucket, graph.spatial_index().nearest_edges(lat, lon)[0]), n)
+    spread_risk(graph, lat, lon, n, bucket, risk, radius)
+    return counts, risk
+
+
+def build_edge_risk(graph, accidents, radius=RISK_RADIUS):
+    """Join accident points to edges for every time-of-day bucket.
+
+    accidents: DataFrame with latitude, longitude, accident_count, time_of_day.
+    Returns (counts, risk), both float32 arrays of shape (len(TIME_BUCKETS), num_edges)
+    (see accumulate()).
+    """
+    accidents = accidents[accidents["time_of_day"].isin(BUCKET_INDEX)]
+    return accumulate(graph,
+                      accidents["latitude"].to_numpy(dtype=np.float64),
+                      accidents["longitude"].to_numpy(dtype=np.float64),
+                      accidents["accident_count"].to_numpy(dtype=np.float64),
+                      accidents["time_of_day"].map(BUCKET_INDEX).to_numpy(dtype=np.int64),
+                      radius=radius)
+
+
+def save_array(file, array):
+    """np.save through a temporary file, so processes memory-mapping the old file keep valid pages."""
+    tmp = file + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, file)
+
+
+def save_edge_risk(counts, risk, graph, path=None, meta=None):
+    path = graph.path if path is None else path
+    save_array(os.path.join(path, "edge_accidents.npy"), counts.astype(np.float32))
+    save_array(os.path.join(path, "edge_risk.npy"), risk.astype(np.float32))
+    # build_id changes on every save, so arrays derived from these (time profiles) can tell they are stale
+    info = {"time_buckets": TIME_BUCKETS, "radius": RISK_RADIUS, "graph": graph_stamp(graph),
+            "build_id": uuid.uuid4().hex}
+    info.update(meta or {})
+    tmp = os.path.join(path, "edge_risk_meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp, os.path.join(path, "edge_risk_meta.json"))
+
+
+def risk_build_id(path):
+    """build_id of the risk arrays saved in path (None if there are none)."""
+    meta = os.path.join(path, "edge_risk_meta.json")
+    if not os.path.exists(meta):
+        return None
+    with open(meta) as f:
+        return json.load(f).get("build_id")
+
+
+class EdgeRisk:
+    """Per-edge accident counts and risk for each time bucket (rows swap, nothing is copied)."""
+
+    def __init__(self, counts, risk):
+        self.counts = frozen(counts)
+        self.risk = frozen(risk)
+
+    def bucket(self, time_of_travel):
+        return BUCKET_INDEX[time_of_travel]
+
+    def weights(self, base, time_of_travel, safety=RISK_WEIGHT):
+        """Weighted combination of length (or any base weight) and risk for the router."""
+        risk = self.risk[self.bucket(time_of_travel)]
+        return np.asarray(base, dtype=np.float32) * (1.0 + np.float32(safety) * risk)
+
+
+def _fresh(graph, csv_path):
+    """Saved risk arrays exist, belong to this graph and are newer than the accident CSV they were built from.
+
+    Arrays maintained by accident_ingest.py are always current: the CSV is not their source.
+    """
+    risk = os.path.join(graph.path, "edge_risk.npy")
+    meta_path = os.path.join(graph.path, "edge_risk_meta.json")
+    if not os.path.exists(risk) or not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    # A recompile into the same folder leaves arrays sized and ordered for the old edges
+    if meta.get("graph") != graph_stamp(graph):
+        return False
+    if meta.get("source") == "ingest":
+        return True
+    return not os.path.exists(csv_path) or os.path.getmtime(risk) >= os.path.getmtime(csv_path)
+
+
+def load_edge_risk(graph, csv_path=accidents_csv):
+    """Risk arrays stored with the compiled graph; built from the accident CSV if missing or stale."""
+    path = graph.path
+    if path and _fresh(graph, csv_path):
+        return EdgeRisk(np.load(os.path.join(path, "edge_accidents.npy"), mmap_mode="r"),
+                        np.load(os.path.join(path, "edge_risk.npy"), mmap_mode="r"))
+    counts, risk = build_edge_risk(graph, pd.read_csv(csv_path))
+    if path and os.access(path, os.W_OK):
+        save_edge_risk(counts, risk, graph, path, meta={"source": os.path.basename(csv_path)})
+    return EdgeRisk(counts, risk)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else compiled_dir
+    csv_path = sys.argv[2] if len(sys.argv) > 2 else accidents_csv
+    graph = load_compiled_graph(path)
+    counts, risk = build_edge_risk(graph, pd.read_csv(csv_path))
+    save_edge_risk(counts, risk, graph, path, meta={"source": os.path.basename(csv_path)})
+    print(f"✅ Saved per-edge risk for {len(TIME_BUCKETS)} time buckets to {path} "
+          f"({int((risk > 0).any(axis=0).sum())} edges with risk)")
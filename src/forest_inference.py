@@ -0,0 +1,122 @@
+import os
+import sys
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+model_file  = "model.pkl"
+packed_file = "model_forest.npz"
+# ----------------------------------------
+
+
+def export_forest(model, path=packed_file):
+    """Flatten a fitted RandomForestClassifier into packed NumPy node arrays.
+
+    All trees are concatenated; child pointers are absolute indices into the
+    packed arrays and -1 marks a leaf. Leaf values are stored as the per-tree
+    class probabilities sklearn's predict_proba uses.
+    """
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaf = tree.children_left == -1
+        roots.append(offset)
+        feature.append(np.where(leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        left.append(np.where(leaf, -1, tree.children_left + offset))
+        right.append(np.where(leaf, -1, tree.children_right + offset))
+        proba = tree.value[:, 0, :].astype(np.float64)
+        normalizer = proba.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(proba / normalizer[:, None])
+        offset += tree.node_count
+
+    np.savez(
+        path,
+        feature=np.concatenate(feature).astype(np.int32),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        left=np.concatenate(left).astype(np.int32),
+        right=np.concatenate(right).astype(np.int32),
+        value=np.concatenate(value),
+        roots=np.array(roots, dtype=np.int32),
+        classes=np.asarray(model.classes_).astype(str),
+        n_features=np.int32(model.n_features_in_),
+    )
+    return path
+
+
+class PackedForest:
+    """sklearn-free RandomForest inference; predict() matches model.predict exactly."""
+
+    def __init__(self, arrays):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = arrays["classes"]
+        self.n_features_in_ = int(arrays["n_features"])
+
+    @classmethod
+    def load(cls, path=packed_file):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def apply(self, X):
+        """Leaf index reached in every tree: shape (n_rows, n_trees)."""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"expected rows of {self.n_features_in_} features, got shape {X.shape}")
+        rows = np.arange(len(X))[:, None]
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        active = self.left[node] >= 0
+        while active.any():
+            r, t = np.nonzero(active)
+            n = node[r, t]
+            go_left = X[rows[r, 0], self.feature[n]] <= self.threshold[n]
+            node[r, t] = np.where(go_left, self.left[n], self.right[n])
+            active[r, t] = self.left[node[r, t]] >= 0
+        return node
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        proba = np.zeros((len(leaves), self.value.shape[1]), dtype=np.float64)
+        # Accumulate tree by tree, in the same order and precision as sklearn
+        for t in range(leaves.shape[1]):
+            proba += self.value[leaves[:, t]]
+        proba /= leaves.shape[1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def load_risk_model(packed_path=packed_file, pickle_path=model_file):
+    """Packed forest, exported from the joblib model the first time it is needed."""
+    stale = os.path.exists(pickle_path) and (
+        not os.path.exists(packed_path) or os.path.getmtime(packed_path) < os.path.getmtime(pickle_path))
+    if stale:
+        import joblib
+        export_forest(joblib.load(pickle_path), packed_path)
+    return PackedForest.load(packed_path)
+
+
+if __name__ == "__main__":
+    import joblib
+
+    src = sys.argv[1] if len(sys.argv) > 1 else model_file
+    dst = sys.argv[2] if len(sys.argv) > 2 else packed_file
+    model = joblib.load(src)
+    export_forest(model, dst)
+    forest = PackedForest.load(dst)
+
+    # Check on random feature rows spanning the training ranges
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(0, 30, 10000), rng.integers(0, 3, 10000),
+                         rng.integers(0, 10, 10000), rng.integers(0, 4, 10000)])
+    mismatches = int(np.sum(forest.predict(X) != model.predict(X)))
+    print(f"✅ Exported {len(forest.roots)} trees ({len(forest.feature)} nodes) to {dst}; "
+          f"{mismatches} mismatches vs model.predict on 10000 rows")
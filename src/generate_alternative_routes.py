@@ -1,30 +1,25 @@
 import pandas as pd
-import osmnx as ox
-import networkx as nx
-from geopy.geocoders import Nominatim
 import folium
-from itertools import islice
+from alternatives import alternative_routes
+from subgraph import graph_from_bbox
+from geocoding import Geocoder, load_gazetteer
 
 # Load CSV
 df = pd.read_csv("routes.csv")  # Make sure columns: 'source', 'destination'
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="safe_path_ai")
+# Initialize geocoder (persistent cache + offline gazetteer)
+geocoder = Geocoder(gazetteer=load_gazetteer(places_csv="accidents.csv"), user_agent="safe_path_ai")
 
 # Geocode unique locations
 locations = pd.concat([df['source'], df['destination']]).unique()
 location_coords = {}
 
-for loc in locations:
-    try:
-        loc_obj = geolocator.geocode(loc)
-        if loc_obj:
-            location_coords[loc] = (loc_obj.latitude, loc_obj.longitude)
-            print(f"Geocoded '{loc}' to {location_coords[loc]}")
-        else:
-            print(f"Could not geocode '{loc}'")
-    except Exception as e:
-        print(f"Error geocoding '{loc}': {e}")
+for loc, coord in geocoder.geocode_many(locations).items():
+    if coord:
+        location_coords[loc] = coord
+        print(f"Geocoded '{loc}' to {location_coords[loc]}")
+    else:
+        print(f"Could not geocode '{loc}'")
 
 # Define bounding box
 lats = [lat for lat, lon in location_coords.values()]
@@ -32,19 +27,16 @@ lons = [lon for lat, lon in location_coords.values()]
 north, south = max(lats) + 0.01, min(lats) - 0.01
 east, west = max(lons) + 0.01, min(lons) - 0.01
 
-# Download graph using keyword arguments (correct for OSMnx 2.0.6)
-print("📥 Downloading graph...")
-G = ox.graph_from_bbox(north=north, south=south, east=east, west=west, network_type='drive')
-G = ox.add_edge_speeds(G)
-G = ox.add_edge_travel_times(G)
+# Extract the area from the local compiled graph (speeds/travel times are precompiled)
+print("✂️ Extracting graph...")
+graph = graph_from_bbox(north, south, east, west)
 
-# Function for k-shortest paths
-def k_shortest_paths(G, orig_node, dest_node, k=3, weight='travel_time'):
-    try:
-        return list(islice(nx.shortest_simple_paths(G, orig_node, dest_node, weight=weight), k))
-    except nx.NetworkXNoPath:
+# Function for k diverse alternative paths (by travel time)
+def k_shortest_paths(graph, orig_node, dest_node, k=3):
+    paths = alternative_routes(graph, orig_node, dest_node, k=k, weights=graph.edge_travel_time)
+    if not paths:
         print(f"No path between {orig_node} and {dest_node}")
-        return []
+    return paths
 
 # Create folium map
 m = folium.Map(location=list(location_coords.values())[0], zoom_start=12)
@@ -54,14 +46,14 @@ for _, row in df.iterrows():
     source = row['source']
     dest = row['destination']
 
-    orig_node = ox.nearest_nodes(G, X=location_coords[source][1], Y=location_coords[source][0])
-    dest_node = ox.nearest_nodes(G, X=location_coords[dest][1], Y=location_coords[dest][0])
+    orig_node = graph.nearest_node(*location_coords[source])
+    dest_node = graph.nearest_node(*location_coords[dest])
 
-    paths = k_shortest_paths(G, orig_node, dest_node, k=3)
+    paths = k_shortest_paths(graph, orig_node, dest_node, k=3)
     colors = ['blue', 'green', 'red']
 
     for i, path in enumerate(paths):
-        route_coords = [(G.nodes[n]['y'], G.nodes[n]['x']) for n in path]
+        route_coords = [tuple(c) for c in graph.path_coords(path)]
         folium.PolyLine(route_coords, color=colors[i % len(colors)], weight=5, opacity=0.7).add_to(m)
 
 # Save map
@@ -1,44 +1,32 @@
-import osmnx as ox
-import networkx as nx
 import pandas as pd
+from alternatives import alternative_routes
+from subgraph import graph_from_point
 
 # ---------------- CONFIG ----------------
 # Replace with YOUR chosen coordinates (lat, lon)
 origin_point = (13.0827, 80.2707)   # Chennai Central
 destination_point = (13.0358, 80.2444)  # Guindy
-dist = 3000      # meters radius around origin to download
+dist = 3000      # meters around origin to extract from the local graph
 k = 3            # number of alternative routes to generate
 output_file = "routes_dataset.csv"
 # ----------------------------------------
 
-print("📥 Downloading graph...")
-G = ox.graph_from_point(origin_point, dist=dist, network_type="drive")
-print("✅ Graph downloaded.")
-
-# Convert MultiDiGraph to a simple weighted DiGraph
-# Keeps only the shortest edge between nodes (weight = length)
-G_simple = nx.DiGraph()
-for u, v, data in G.edges(data=True):
-    w = data.get("length", 1)
-    if G_simple.has_edge(u, v):
-        if w < G_simple[u][v]["weight"]:
-            G_simple[u][v]["weight"] = w
-    else:
-        G_simple.add_edge(u, v, weight=w)
+# Cut the area out of the local compiled graph (no download)
+graph = graph_from_point(origin_point, dist=dist)
+print(f"✅ Extracted {graph.num_nodes} nodes, {graph.num_edges} edges.")
 
 # Find nearest nodes to origin/destination
-orig_node = ox.distance.nearest_nodes(G, origin_point[1], origin_point[0])
-dest_node = ox.distance.nearest_nodes(G, destination_point[1], destination_point[0])
-print(f"Origin node: {orig_node}, Destination node: {dest_node}")
+source, target = graph.nearest_nodes([origin_point[0], destination_point[0]],
+                                     [origin_point[1], destination_point[1]])
+print(f"Origin node: {graph.node_id[source]}, Destination node: {graph.node_id[target]}")
 
-# Generate k shortest simple paths
+# Generate k diverse alternative routes
 routes = []
-for i, path in enumerate(
-    list(nx.shortest_simple_paths(G_simple, orig_node, dest_node, weight="weight"))[:k]
-):
-    length = nx.path_weight(G_simple, path, weight="weight")
-    coords = [(G.nodes[n]["y"], G.nodes[n]["x"]) for n in path]
-    routes.append({"route_id": i + 1, "length_m": round(length, 2), "nodes": path, "coords": coords})
+for i, path in enumerate(alternative_routes(graph, source, target, k=k)):
+    length = graph.path_length(path)
+    coords = [tuple(c) for c in graph.path_coords(path)]
+    routes.append({"route_id": i + 1, "length_m": round(length, 2),
+                   "nodes": graph.node_id[path].tolist(), "coords": coords})
 
 # Save dataset
 pd.DataFrame(routes).to_csv(output_file, index=False)
@@ -1,31 +1,22 @@
 import pandas as pd
-import osmnx as ox
-import networkx as nx
-from geopy.geocoders import Nominatim
 from sklearn.cluster import DBSCAN
 import numpy as np
+from alternatives import alternative_routes
+from subgraph import bidirectional, graph_from_bbox
+from geocoding import Geocoder, load_gazetteer
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="route_app")
+# Initialize geocoder (persistent cache + offline gazetteer)
+geocoder = Geocoder(gazetteer=load_gazetteer(places_csv="accidents.csv"), user_agent="route_app")
 
 # Read your CSV
 df = pd.read_csv("routes.csv")
 
-# Geocode addresses to lat/lon
-def geocode_place(place):
-    try:
-        location = geolocator.geocode(place, timeout=10)
-        if location:
-            return (location.latitude, location.longitude)
-        else:
-            return None
-    except Exception as e:
-        print(f"Geocoding error for {place}: {e}")
-        return None
+# Geocode every distinct place once
+coords_by_place = geocoder.geocode_many(pd.concat([df['source'], df['destination']]))
 
 # Add lat/lon columns for source and destination
-df['source_coords'] = df['source'].apply(geocode_place)
-df['destination_coords'] = df['destination'].apply(geocode_place)
+df['source_coords'] = df['source'].map(coords_by_place)
+df['destination_coords'] = df['destination'].map(coords_by_place)
 
 # Drop rows that could not be geocoded
 df = df.dropna(subset=['source_coords', 'destination_coords'])
@@ -46,17 +37,16 @@ def get_cluster_label(coord):
 df['cluster'] = df['source_coords'].apply(get_cluster_label)
 
 def nearest_node(G, coord):
-    return ox.distance.nearest_nodes(G, X=coord[1], Y=coord[0])
+    return G.nearest_node(coord[0], coord[1])
 
-def k_shortest_paths(G, source_coord, dest_coord, k=3, weight='length'):
+def k_shortest_paths(G, source_coord, dest_coord, k=3, weights=None):
     source_node = nearest_node(G, source_coord)
     dest_node = nearest_node(G, dest_coord)
     try:
-        paths = list(nx.shortest_simple_paths(G, source_node, dest_node, weight=weight))
-        paths = paths[:k]
+        paths = alternative_routes(G, source_node, dest_node, k=k, weights=weights)
         coords_paths = []
         for path in paths:
-            coords = [(G.nodes[n]['y'], G.nodes[n]['x']) for n in path]
+            coords = [tuple(c) for c in G.path_coords(path)]
             coords_paths.append(coords)
         return coords_paths
     except Exception as e:
@@ -77,9 +67,9 @@ for cluster_label, group in df.groupby('cluster'):
 
     print(f"Processing cluster {cluster_label} with {len(group)} routes, bbox={bbox}")
 
-    # Download graph for this cluster
-    G = ox.graph_from_bbox(bbox=bbox, network_type='drive', simplify=True)
-    G_undir = G.to_undirected()
+    # Extract this cluster from the local graph (cached, no download)
+    # Undirected routing: both directions of every road
+    G_undir = bidirectional(graph_from_bbox(*bbox))
 
     for idx, row in group.iterrows():
         routes = k_shortest_paths(G_undir, row['source_coords'], row['destination_coords'], k=3)
@@ -1,91 +1,66 @@
-import pandas as pd
-import osmnx as ox
-import networkx as nx
+import numpy as np
+from astar import AStar, build_landmarks
+from route_store import open_routes, write_routes
+from subgraph import graph_from_point
 
 # ------------------------------
-# Load CSV
+# Load routes (CSV is converted to a route store once)
 # ------------------------------
-df = pd.read_csv("routes_with_paths.csv")
-
-# ------------------------------
-# Helper: convert MultiDiGraph -> DiGraph
-# ------------------------------
-def convert_to_digraph(G):
-    """Convert MultiDiGraph to DiGraph keeping shortest edge between nodes."""
-    if isinstance(G, nx.DiGraph):
-        return G
-    G_simple = nx.DiGraph()
-    G_simple.graph.update(G.graph)  # preserve attributes
-    for u, v, data in G.edges(data=True):
-        w = data.get("length", 1)
-        if G_simple.has_edge(u, v):
-            if w < G_simple[u][v]["length"]:
-                G_simple[u][v]["length"] = w
-        else:
-            G_simple.add_edge(u, v, **data)
-    return G_simple
+store = open_routes("routes_with_paths.csv")
+df = store.attrs
 
 # ------------------------------
 # Function: get shortest route
 # ------------------------------
-def get_shortest_route(G, start_lat, start_lon, end_lat, end_lon):
-    try:
-        orig = ox.distance.nearest_nodes(G, X=start_lon, Y=start_lat)
-        dest = ox.distance.nearest_nodes(G, X=end_lon, Y=end_lat)
-        path = nx.shortest_path(G, orig, dest, weight="length")
-        coords = [(G.nodes[n]["y"], G.nodes[n]["x"]) for n in path]
-        return coords
-    except Exception as e:
+def get_shortest_route(engine, orig, dest):
+    path, _ = engine.path(orig, dest)
+    if path is None:
         return None
+    return engine.graph.path_coords(path)
 
 # ------------------------------
 # Determine graph area (bounding box)
 # ------------------------------
-all_coords = [eval(row["path"]) for _, row in df.iterrows()]
-lats = [lat for path in all_coords for lat, lon in path]
-lons = [lon for path in all_coords for lat, lon in path]
-center_lat = sum(lats)/len(lats)
-center_lon = sum(lons)/len(lons)
-max_dist = max(
-    max(abs(lat - center_lat) for lat in lats),
-    max(abs(lon - center_lon) for lon in lons)
-) * 111000 + 500  # meters
+points = np.concatenate(store.all_coords())
+center_lat, center_lon = points.mean(axis=0)
+max_dist = float(np.abs(points - (center_lat, center_lon)).max()) * 111000 + 500  # meters
 
 # ------------------------------
-# Download graph once
+# Extract graph once from the local compiled graph
 # ------------------------------
-print("📥 Downloading graph...")
-G = ox.graph_from_point((center_lat, center_lon), dist=max_dist, network_type="drive")
-G = convert_to_digraph(G)
-print("✅ Graph downloaded and converted to DiGraph.")
+graph = graph_from_point((center_lat, center_lon), dist=max_dist)
+print(f"✅ Extracted {graph.num_nodes} nodes, {graph.num_edges} edges.")
+# The extract lives in memory only, so its ALT landmarks are built here once (2 x 16
+# one-to-all searches) and every row then runs a goal-directed point-to-point search
+engine = AStar(graph, {"length": build_landmarks(graph, "length")[1]})
+
+# Snap every start and end point in two vectorized lookups
+starts, ends = store.endpoints()
+orig_nodes = graph.nearest_nodes(starts[:, 0], starts[:, 1])
+dest_nodes = graph.nearest_nodes(ends[:, 0], ends[:, 1])
 
 # ------------------------------
 # Generate shortest route for all rows
 # ------------------------------
 new_rows = []
+new_paths = []
 
-for _, row in df.iterrows():
+for i, (_, row) in enumerate(df.iterrows()):
     try:
-        old_path = eval(row["path"])
-        start_lat, start_lon = old_path[0]
-        end_lat, end_lon = old_path[-1]
-
-        coords = get_shortest_route(G, start_lat, start_lon, end_lat, end_lon)
+        coords = get_shortest_route(engine, orig_nodes[i], dest_nodes[i])
         if coords is None:
             print(f"⚠️ Could not generate route for {row['route_id']}")
             continue
 
-        new_row = row.copy()
-        new_row["path"] = str(coords)
-        new_rows.append(new_row)
+        new_rows.append(i)
+        new_paths.append(coords)
         print(f"✅ Generated route for {row['route_id']}")
 
     except Exception as e:
         print(f"⚠️ Error for {row['route_id']}: {e}")
 
 # ------------------------------
-# Save new CSV
+# Save new route store
 # ------------------------------
-df_new = pd.DataFrame(new_rows)
-df_new.to_csv("routes_with_paths_real.csv", index=False)
-print("🎯 New CSV saved as routes_with_paths_real.csv")
+write_routes("routes_with_paths_real.routes", df.iloc[new_rows], new_paths)
+print("🎯 New routes saved as routes_with_paths_real.routes")
@@ -0,0 +1,215 @@
+import bisect
+import difflib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+cache_file     = "geocode_cache.sqlite"
+CACHE_TTL      = 30 * 24 * 3600   # seconds a successful lookup stays valid
+NEGATIVE_TTL   = 24 * 3600        # seconds a failed lookup is remembered
+MAX_ENTRIES    = 50000            # on-disk LRU size
+MEMORY_ENTRIES = 1024             # in-process LRU size
+# ----------------------------------------
+
+# Words that do not help telling places apart inside one city
+STOP_WORDS = {"chennai", "india", "tamil", "nadu", "tamilnadu"}
+
+
+def normalize(place):
+    """'T Nagar, Chennai, India' -> 't nagar'."""
+    words = re.sub(r"[^0-9a-z]+", " ", str(place).lower()).split()
+    return " ".join(w for w in words if w not in STOP_WORDS)
+
+
+class GeocodeCache:
+    """Persistent SQLite cache with TTL expiry and least-recently-used eviction."""
+
+    def __init__(self, path=cache_file, ttl=CACHE_TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS geocode ("
+                       "query TEXT PRIMARY KEY, lat REAL, lon REAL, created REAL, last_used REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, query):
+        """(found, coord): found is False on a miss; coord is None for a cached failure."""
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT lat, lon, created FROM geocode WHERE query = ?", (query,)).fetchone()
+            if row is None:
+                return False, None
+            lat, lon, created = row
+            ttl = self.ttl if lat is not None else self.negative_ttl
+            if now - created > ttl:
+                db.execute("DELETE FROM geocode WHERE query = ?", (query,))
+                return False, None
+            db.execute("UPDATE geocode SET last_used = ? WHERE query = ?", (now, query))
+        return True, (lat, lon) if lat is not None else None
+
+    def put(self, query, coord):
+        now = time.time()
+        lat, lon = coord if coord is not None else (None, None)
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)", (query, lat, lon, now, now))
+            excess = db.execute("SELECT COUNT(*) FROM geocode").fetchone()[0] - self.max_entries
+            if excess > 0:
+                db.execute("DELETE FROM geocode WHERE query IN "
+                           "(SELECT query FROM geocode ORDER BY last_used LIMIT ?)", (excess,))
+
+
+class Gazetteer:
+    """Offline name -> (lat, lon) table with exact, prefix and fuzzy lookup."""
+
+    def __init__(self, entries=()):
+        table = {}
+        for name, lat, lon in entries:
+            key = normalize(name)
+            if key and key not in table:
+                table[key] = (float(lat), float(lon))
+        self.table = table
+        self.keys = sorted(table)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def exact(self, place):
+        return self.table.get(normalize(place))
+
+    def prefix(self, place, limit=5):
+        key = normalize(place)
+        i = bisect.bisect_left(self.keys, key)
+        out = []
+        while i < len(self.keys) and self.keys[i].startswith(key) and len(out) < limit:
+            out.append(self.keys[i])
+            i += 1
+        return out
+
+    def lookup(self, place, fuzzy=True, cutoff=0.85):
+        """Exact match, then the shortest name with this prefix, then the closest fuzzy match."""
+        key = normalize(place)
+        if not key:
+            return None
+        if key in self.table:
+            return self.table[key]
+        matches = self.prefix(key)
+        if matches:
+            return self.table[min(matches, key=len)]
+        if fuzzy:
+            close = difflib.get_close_matches(key, self.keys, n=1, cutoff=cutoff)
+            if close:
+                return self.table[close[0]]
+        return None
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump([[k, lat, lon] for k, (lat, lon) in self.table.items()], f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+
+def gazetteer_entries_from_networkx(G):
+    """Named nodes plus one point per street name (midpoint of its edges)."""
+    entries = [(d["name"], d["y"], d["x"]) for _, d in G.nodes(data=True) if isinstance(d.get("name"), str)]
+    streets = {}
+    for u, v, d in G.edges(data=True):
+        names = d.get("name")
+        for name in names if isinstance(names, list) else [names]:
+            if isinstance(name, str):
+                streets.setdefault(name, []).append(u)
+                streets[name].append(v)
+    for name, nodes in streets.items():
+        lat = np.mean([G.nodes[n]["y"] for n in nodes])
+        lon = np.mean([G.nodes[n]["x"] for n in nodes])
+        entries.append((name, lat, lon))
+    return entries
+
+
+def load_gazetteer(compiled_path=None, places_csv=None):
+    """Gazetteer from the compiled graph (gazetteer.json) plus any CSV with location/latitude/longitude."""
+    entries = []
+    if places_csv and os.path.exists(places_csv):
+        import pandas as pd
+        df = pd.read_csv(places_csv).drop_duplicates("location")
+        entries += list(zip(df["location"], df["latitude"], df["longitude"]))
+    path = os.path.join(compiled_path, "gazetteer.json") if compiled_path else None
+    if path and os.path.exists(path):
+        with open(path) as f:
+            entries += json.load(f)
+    return Gazetteer(entries)
+
+
+class Geocoder:
+    """Memory LRU -> gazetteer exact -> SQLite cache -> Nominatim -> gazetteer prefix/fuzzy."""
+
+    def __init__(self, cache=None, gazetteer=None, user_agent="route_app", timeout=10, offline=False):
+        self.cache = cache if cache is not None else GeocodeCache()
+        self.gazetteer = gazetteer if gazetteer is not None else Gazetteer()
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.offline = offline
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._remote = None
+
+    def _remember(self, place, coord):
+        with self._lock:
+            self._memory[place] = coord
+            self._memory.move_to_end(place)
+            while len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _geocode_remote(self, place):
+        if self._remote is None:
+            from geopy.geocoders import Nominatim
+            self._remote = Nominatim(user_agent=self.user_agent)
+        location = self._remote.geocode(place, timeout=self.timeout)
+        return (location.latitude, location.longitude) if location else None
+
+    def geocode(self, place):
+        """(lat, lon) for a place name, or None."""
+        with self._lock:
+            if place in self._memory:
+                self._memory.move_to_end(place)
+                return self._memory[place]
+
+        coord = self.gazetteer.exact(place)
+        if coord is None:
+            found, coord = self.cache.get(place)
+            if not found:
+                coord = None
+                remote_failed = False
+                if not self.offline:
+                    try:
+                        coord = self._geocode_remote(place)
+                    except Exception as e:
+                        print(f"Geocoding error for {place}: {e}")
+                        remote_failed = True
+                if coord is None:
+                    coord = self.gazetteer.lookup(place)
+                # Network errors are not cached (on disk or in memory), so the next call can retry
+                if remote_failed:
+                    return coord
+                if not self.offline:
+                    self.cache.put(place, coord)
+        self._remember(place, coord)
+        return coord
+
+    def geocode_many(self, places):
+        """{place: (lat, lon) or None}, looking each distinct place up once."""
+        return {place: self.geocode(place) for place in dict.fromkeys(places)}
@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+
+from shortest_path import path_from_tree, shortest_path_tree
+from traffic import current_epoch
+
+# ---------------- CONFIG ----------------
+CORRIDOR_M   = 40.0    # a GPS fix farther than this from the route has left it
+MATCH_WINDOW = 25      # route segments checked ahead of the last match on every fix
+REFRESH_M    = 5000.0  # rebuild the tree after driving this far, so it follows the traffic
+# ----------------------------------------
+
+M_PER_DEG_LAT = 111320.0
+
+
+class NavigationSession:
+    """Live navigation from a moving GPS position to one destination.
+
+    Keeps the current route and a reverse shortest-path tree rooted at the
+    destination. Each fix is matched against a small window of the route, so a
+    tick costs the same however long the trip is. Off the corridor the new route
+    is read off the tree from the nearest node (no search); the tree itself is
+    rebuilt only at the start, after REFRESH_M of driving, or if the driver ends
+    up somewhere the tree cannot reach the destination from.
+    """
+
+    def __init__(self, router, destination, time_of_travel="Morning", corridor_m=CORRIDOR_M,
+                 window=MATCH_WINDOW, refresh_m=REFRESH_M):
+        self.router = router
+        self.graph = router.graph
+        self.time_of_travel = time_of_travel
+        self.corridor_m = corridor_m
+        self.window = window
+        self.refresh_m = refresh_m
+        self.dest_node = int(self.graph.nearest_nodes([destination[0]], [destination[1]])[0])
+        self.route = None
+        self.pred = None
+        self.pos = 0                 # segment of the route the last fix matched
+        self.along_m = 0.0           # meters along the route at the last fix
+        self.driven_m = 0.0          # meters driven since the tree was built
+        self.reroutes = 0
+        self.refreshes = 0
+
+    def _build_tree(self):
+        router = self.router
+        traffic = router.live_traffic.snapshot()[:2] if router.live_traffic is not None else None
+        self._levels, self._traffic_weights, weights = router.search_weights(
+            self.time_of_travel, current_epoch(), traffic)
+        # Distances/next hops of every node towards the destination in one reverse search
+        self.dist, self.pred = shortest_path_tree(self.graph, self.dest_node, weights, reverse=True)
+        self.driven_m = 0.0
+        self.refreshes += 1
+
+    def _follow(self, node):
+        """Take the tree path from node as the current route; False if node cannot reach the destination."""
+        path = path_from_tree(self.pred, self.dest_node, node, reverse=True)
+        if path is None:
+            return False
+        self.route = self.router.describe([path], self.time_of_travel, self._levels, self._traffic_weights)[0]
+        coords = np.asarray(self.route["coords"], dtype=np.float64)
+        self._lat0 = coords[0, 0]
+        self._xy = self._project(coords[:, 0], coords[:, 1])
+        seg = np.diff(self._xy, axis=0)
+        self._seg_len = np.hypot(seg[:, 0], seg[:, 1])
+        self._cum = np.concatenate([[0.0], np.cumsum(self._seg_len)])
+        self.pos = 0
+        self.along_m = 0.0
+        return True
+
+    def _project(self, lat, lon):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        return np.column_stack([lon * M_PER_DEG_LAT * math.cos(math.radians(self._lat0)), lat * M_PER_DEG_LAT])
+
+    def _match(self, lat, lon):
+        """(segment, meters along the route, offset from it) within the window after the last match."""
+        if len(self._seg_len) == 0:
+            p = self._project([lat], [lon])[0]
+            return 0, 0.0, float(np.hypot(*(p - self._xy[0])))
+        lo = max(0, self.pos - 2)
+        hi = min(len(self._seg_len), self.pos + self.window)
+        p = self._project([lat], [lon])[0]
+        a = self._xy[lo:hi]
+        seg = self._xy[lo + 1:hi + 1] - a
+        seg_len2 = np.maximum(np.einsum("ij,ij->i", seg, seg), 1e-12)
+        t = np.clip(np.einsum("ij,ij->i", p - a, seg) / seg_len2, 0.0, 1.0)
+        offset = np.hypot(*(a + t[:, None] * seg - p).T)
+        i = int(np.argmin(offset))
+        return lo + i, float(self._cum[lo + i] + t[i] * self._seg_len[lo + i]), float(offset[i])
+
+    def _reroute(self, lat, lon):
+        node = int(self.graph.nearest_nodes([lat], [lon])[0])
+        if self.pred is None or self.driven_m > self.refresh_m or not self._follow(node):
+            self._build_tree()
+            if not self._follow(node):
+                self.route = None
+        self.reroutes += 1
+
+    def update(self, lat, lon):
+        """Feed one GPS fix. Returns status, whether the route changed, the route and remaining km."""
+        changed = False
+        if self.route is None:
+            self._reroute(lat, lon)
+            changed = True
+            if self.route is None:
+                return {"status": "no_route", "changed": True, "route": None, "remaining_km": None}
+            status = "started"
+        else:
+            pos, along, offset = self._match(lat, lon)
+            if offset <= self.corridor_m:
+                self.driven_m += max(0.0, along - self.along_m)
+                self.pos, self.along_m = pos, along
+                status = "on_route"
+                if self.driven_m > self.refresh_m:
+                    # Long way since the last tree: pick up newer traffic from the next route node
+                    self._build_tree()
+                    self._follow(int(self.route["nodes"][min(pos + 1, len(self.route["nodes"]) - 1)]))
+                    changed, status = True, "refreshed"
+            else:
+                self._reroute(lat, lon)
+                changed, status = True, "rerouted"
+                if self.route is None:
+                    return {"status": "no_route", "changed": True, "route": None, "remaining_km": None}
+        if changed:
+            pos, along, offset = self._match(lat, lon)
+            self.pos, self.along_m = pos, along
+        remaining_km = (self._cum[-1] - self.along_m) / 1000
+        return {"status": status, "changed": changed, "route": self.route, "remaining_km": remaining_km}
@@ -0,0 +1,139 @@
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+MAP_WIDTH       = 900      # px, as passed to st_folium
+MAP_HEIGHT      = 600
+PIXEL_TOLERANCE = 0.5      # Douglas-Peucker tolerance in screen pixels ...
+ZOOM_HEADROOM   = 2        # ... at this many levels above the fitted zoom, so zooming in stays smooth
+MAX_LAYERS      = 32       # rendered route layers kept in memory
+# ----------------------------------------
+
+M_PER_DEG_LAT = 111320.0
+TILE_M_PER_PX = 156543.03392  # meters per pixel at zoom 0 on the equator (Web Mercator, 256 px tiles)
+
+_layers = OrderedDict()
+_lock = threading.Lock()
+
+
+def _local_meters(coords):
+    """(n, 2) lat/lon -> (n, 2) planar meters around the polyline's first point."""
+    coords = np.asarray(coords, dtype=np.float64)
+    lat0 = math.radians(coords[0, 0])
+    return np.column_stack([(coords[:, 1] - coords[0, 1]) * M_PER_DEG_LAT * math.cos(lat0),
+                            (coords[:, 0] - coords[0, 0]) * M_PER_DEG_LAT])
+
+
+def simplify(coords, tolerance_m):
+    """Douglas-Peucker: keep the vertices needed to stay within tolerance_m of the full polyline."""
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(coords) < 3 or tolerance_m <= 0:
+        return coords
+    xy = _local_meters(coords)
+    keep = np.zeros(len(coords), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(coords) - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        a, b = xy[lo], xy[hi]
+        seg = b - a
+        pts = xy[lo + 1:hi] - a
+        seg_len2 = float(seg @ seg)
+        if seg_len2 == 0.0:
+            dist = np.hypot(pts[:, 0], pts[:, 1])
+        else:
+            # Distance to the segment (not the infinite line), so loops back past an endpoint count
+            t = np.clip(pts @ seg / seg_len2, 0.0, 1.0)
+            dist = np.hypot(*(pts - t[:, None] * seg).T)
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance_m:
+            mid = lo + 1 + i
+            keep[mid] = True
+            stack.append((lo, mid))
+            stack.append((mid, hi))
+    return coords[keep]
+
+
+def fit_zoom(coords_list, width=MAP_WIDTH, height=MAP_HEIGHT):
+    """(center, zoom) that fits every polyline into a width x height map."""
+    points = np.concatenate([np.asarray(c, dtype=np.float64).reshape(-1, 2) for c in coords_list])
+    lat_lo, lon_lo = points.min(axis=0)
+    lat_hi, lon_hi = points.max(axis=0)
+    center = ((lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2)
+    cos_lat = math.cos(math.radians(center[0]))
+    span_m = max((lon_hi - lon_lo) * M_PER_DEG_LAT * cos_lat / width,
+                 (lat_hi - lat_lo) * M_PER_DEG_LAT / height, 1e-9)
+    zoom = int(math.floor(math.log2(TILE_M_PER_PX * cos_lat / span_m)))
+    return (float(center[0]), float(center[1])), max(1, min(zoom, 18))
+
+
+def zoom_tolerance(zoom, lat, pixels=PIXEL_TOLERANCE):
+    """Meters covered by `pixels` screen pixels at this zoom and latitude."""
+    return pixels * TILE_M_PER_PX * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def routes_geojson(coord_routes, colors, popups, zoom):
+    """FeatureCollection of simplified route LineStrings (GeoJSON order: lon, lat)."""
+    features = []
+    for i, coords in enumerate(coord_routes):
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        line = simplify(coords, zoom_tolerance(zoom + ZOOM_HEADROOM, coords[0, 0]))
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": np.round(line[:, ::-1], 6).tolist()},
+            "properties": {"name": f"R{i+1}", "color": colors[i % len(colors)], "popup": popups[i]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _style(feature):
+    return {"color": feature["properties"]["color"], "weight": 7, "opacity": 0.8}
+
+
+def _build_layer(coord_routes, colors, popups, zoom):
+    import folium
+
+    group = folium.FeatureGroup(name="Routes")
+    folium.GeoJson(routes_geojson(coord_routes, colors, popups, zoom), style_function=_style,
+                   popup=folium.GeoJsonPopup(fields=["popup"], labels=False, max_width=300)).add_to(group)
+    # Every route shares its endpoints, so two markers instead of two per route
+    start, end = coord_routes[0][0], coord_routes[0][-1]
+    folium.Marker(list(start), popup="Start", icon=folium.Icon(color="blue", icon="play")).add_to(group)
+    folium.Marker(list(end), popup="End", icon=folium.Icon(color="red", icon="stop")).add_to(group)
+    return group
+
+
+def route_layer(key, coord_routes, colors, popups, zoom):
+    """Route FeatureGroup for one routing result, built once per (key, zoom, colors, popups) and reused on reruns.
+
+    Colors and popups are part of the cache key, so a result whose risk labels or
+    distances changed (same node sequences) is never shown with stale popups.
+    """
+    cache_key = (key, zoom, tuple(colors), tuple(popups))
+    with _lock:
+        if cache_key in _layers:
+            _layers.move_to_end(cache_key)
+            return _layers[cache_key]
+    layer = _build_layer(coord_routes, colors, popups, zoom)
+    with _lock:
+        _layers[cache_key] = layer
+        while len(_layers) > MAX_LAYERS:
+            _layers.popitem(last=False)
+    return layer
+
+
+def base_map(center, zoom):
+    """Tile layer only; routes go in through st_folium(feature_group_to_add=...)."""
+    import folium
+
+    return folium.Map(location=list(center), zoom_start=zoom)
+
+
+def result_key(routes):
+    """Stable key for a routing result: the node sequence of every route."""
+    return hash(tuple(tuple(r["nodes"]) for r in routes))
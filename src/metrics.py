@@ -0,0 +1,183 @@
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ---------------- CONFIG ----------------
+# SAFEPATH_METRICS=1 turns timing on; everything below is a no-op otherwise
+ENABLED      = os.environ.get("SAFEPATH_METRICS", "") not in ("", "0")
+BUCKETS      = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+FILE_BYTES   = 5 * 1024 * 1024   # rotate the metrics file past this size
+FILE_BACKUPS = 3
+# ----------------------------------------
+
+METRIC = "safepath_stage_seconds"
+
+
+class Histogram:
+    """Prometheus-style histogram of stage durations in seconds."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def snapshot(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+_histograms = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable(flag=True):
+    global ENABLED
+    ENABLED = bool(flag)
+
+
+def observe(stage, seconds):
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = Histogram()
+        hist.observe(seconds)
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.append((stage, seconds))
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage):
+    """with span("snap"): ...  - times the block when metrics are enabled."""
+    return _Span(stage) if ENABLED else _NO_SPAN
+
+
+class trace:
+    """Collect the spans of one request on this thread: with trace() as t: ...; t.stages."""
+
+    def __enter__(self):
+        self.stages = []
+        self._outer = getattr(_local, "trace", None)
+        if ENABLED:
+            _local.trace = self.stages
+        return self
+
+    def __exit__(self, *exc):
+        _local.trace = self._outer
+        if self._outer is not None:
+            self._outer.extend(self.stages)
+        return False
+
+    def breakdown(self):
+        """[(stage, total ms)] in first-seen order."""
+        totals = {}
+        for stage, seconds in self.stages:
+            totals[stage] = totals.get(stage, 0.0) + seconds * 1000
+        return list(totals.items())
+
+
+def merge(stages):
+    """Record spans measured elsewhere (e.g. returned by a worker process)."""
+    for stage, seconds in stages:
+        observe(stage, seconds)
+
+
+def snapshot():
+    with _lock:
+        return {stage: hist.snapshot() for stage, hist in _histograms.items()}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format."""
+    lines = [f"# HELP {METRIC} Duration of SafePathAI request stages.", f"# TYPE {METRIC} histogram"]
+    for stage, h in sorted(snapshot().items()):
+        cumulative = 0
+        for bound, count in zip(list(h["buckets"]) + ["+Inf"], h["counts"]):
+            cumulative += count
+            lines.append(f'{METRIC}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{METRIC}_sum{{stage="{stage}"}} {h["sum"]:.6f}')
+        lines.append(f'{METRIC}_count{{stage="{stage}"}} {h["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path, max_bytes=FILE_BYTES, backups=FILE_BACKUPS):
+    """Append one JSON snapshot line to path, rotating path -> path.1 -> ... when it grows too big."""
+    if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+        for i in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+    with open(path, "a") as f:
+        f.write(json.dumps({"time": time.time(), "stages": snapshot()}) + "\n")
+
+
+def start_file_writer(path, interval=60.0):
+    """Background thread writing a snapshot to the rotating metrics file every interval seconds."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            write_file(path)
+    thread = threading.Thread(target=loop, name="metrics-file", daemon=True)
+    thread.start()
+    return thread
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        data = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_http(port, host="127.0.0.1"):
+    """Expose /metrics on a background thread (for processes without their own HTTP server)."""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -1,28 +1,36 @@
-import osmnx as ox
-import networkx as nx
-from networkx.algorithms.simple_paths import shortest_simple_paths
+from alternatives import alternative_routes
+from compiled_graph import CompiledGraph
+from metrics import span
+from shortest_path import shortest_path
+
+def get_shortest_route(G, source_coord, dest_coord, ch=None):
+    """Single shortest route by length, answered by the contraction hierarchy when given."""
+    if not isinstance(G, CompiledGraph):
+        G = CompiledGraph.from_networkx(G)
+    source_node = G.nearest_node(source_coord[0], source_coord[1])
+    dest_node = G.nearest_node(dest_coord[0], dest_coord[1])
+    path, _ = ch.path(source_node, dest_node) if ch is not None else shortest_path(G, source_node, dest_node)
+    return G.path_coords(path) if path is not None else []
+
+def get_k_routes(G, source_coord, dest_coord, k=3, weights=None, ch=None):
+    # Accept a plain NetworkX graph too, compiling it in memory
+    if not isinstance(G, CompiledGraph):
+        with span("compile_networkx"):
+            G = CompiledGraph.from_networkx(G)
 
-def get_k_routes(G, source_coord, dest_coord, k=3):
     # Find nearest nodes
-    source_node = ox.distance.nearest_nodes(G, X=source_coord[1], Y=source_coord[0])
-    dest_node = ox.distance.nearest_nodes(G, X=dest_coord[1], Y=dest_coord[0])
+    with span("snap"):
+        source_node, dest_node = G.nearest_nodes([source_coord[0], dest_coord[0]],
+                                                 [source_coord[1], dest_coord[1]])
+
+    # The CH holds plain lengths, so it can only seed the first route for length routing
+    with span("ch_query"):
+        first = ch.path(source_node, dest_node) if ch is not None and weights is None else None
+
+    # Diverse alternatives with bounded overlap and stretch (empty if no path)
+    with span("alternatives"):
+        routes = alternative_routes(G, source_node, dest_node, k=k, weights=weights, first=first)
 
-    # Generate k shortest simple paths
-    routes = []
-    try:
-        generator = shortest_simple_paths(G, source_node, dest_node, weight='length')
-        for i in range(k):
-            route = next(generator)
-            routes.append(route)
-    except (StopIteration, nx.NetworkXNoPath):
-        pass  # Not enough paths found
-    
     # Convert node paths to coordinate paths for folium (lat, lon)
-    coord_routes = []
-    for route in routes:
-        coords = []
-        for node in route:
-            n = G.nodes[node]
-            coords.append([n['y'], n['x']])
-        coord_routes.append(coords)
-    return coord_routes
+    with span("route_coords"):
+        return [G.path_coords(route) for route in routes]
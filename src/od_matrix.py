@@ -0,0 +1,168 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import dijkstra
+
+from compiled_graph import compiled_dir, graphml_file, load_compiled_graph, load_or_compile
+from shortest_path import graph_matrix
+
+# ---------------- CONFIG ----------------
+SOURCE_CHUNK = 16     # sources per Dijkstra batch (memory ~ SOURCE_CHUNK * num_nodes * 40 bytes)
+WORKERS      = max(1, (os.cpu_count() or 2) - 1)
+# ----------------------------------------
+
+# Per-worker state: graph arrays are memory-mapped, weights/attrs are sent once at start-up
+_graph = None
+_weights = None
+_attrs = None
+
+
+def _init_worker(path, weights, attrs):
+    global _graph, _weights, _attrs
+    _graph = load_compiled_graph(path)
+    _weights, _attrs = weights, attrs
+
+
+def tree_edges(graph, pred):
+    """Edge id from pred[r, v] to v for every row of a predecessor array (-1 for roots/unreachable)."""
+    v = np.broadcast_to(np.arange(graph.num_nodes), pred.shape)
+    lo = graph.rev_offset[v]
+    degree = graph.rev_offset[v + 1] - lo
+    eid = np.full(pred.shape, -1, dtype=np.int64)
+    # In-degree is tiny on road graphs, so scan each reverse-row slot in lock-step
+    for j in range(int(degree.max()) if pred.size else 0):
+        e = graph.rev_edge[np.minimum(lo + j, graph.num_edges - 1)]
+        hit = (eid < 0) & (j < degree) & (graph.edge_source[e] == pred)
+        eid[hit] = e[hit]
+    return eid
+
+
+def tree_sums(pred, values):
+    """Sum of per-node values along every tree path to the root, by pointer doubling.
+
+    pred: (rows, n) predecessor arrays; values: list of (rows, n) arrays (value of
+    the edge into each node, 0 at roots). O(rows * n * log depth), all vectorized.
+    """
+    rows, n = pred.shape
+    own = np.arange(n)
+    anc = (np.where(pred < 0, own, pred) + (np.arange(rows) * n)[:, None]).ravel()
+    sums = [np.array(v, dtype=np.float64).ravel() for v in values]
+    while True:
+        nxt = anc[anc]
+        if np.array_equal(nxt, anc):
+            break
+        for s in sums:
+            s += s[anc]
+        anc = nxt
+    return [s.reshape(rows, n) for s in sums]
+
+
+def matrix_chunk(graph, sources, targets, weights, attrs):
+    """(cost, {name: matrix}) from each source to every target along the weights' shortest path."""
+    dist, pred = dijkstra(graph_matrix(graph, weights), directed=True, indices=sources, return_predecessors=True)
+    dist, pred = np.atleast_2d(dist), np.atleast_2d(pred)
+    out = {}
+    if attrs:
+        eid = tree_edges(graph, pred)
+        names = list(attrs)
+        values = [np.where(eid >= 0, np.asarray(attrs[name])[np.maximum(eid, 0)], 0.0) for name in names]
+        unreachable = ~np.isfinite(dist[:, targets])
+        for name, total in zip(names, tree_sums(pred, values)):
+            out[name] = np.where(unreachable, np.inf, total[:, targets])
+    return dist[:, targets], out
+
+
+def _worker_chunk(sources, targets):
+    return matrix_chunk(_graph, sources, targets, _weights, _attrs)
+
+
+def node_matrix(graph, sources, targets, weights=None, attrs=None, workers=1, chunk=SOURCE_CHUNK):
+    """Dense matrices between node indices; sources/targets may repeat (each is searched once).
+
+    Returns {"cost": (S, T) array, **{name: (S, T) array for every attr}}.
+    """
+    weights = np.asarray(graph.edge_length if weights is None else weights, dtype=np.float64)
+    attrs = {name: np.asarray(values, dtype=np.float64) for name, values in (attrs or {}).items()}
+    uniq_src, src_inv = np.unique(np.asarray(sources, dtype=np.int64), return_inverse=True)
+    uniq_dst, dst_inv = np.unique(np.asarray(targets, dtype=np.int64), return_inverse=True)
+    batches = [uniq_src[i:i + chunk] for i in range(0, len(uniq_src), chunk)]
+
+    if workers > 1 and len(batches) > 1 and graph.path is not None:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(graph.path, weights, attrs)) as pool:
+            parts = list(pool.map(_worker_chunk, batches, [uniq_dst] * len(batches)))
+    else:
+        parts = [matrix_chunk(graph, batch, uniq_dst, weights, attrs) for batch in batches]
+
+    result = {"cost": np.vstack([cost for cost, _ in parts]) if parts else np.zeros((0, len(uniq_dst)))}
+    for name in attrs:
+        result[name] = np.vstack([extra[name] for _, extra in parts]) if parts else result["cost"].copy()
+    # Back to the caller's order (and duplicates)
+    return {name: m[src_inv][:, dst_inv] for name, m in result.items()}
+
+
+def od_matrix(graph, sources, targets=None, weights=None, attrs=None, workers=1, chunk=SOURCE_CHUNK):
+    """Matrices between (lat, lon) points: all of them are snapped in one batch, then node_matrix()."""
+    sources = np.asarray(sources, dtype=np.float64).reshape(-1, 2)
+    targets = sources if targets is None else np.asarray(targets, dtype=np.float64).reshape(-1, 2)
+    points = np.vstack([sources, targets])
+    nodes = graph.nearest_nodes(points[:, 0], points[:, 1])
+    result = node_matrix(graph, nodes[:len(sources)], nodes[len(sources):], weights, attrs, workers, chunk)
+    result["source_nodes"] = nodes[:len(sources)]
+    result["target_nodes"] = nodes[len(sources):]
+    return result
+
+
+def default_attrs(graph, edge_risk=None, profiles=None, time_of_travel="Morning"):
+    """distance_m, time_s and accidents accumulated along each matrix route."""
+    attrs = {"distance_m": graph.edge_length,
+             "time_s": profiles.travel_times(time_of_travel) if profiles is not None else graph.edge_travel_time}
+    if edge_risk is not None:
+        attrs["accidents"] = edge_risk.counts[edge_risk.bucket(time_of_travel)]
+    return attrs
+
+
+if __name__ == "__main__":
+    from edge_risk import load_edge_risk
+    from geocoding import Geocoder, load_gazetteer
+    from time_profiles import load_time_profiles
+
+    parser = argparse.ArgumentParser(description="Many-to-many distance/time/risk matrices on the compiled graph")
+    parser.add_argument("points", help="CSV with lat/lon columns, or with a place column to geocode")
+    parser.add_argument("output", nargs="?", default="od_matrix.npz")
+    parser.add_argument("--targets", default=None, help="second CSV for a rectangular matrix")
+    parser.add_argument("--compiled", default=compiled_dir)
+    parser.add_argument("--time", default="Morning", choices=["Morning", "Afternoon", "Evening", "Night"])
+    parser.add_argument("--weight", choices=["length", "travel_time", "safe"], default="safe")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+
+    graph = load_or_compile(graphml_file, args.compiled)
+    edge_risk = load_edge_risk(graph)
+    profiles = load_time_profiles(graph, edge_risk)
+
+    def read_points(path):
+        df = pd.read_csv(path)
+        if {"lat", "lon"} <= set(df.columns):
+            return df[["lat", "lon"]].to_numpy(dtype=np.float64)
+        geocoder = Geocoder(gazetteer=load_gazetteer(args.compiled, "data/accidents.csv"))
+        coords = geocoder.geocode_many(df["place"])
+        missing = [place for place in df["place"] if coords.get(place) is None]
+        if missing:
+            raise SystemExit(f"❌ Could not geocode: {missing}")
+        return np.array([coords[place] for place in df["place"]], dtype=np.float64)
+
+    sources = read_points(args.points)
+    targets = read_points(args.targets) if args.targets else None
+    weights = {"length": graph.edge_length, "travel_time": profiles.travel_times(args.time),
+               "safe": profiles.weights(args.time)}[args.weight]
+    started = time.perf_counter()
+    result = od_matrix(graph, sources, targets, weights, default_attrs(graph, edge_risk, profiles, args.time),
+                       workers=args.workers)
+    np.savez_compressed(args.output, **result)
+    shape = result["cost"].shape
+    print(f"✅ {shape[0]}x{shape[1]} matrix in {time.perf_counter() - started:.1f}s saved to {args.output}")
@@ -1,14 +1,15 @@
-import osmnx as ox
-import networkx as nx
-from geopy.geocoders import Nominatim
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from alternatives import alternative_routes
+from subgraph import bidirectional, graph_from_bbox
+from geocoding import Geocoder, load_gazetteer
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="route_app")
+# Initialize geocoder (cached on disk, so reruns skip Nominatim)
+geocoder = Geocoder(gazetteer=load_gazetteer(places_csv="accidents.csv"), user_agent="route_app")
 
 def geocode_place(place):
-    location = geolocator.geocode(place, timeout=10)
-    return (location.latitude, location.longitude) if location else None
+    return geocoder.geocode(place)
 
 source_place = "T Nagar, Chennai, India"
 destination_place = "Guindy, Chennai, India"
@@ -31,25 +32,30 @@ lon_span = east - west
 print(f"Bounding box latitude span: {lat_span} degrees")
 print(f"Bounding box longitude span: {lon_span} degrees")
 
-G = ox.graph_from_bbox(bbox=(north, south, east, west), network_type="drive", simplify=True)
-G_undir = G.to_undirected()
+# Extract the box from the local graph; undirected routing uses both directions of every road
+graph = bidirectional(graph_from_bbox(north, south, east, west))
 
-def nearest_node(G, coord):
-    return ox.distance.nearest_nodes(G, X=coord[1], Y=coord[0])
-
-source_node = nearest_node(G_undir, source_coord)
-dest_node = nearest_node(G_undir, destination_coord)
+# Snap both endpoints in one batched lookup
+source_node, dest_node = graph.nearest_nodes([source_coord[0], destination_coord[0]],
+                                             [source_coord[1], destination_coord[1]])
 
 k = 3
-paths = list(nx.shortest_simple_paths(G_undir, source_node, dest_node, weight="length"))[:k]
+routes = alternative_routes(graph, source_node, dest_node, k=k)
 
 # Plot base graph
-fig, ax = ox.plot_graph(G_undir, show=False, close=False)
+segments = np.stack([
+    np.column_stack((graph.node_lon[graph.edge_source], graph.node_lat[graph.edge_source])),
+    np.column_stack((graph.node_lon[graph.edge_target], graph.node_lat[graph.edge_target])),
+], axis=1)
+fig, ax = plt.subplots(figsize=(10, 10))
+ax.add_collection(LineCollection(segments, colors='#999999', linewidths=0.5))
 
 # Plot multiple routes with distinct colors
 colors = ['r', 'g', 'b']
-for i, path in enumerate(paths):
-    ox.plot_graph_route(G_undir, path, route_color=colors[i % len(colors)], route_linewidth=4, ax=ax, show=False)
+for i, route in enumerate(routes):
+    ax.plot(graph.node_lon[route], graph.node_lat[route], color=colors[i % len(colors)], linewidth=4)
+ax.set_aspect('equal')
+ax.autoscale()
 
 plt.title(f'Alternative Routes from {source_place} to {destination_place}')
 plt.show()
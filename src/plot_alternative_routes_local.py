@@ -1,17 +1,28 @@
-import osmnx as ox
-import networkx as nx
-from geopy.geocoders import Nominatim
+import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from astar import AStar
+from compiled_graph import load_or_compile
+from contraction_hierarchy import load_hierarchy
+from geocoding import Geocoder, load_gazetteer
 
-# Load full original MultiDiGraph with edge geometries
-G = ox.load_graphml("chennai_drive.graphml")
+# Load the compiled (memory-mapped) road graph
+graph = load_or_compile("chennai_drive.graphml", "chennai_drive.compiled")
 
-# Initialize geocoder
-geolocator = Nominatim(user_agent="route_app")
+# Contraction hierarchy from `python src/contraction_hierarchy.py`, if it has been built
+try:
+    ch = load_hierarchy("chennai_drive.compiled", graph=graph)
+except FileNotFoundError:
+    ch = None
+except ValueError as e:
+    print(f"⚠️ {e}")
+    ch = None
+
+# Initialize geocoder (cache + offline gazetteer from the compiled graph)
+geocoder = Geocoder(gazetteer=load_gazetteer("chennai_drive.compiled", "accidents.csv"), user_agent="route_app")
 
 def geocode_place(place):
-    location = geolocator.geocode(place, timeout=10)
-    return (location.latitude, location.longitude) if location else None
+    return geocoder.geocode(place)
 
 source_place = "T Nagar, Chennai, India"
 destination_place = "Guindy, Chennai, India"
@@ -22,23 +33,35 @@ destination_coord = geocode_place(destination_place)
 print(f"Source: {source_coord}")
 print(f"Destination: {destination_coord}")
 
-def nearest_node(G, coord):
-    return ox.distance.nearest_nodes(G, X=coord[1], Y=coord[0])
+def nearest_node(graph, coord):
+    return graph.nearest_node(coord[0], coord[1])
 
 print("Finding nearest nodes...")
-source_node = nearest_node(G, source_coord)
-dest_node = nearest_node(G, destination_coord)
+source_node = nearest_node(graph, source_coord)
+dest_node = nearest_node(graph, destination_coord)
 print(f"Source node: {source_node}, Destination node: {dest_node}")
 
-try:
-    print("Calculating shortest path on full graph...")
-    path = nx.shortest_path(G, source_node, dest_node, weight='length')
-    print(f"Path length: {len(path)} nodes")
+print("Calculating shortest path on full graph...")
+if ch is not None:
+    path, dist = ch.path(source_node, dest_node)
+else:
+    # Bidirectional A* (with ALT landmarks from `python src/astar.py`, if built)
+    path, dist = AStar(graph).path(source_node, dest_node)
 
-    # Plot route on full graph with edge geometries
-    fig, ax = ox.plot_graph_route(G, path, route_color='r', route_linewidth=4, show=False, close=False)
+if path is None:
+    print("No path found between source and destination on full graph.")
+else:
+    print(f"Path length: {len(path)} nodes, {dist / 1000:.2f} km")
+
+    # Plot route on top of every road segment
+    segments = np.stack([
+        np.column_stack((graph.node_lon[graph.edge_source], graph.node_lat[graph.edge_source])),
+        np.column_stack((graph.node_lon[graph.edge_target], graph.node_lat[graph.edge_target])),
+    ], axis=1)
+    fig, ax = plt.subplots(figsize=(10, 10))
+    ax.add_collection(LineCollection(segments, colors='#999999', linewidths=0.5))
+    ax.plot(graph.node_lon[path], graph.node_lat[path], color='r', linewidth=4)
+    ax.set_aspect('equal')
+    ax.autoscale()
     plt.title(f'Shortest Route from {source_place} to {destination_place}')
     plt.show()
-
-except nx.NetworkXNoPath:
-    print("No path found between source and destination on full graph.")
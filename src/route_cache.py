@@ -0,0 +1,122 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+MAX_ENTRIES = 512
+MAX_BYTES = 64 * 1024 * 1024
+# ----------------------------------------
+
+
+def estimate_size(value):
+    """Rough memory footprint of a cached value (arrays, lists, dicts, scalars)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def route_key(source, dest, time_of_travel, epoch, k):
+    return (int(source), int(dest), time_of_travel, int(epoch), int(k))
+
+
+class RouteCache:
+    """Thread-safe LRU of routing results, bounded by entry count and estimated bytes.
+
+    Keys come from route_key(); the traffic epoch is part of the key, and entries
+    from older epochs are dropped as soon as a newer epoch is seen. Entries put
+    with the edge ids their routes use can also be dropped selectively by
+    invalidate_edges() when live traffic changes some edges.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.epoch = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _advance_epoch(self, epoch):
+        if self.epoch is None or epoch > self.epoch:
+            self.epoch = epoch
+            for key in [key for key in self._entries if key[3] < epoch]:
+                self._drop(key)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def get(self, key):
+        with self._lock:
+            self._advance_epoch(key[3])
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=None, edges=None):
+        """edges: ids of every graph edge the cached routes use (enables invalidate_edges)."""
+        size = estimate_size(value) if size is None else size
+        if edges is not None:
+            edges = np.unique(np.asarray(edges, dtype=np.int64))
+            size += edges.nbytes
+        with self._lock:
+            self._advance_epoch(key[3])
+            if key[3] < self.epoch or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, edges)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, epoch=None):
+        """Drop everything (and forget the epoch seen so far, e.g. when the router switches to live
+        traffic and its keys restart at LIVE_EPOCH), or only entries older than epoch."""
+        with self._lock:
+            if epoch is None:
+                self._entries.clear()
+                self.bytes = 0
+                self.epoch = None
+            else:
+                self._advance_epoch(epoch)
+
+    def invalidate_edges(self, edge_ids):
+        """Drop entries whose routes use any of edge_ids (and entries put without edges); returns the count."""
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        if not len(edge_ids):
+            return 0
+        touched = np.zeros(int(edge_ids.max()) + 1, dtype=bool)
+        touched[edge_ids] = True
+        with self._lock:
+            stale = [key for key, (_, _, edges) in self._entries.items()
+                     if edges is None or touched[edges[edges < len(touched)]].any()]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"entries": len(self._entries), "bytes": self.bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / total if total else 0.0}
@@ -0,0 +1,133 @@
+import math
+
+import numpy as np
+
+from compiled_graph import HIGHWAY_CLASSES
+from edge_risk import BUCKET_INDEX
+
+# ---------------- CONFIG ----------------
+TURN_DEG = 45.0     # heading change between consecutive edges that counts as a turn
+# ----------------------------------------
+
+# Categorical encodings of the risk model's feature rows (training and serving share these)
+congestion_map = {"Low": 0, "Medium": 1, "High": 2}
+time_map = {"Morning": 0, "Afternoon": 1, "Evening": 2, "Night": 3}
+CONGESTION_LABELS = list(congestion_map)
+MODEL_FEATURES = ["distance_km", "congestion_level_num", "accidents", "time_num"]
+
+
+def batch_edges(graph, paths):
+    """Edge ids of many node-index paths in one pass: (flat edge ids, offsets) with route i's
+    edges at edge_ids[offsets[i]:offsets[i + 1]]."""
+    lengths = np.array([len(path) for path in paths], dtype=np.int64)
+    nodes = np.concatenate([np.asarray(path, dtype=np.int64) for path in paths]) if len(paths) \
+        else np.zeros(0, dtype=np.int64)
+    offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum(np.maximum(lengths - 1, 0), out=offsets[1:])
+    # Consecutive pairs of the flat node array, minus the ones straddling two routes
+    inside = np.ones(max(len(nodes) - 1, 0), dtype=bool)
+    ends = np.cumsum(lengths)[:-1] - 1
+    inside[ends[(ends >= 0) & (ends < len(inside))]] = False
+    u, v = nodes[:-1][inside], nodes[1:][inside]
+
+    lo = graph.edge_offset[u]
+    degree = graph.edge_offset[u + 1] - lo
+    eid = np.full(len(u), -1, dtype=np.int64)
+    # Same lock-step row scan as CompiledGraph.path_edges, over every route at once
+    for j in range(int(degree.max()) if len(u) else 0):
+        pos = np.minimum(lo + j, graph.num_edges - 1)
+        hit = (eid < 0) & (j < degree) & (graph.edge_target[pos] == v)
+        eid[hit] = pos[hit]
+    if (eid < 0).any():
+        raise KeyError("path uses an edge that is not in the graph")
+    return eid, offsets
+
+
+class RouteFeatures:
+    """Per-route features from the compiled graph's edge arrays, for a batch of routes per call.
+
+    Every feature is a sum over a route's edges, read off a prefix sum of the
+    gathered edge values; nothing loops over routes or segments in Python. The
+    router and train_model.py both build the model's rows here, so what a model is
+    trained on is what it is served.
+    """
+
+    def __init__(self, graph, edge_risk=None, profiles=None, turn_deg=TURN_DEG):
+        self.graph = graph
+        self.edge_risk = edge_risk
+        self.profiles = profiles
+        self.turn_cos = math.cos(math.radians(turn_deg))
+        self.length = np.asarray(graph.edge_length, dtype=np.float64)
+        # Unit heading of every edge in local meters (a turn is a drop in the dot product)
+        lat0 = math.radians(float(np.mean(graph.node_lat))) if graph.num_nodes else 0.0
+        dx = (graph.node_lon[graph.edge_target] - graph.node_lon[graph.edge_source]) * math.cos(lat0)
+        dy = graph.node_lat[graph.edge_target] - graph.node_lat[graph.edge_source]
+        norm = np.maximum(np.hypot(dx, dy), 1e-12)
+        self.heading = np.column_stack([dx / norm, dy / norm]).astype(np.float64)
+
+    @staticmethod
+    def _sums(values, offsets):
+        """Per-route sums of flat per-edge values (last axis) via one prefix sum."""
+        prefix = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.float64)
+        np.cumsum(values, axis=-1, out=prefix[..., 1:])
+        return prefix[..., offsets[1:]] - prefix[..., offsets[:-1]]
+
+    def extract(self, paths, time_of_travel="Morning", levels=None, traffic_weights=None, osm_ids=False):
+        """Features of node paths departing in time_of_travel; one array entry (or row) per route.
+
+        levels / traffic_weights are the congestion levels (0-2) and congested lengths of
+        one traffic scenario; without them congestion features are 0 and congested_km
+        equals distance_km. osm_ids: paths hold OSM node ids (as route stores do).
+        """
+        if osm_ids:
+            paths = [self.graph.node_index(path) for path in paths]
+        edge_ids, offsets = batch_edges(self.graph, paths)
+        length = self.length[edge_ids]
+        bucket = BUCKET_INDEX[time_of_travel]
+
+        columns = [length]
+        travel_time = self.profiles.travel_times(time_of_travel) if self.profiles is not None \
+            else self.graph.edge_travel_time
+        columns.append(np.asarray(travel_time, dtype=np.float64)[edge_ids])
+        columns.append(np.asarray(traffic_weights, dtype=np.float64)[edge_ids] if traffic_weights is not None
+                       else length)
+        level = np.asarray(levels)[edge_ids].astype(np.float64) if levels is not None else np.zeros(len(edge_ids))
+        columns += [length * level, length * (level >= 1)]
+        columns.append(np.asarray(self.edge_risk.counts[bucket], dtype=np.float64)[edge_ids]
+                       if self.edge_risk is not None else np.zeros(len(edge_ids)))
+        meters, seconds, congested, level_m, busy_m, accidents = self._sums(np.vstack(columns), offsets)
+
+        # Length per road class: one bincount over (route, class) pairs
+        route = np.repeat(np.arange(len(paths)), np.diff(offsets))
+        classes = len(HIGHWAY_CLASSES)
+        class_m = np.bincount(route * classes + self.graph.edge_highway[edge_ids], weights=length,
+                              minlength=len(paths) * classes).reshape(len(paths), classes)
+
+        # Turns: consecutive edge pairs of the same route whose headings differ by > TURN_DEG
+        heading = self.heading[edge_ids]
+        turn = np.zeros(len(edge_ids))
+        if len(edge_ids) > 1:
+            turn[1:] = np.einsum("ij,ij->i", heading[1:], heading[:-1]) < self.turn_cos
+            turn[offsets[:-1][offsets[:-1] < len(turn)]] = 0.0    # no turn onto a route's first edge
+        turns = self._sums(turn[None, :], offsets)[0]
+
+        total = np.where(meters > 0, meters, 1.0)
+        mean_level = np.where(meters > 0, level_m / total, 0.0)
+        return {
+            "edge_ids": edge_ids,
+            "edge_offset": offsets,
+            "distance_km": meters / 1000,
+            "travel_time_min": seconds / 60,
+            "congested_km": congested / 1000,
+            "congestion": np.rint(mean_level).astype(np.int64),
+            "congested_share": busy_m / total,
+            "accidents": accidents,
+            "class_share": class_m / total[:, None],
+            "turns": turns.astype(np.int64),
+        }
+
+    def model_rows(self, features, time_of_travel):
+        """[distance_km, congestion, accidents, time] rows for the risk model."""
+        n = len(features["distance_km"])
+        return np.column_stack([features["distance_km"], features["congestion"],
+                                np.rint(features["accidents"]), np.full(n, time_map[time_of_travel])])
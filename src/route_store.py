@@ -0,0 +1,254 @@
+import ast
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ---------------- CONFIG ----------------
+FORMAT_VERSION = 1
+CHUNK_ROUTES   = 10000   # routes per chunk when streaming
+# ----------------------------------------
+
+# Flat arrays of a route store; route i owns [offset[i], offset[i + 1]) of its data file
+FILES = {
+    "coords": ("coords.f64", np.float64),        # lat, lon pairs of every route, back to back
+    "coord_offset": ("coord_offset.i64", np.int64),
+    "nodes": ("nodes.i64", np.int64),            # OSM node ids (empty for routes without them)
+    "node_offset": ("node_offset.i64", np.int64),
+}
+
+NUMPY_SCALAR = re.compile(r"np\.\w+\(([^()]*)\)")
+
+
+def _file(path, name):
+    return os.path.join(path, FILES[name][0])
+
+
+def _offsets(lengths, start=0):
+    out = np.empty(len(lengths) + 1, dtype=np.int64)
+    out[0] = start
+    np.cumsum(lengths, out=out[1:])
+    out[1:] += start
+    return out
+
+
+class RouteWriter:
+    """Appends routes to a store: scalar columns in attrs.csv, paths as flat binary arrays.
+
+    with RouteWriter("routes.routes") as w:
+        w.write({"route_id": "R1", ...}, coords=[(lat, lon), ...], nodes=[...])
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta = _read_meta(path) if append and os.path.exists(os.path.join(path, "meta.json")) else None
+        mode = "ab" if meta else "wb"
+        self.num_routes = meta["num_routes"] if meta else 0
+        self.num_coords = meta["num_coords"] if meta else 0
+        self.num_nodes = meta["num_nodes"] if meta else 0
+        self.columns = meta["columns"] if meta else None
+        self._files = {name: open(_file(path, name), mode) for name in FILES}
+        if not meta:
+            # Offsets start with the leading 0
+            np.zeros(1, dtype=np.int64).tofile(self._files["coord_offset"])
+            np.zeros(1, dtype=np.int64).tofile(self._files["node_offset"])
+            if os.path.exists(os.path.join(path, "attrs.csv")):
+                os.remove(os.path.join(path, "attrs.csv"))
+
+    def write_arrays(self, attrs, coords, coord_lengths, nodes=None, node_lengths=None):
+        """Bulk append: attrs DataFrame plus flat coords (N, 2) split by coord_lengths."""
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        coord_lengths = np.asarray(coord_lengths, dtype=np.int64)
+        if node_lengths is None:
+            nodes, node_lengths = np.zeros(0, dtype=np.int64), np.zeros(len(coord_lengths), dtype=np.int64)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        node_lengths = np.asarray(node_lengths, dtype=np.int64)
+        if not len(attrs) == len(coord_lengths) == len(node_lengths):
+            raise ValueError("attrs, coords and nodes describe a different number of routes")
+
+        attrs = pd.DataFrame(attrs).reset_index(drop=True)
+        if self.columns is None:
+            self.columns = list(attrs.columns)
+        attrs.reindex(columns=self.columns).to_csv(
+            os.path.join(self.path, "attrs.csv"), mode="a", index=False,
+            header=not os.path.exists(os.path.join(self.path, "attrs.csv")))
+
+        coords.tofile(self._files["coords"])
+        _offsets(coord_lengths, self.num_coords)[1:].tofile(self._files["coord_offset"])
+        nodes.tofile(self._files["nodes"])
+        _offsets(node_lengths, self.num_nodes)[1:].tofile(self._files["node_offset"])
+        self.num_routes += len(coord_lengths)
+        self.num_coords += int(coord_lengths.sum())
+        self.num_nodes += int(node_lengths.sum())
+
+    def write_many(self, attrs, coords_list, nodes_list=None):
+        coord_lengths = [len(c) for c in coords_list]
+        coords = np.concatenate([np.asarray(c, dtype=np.float64).reshape(-1, 2) for c in coords_list]) \
+            if coords_list else np.zeros((0, 2))
+        nodes = node_lengths = None
+        if nodes_list is not None:
+            node_lengths = [len(n) for n in nodes_list]
+            nodes = np.concatenate([np.asarray(n, dtype=np.int64) for n in nodes_list]) \
+                if nodes_list else np.zeros(0, dtype=np.int64)
+        self.write_arrays(attrs, coords, coord_lengths, nodes, node_lengths)
+
+    def copy_from(self, store, attrs=None):
+        """Append every route of another store, optionally with replacement attrs."""
+        self.write_arrays(store.attrs if attrs is None else attrs, store._coords,
+                          np.diff(store.coord_offset), store._nodes, np.diff(store.node_offset))
+
+    def write(self, attrs, coords, nodes=None):
+        self.write_many(pd.DataFrame([attrs]), [coords], None if nodes is None else [nodes])
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({"format_version": FORMAT_VERSION, "num_routes": self.num_routes,
+                       "num_coords": self.num_coords, "num_nodes": self.num_nodes,
+                       "columns": self.columns or []}, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"{path} was written with an incompatible route store format")
+    return meta
+
+
+def _map(path, name, count):
+    filename, dtype = FILES[name]
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(os.path.join(path, filename), dtype=dtype, mode="r", shape=(count,))
+
+
+class RouteStore:
+    """Read side of a route store. Paths are memory-mapped; nothing is parsed per row."""
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = _read_meta(path)
+        n = self.meta["num_routes"]
+        self.coord_offset = _map(path, "coord_offset", n + 1)
+        self.node_offset = _map(path, "node_offset", n + 1)
+        self._coords = _map(path, "coords", 2 * self.meta["num_coords"]).reshape(-1, 2)
+        self._nodes = _map(path, "nodes", self.meta["num_nodes"])
+        self._attrs = None
+
+    def __len__(self):
+        return self.meta["num_routes"]
+
+    @property
+    def attrs(self):
+        """Scalar columns of every route (no path parsing)."""
+        if self._attrs is None:
+            self._attrs = self._read_attrs()
+        return self._attrs
+
+    def _read_attrs(self, chunksize=None):
+        path = os.path.join(self.path, "attrs.csv")
+        if not os.path.exists(path):
+            empty = pd.DataFrame(columns=self.meta["columns"])
+            return iter([empty]) if chunksize else empty
+        return pd.read_csv(path, chunksize=chunksize)
+
+    def iter_attrs(self, chunk_size=CHUNK_ROUTES, columns=None):
+        """Scalar columns only, streamed in chunks."""
+        for attrs in self._read_attrs(chunksize=chunk_size):
+            yield attrs if columns is None else attrs[columns]
+
+    def coords(self, i):
+        """(n, 2) lat/lon array of route i (a view into the mapped file)."""
+        return self._coords[self.coord_offset[i]:self.coord_offset[i + 1]]
+
+    def nodes(self, i):
+        return self._nodes[self.node_offset[i]:self.node_offset[i + 1]]
+
+    def endpoints(self):
+        """(starts, ends): first and last (lat, lon) of every route, shape (num_routes, 2) each."""
+        start, stop = np.asarray(self.coord_offset[:-1]), np.asarray(self.coord_offset[1:])
+        if np.any(stop == start):
+            raise ValueError("route store contains empty routes")
+        return np.asarray(self._coords[start]), np.asarray(self._coords[stop - 1])
+
+    def all_coords(self):
+        """List of every route's coordinate array, split in one call."""
+        return np.split(np.asarray(self._coords), np.asarray(self.coord_offset[1:-1]))
+
+    def all_nodes(self):
+        return np.split(np.asarray(self._nodes), np.asarray(self.node_offset[1:-1]))
+
+    def iter_chunks(self, chunk_size=CHUNK_ROUTES):
+        """Stream (attrs chunk, [coords], [nodes]) without loading the whole store."""
+        start = 0
+        for attrs in self._read_attrs(chunksize=chunk_size):
+            stop = start + len(attrs)
+            co = np.asarray(self.coord_offset[start:stop + 1])
+            no = np.asarray(self.node_offset[start:stop + 1])
+            coords = np.split(np.asarray(self._coords[co[0]:co[-1]]), co[1:-1] - co[0])
+            nodes = np.split(np.asarray(self._nodes[no[0]:no[-1]]), no[1:-1] - no[0])
+            yield attrs.set_index(pd.RangeIndex(start, stop)), coords, nodes
+            start = stop
+
+    def __iter__(self):
+        """(attrs row as dict, coords) per route, streamed chunk by chunk."""
+        for attrs, coords, _ in self.iter_chunks():
+            for row, c in zip(attrs.to_dict("records"), coords):
+                yield row, c
+
+    def to_frame(self, path_column="path"):
+        """attrs plus one column of (n, 2) coordinate arrays."""
+        df = self.attrs.copy()
+        df[path_column] = self.all_coords()
+        return df
+
+
+def write_routes(path, attrs, coords_list, nodes_list=None):
+    with RouteWriter(path) as writer:
+        writer.write_many(attrs, coords_list, nodes_list)
+    return path
+
+
+def parse_literal(text):
+    """ast.literal_eval that also accepts numpy 2 scalar reprs like np.float64(13.04)."""
+    return ast.literal_eval(NUMPY_SCALAR.sub(r"\1", text))
+
+
+def csv_to_store(csv_path, path=None, path_column="path", nodes_column=None):
+    """Convert a CSV with str(list) path columns to a route store (parsed safely, once)."""
+    path = path or os.path.splitext(csv_path)[0] + ".routes"
+    df = pd.read_csv(csv_path)
+    coords = [parse_literal(p) for p in df[path_column]]
+    nodes = [parse_literal(n) for n in df[nodes_column]] if nodes_column else None
+    drop = [path_column] + ([nodes_column] if nodes_column else [])
+    return write_routes(path, df.drop(columns=drop), coords, nodes)
+
+
+def open_routes(path, path_column="path"):
+    """RouteStore for a store directory, or for a legacy CSV (converted next to it on first use)."""
+    if os.path.isdir(path):
+        return RouteStore(path)
+    store = os.path.splitext(path)[0] + ".routes"
+    if not os.path.exists(os.path.join(store, "meta.json")) or \
+            os.path.getmtime(os.path.join(store, "meta.json")) < os.path.getmtime(path):
+        csv_to_store(path, store, path_column)
+    return RouteStore(store)
+
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "routes_with_paths.csv"
+    column = sys.argv[2] if len(sys.argv) > 2 else "path"
+    store = RouteStore(csv_to_store(src, path_column=column))
+    print(f"✅ Converted {src} -> {store.path}: {len(store)} routes, {store.meta['num_coords']} points")
@@ -0,0 +1,60 @@
+import json
+import urllib.error
+import urllib.request
+
+# ---------------- CONFIG ----------------
+SERVICE_URL = "http://127.0.0.1:8502"
+TIMEOUT     = 60
+# ----------------------------------------
+
+
+class RoutingClient:
+    """Talks to routing_service.py; same method names and results as SafePathRouter."""
+
+    def __init__(self, base_url=SERVICE_URL, timeout=TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"routing service error {e.code}: {e.read().decode(errors='replace')}")
+
+    def geocode(self, place):
+        coord = self._request("/geocode", {"place": place})["coords"][place]
+        return tuple(coord) if coord is not None else None
+
+    def geocode_many(self, places):
+        coords = self._request("/geocode", {"places": list(places)})["coords"]
+        return {place: tuple(c) if c is not None else None for place, c in coords.items()}
+
+    def snap(self, lats, lons):
+        return self._request("/snap", {"lat": list(lats), "lon": list(lons)})
+
+    def score(self, features):
+        return self._request("/score", {"features": [list(map(float, f)) for f in features]})["risk"]
+
+    def alternatives(self, source, destination, time_of_travel="Morning", k=3, epoch=None):
+        return self._request("/alternatives", {"source": list(source), "destination": list(destination),
+                                               "time_of_travel": time_of_travel, "k": k, "epoch": epoch})
+
+    def matrix(self, sources, targets=None, time_of_travel="Morning", epoch=None):
+        payload = {"sources": [list(map(float, p)) for p in sources], "time_of_travel": time_of_travel, "epoch": epoch}
+        if targets is not None:
+            payload["targets"] = [list(map(float, p)) for p in targets]
+        return self._request("/matrix", payload)
+
+    def route(self, source, destination, time_of_travel="Morning", epoch=None):
+        return self._request("/route", {"source": list(source), "destination": list(destination),
+                                        "time_of_travel": time_of_travel, "epoch": epoch})
+
+    def stats(self):
+        return self._request("/stats")
+
+    def health(self):
+        return self._request("/health")
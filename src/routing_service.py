@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from route_features import time_map
+from safepath_router import SafePathRouter
+
+# ---------------- CONFIG ----------------
+HOST    = "127.0.0.1"
+PORT    = 8502
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+TIMEOUT = 30   # seconds a single request may take in a worker
+# ----------------------------------------
+
+# One router per worker process: graph, risk and CH arrays are memory-mapped, so
+# the workers share the OS page cache instead of holding private copies.
+_router = None
+
+
+def _init_worker(kwargs):
+    global _router
+    _router = SafePathRouter.load(**kwargs)
+
+
+def _call(method, payload):
+    if method == "route":
+        return _router.route(payload["source"], payload["destination"],
+                             payload.get("time_of_travel", "Morning"), payload.get("epoch"))
+    if method == "alternatives":
+        return _router.alternatives(payload["source"], payload["destination"],
+                                    payload.get("time_of_travel", "Morning"),
+                                    payload.get("k", 3), payload.get("epoch"))
+    if method == "matrix":
+        # One worker per request (pool workers cannot start their own pools)
+        return _router.matrix(payload["sources"], payload.get("targets"),
+                              payload.get("time_of_travel", "Morning"), payload.get("epoch"))
+    if method == "score":
+        return {"risk": _router.score(payload["features"])}
+    if method == "snap":
+        return _router.snap(payload["lat"], payload["lon"])
+    if method == "geocode":
+        places = payload["places"] if "places" in payload else [payload["place"]]
+        return {"coords": {place: _router.geocode(place) for place in dict.fromkeys(places)}}
+    if method == "stats":
+        return dict(_router.stats(), pid=os.getpid())
+    raise KeyError(method)
+
+
+class BadRequest(ValueError):
+    """A payload the service rejects with 400; every other error is the service's own (500)."""
+
+
+def _number(value, name):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise BadRequest(f"{name} must be a number")
+    return value
+
+
+def _point(value, name):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise BadRequest(f"{name} must be a [lat, lon] pair")
+    _number(value[0], name)
+    _number(value[1], name)
+
+
+def _points(value, name):
+    if not isinstance(value, list) or not value:
+        raise BadRequest(f"{name} must be a non-empty list of [lat, lon] pairs")
+    for point in value:
+        _point(point, name)
+
+
+def validate(method, payload):
+    """Check a request's fields before it is sent to a worker (raises BadRequest)."""
+    if not isinstance(payload, dict):
+        raise BadRequest("request body must be a JSON object")
+    required = {"route": ("source", "destination"), "alternatives": ("source", "destination"),
+                "matrix": ("sources",), "score": ("features",), "snap": ("lat", "lon")}.get(method, ())
+    missing = [name for name in required if name not in payload]
+    if missing:
+        raise BadRequest(f"missing field {', '.join(missing)}")
+    if method in ("route", "alternatives", "matrix"):
+        if payload.get("time_of_travel", "Morning") not in time_map:
+            raise BadRequest(f"time_of_travel must be one of {', '.join(time_map)}")
+        epoch = payload.get("epoch")
+        if epoch is not None and (isinstance(epoch, bool) or not isinstance(epoch, int)):
+            raise BadRequest("epoch must be an integer")
+    if method in ("route", "alternatives"):
+        _point(payload["source"], "source")
+        _point(payload["destination"], "destination")
+        k = payload.get("k", 3)
+        if isinstance(k, bool) or not isinstance(k, int) or k < 1:
+            raise BadRequest("k must be a positive integer")
+    elif method == "matrix":
+        _points(payload["sources"], "sources")
+        if payload.get("targets") is not None:
+            _points(payload["targets"], "targets")
+    elif method == "score":
+        rows = payload["features"]
+        if not isinstance(rows, list) or any(not isinstance(row, list) or len(row) != 4 for row in rows):
+            raise BadRequest("features must be a list of [distance_km, congestion, accidents, time] rows")
+        for row in rows:
+            for value in row:
+                _number(value, "features")
+    elif method == "snap":
+        lat, lon = payload["lat"], payload["lon"]
+        lats, lons = (lat, lon) if isinstance(lat, list) else ([lat], [lon])
+        if not isinstance(lons, list) or len(lats) != len(lons):
+            raise BadRequest("lat and lon must be numbers or lists of the same length")
+        for value in lats + lons:
+            _number(value, "lat/lon")
+    elif method == "geocode":
+        places = payload["places"] if "places" in payload else [payload.get("place")]
+        if not isinstance(places, list) or not all(isinstance(place, str) for place in places):
+            raise BadRequest("geocode needs a place string or a list of places")
+
+
+def _traced_call(method, payload):
+    """_call plus the spans it recorded, so the parent process can aggregate them."""
+    with metrics.trace() as t:
+        result = _call(method, payload)
+    return result, t.stages
+
+
+METHODS = {"/route", "/alternatives", "/matrix", "/score", "/snap", "/geocode"}
+
+
+class RoutingHandler(BaseHTTPRequestHandler):
+    """JSON over HTTP; every CPU-bound call runs in the worker pool."""
+
+    pool = None
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method, payload):
+        try:
+            validate(method, payload)
+            with metrics.trace() as t, metrics.span(f"service_{method}"):
+                result, stages = self.pool.submit(_traced_call, method, payload).result(timeout=TIMEOUT)
+                metrics.merge(stages)
+            if metrics.ENABLED and isinstance(result, dict):
+                result["timings_ms"] = t.breakdown()
+            self._send(200, result)
+        except BadRequest as e:
+            self._send(400, {"error": str(e)})
+        except Exception as e:
+            self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            data = metrics.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/stats":
+            self._dispatch("stats", {})
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path not in METHODS:
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send(400, {"error": "request body is not valid JSON"})
+            return
+        self._dispatch(self.path[1:], payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host=HOST, port=PORT, workers=WORKERS, **router_kwargs):
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(router_kwargs,))
+    # Start every worker now so the first requests do not pay the load cost
+    list(pool.map(_call, ["stats"] * workers, [{}] * workers))
+    RoutingHandler.pool = pool
+    server = ThreadingHTTPServer((host, port), RoutingHandler)
+    print(f"✅ SafePath routing service on http://{host}:{port} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless SafePath routing service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--compiled", default="chennai_drive.compiled")
+    parser.add_argument("--graphml", default="chennai_drive.graphml")
+    parser.add_argument("--metrics-file", default=None, help="also append metric snapshots to this rotating file")
+    args = parser.parse_args()
+    if args.metrics_file:
+        metrics.start_file_writer(args.metrics_file)
+    serve(args.host, args.port, args.workers, compiled_path=args.compiled, graphml_path=args.graphml)
@@ -0,0 +1,233 @@
+import threading
+
+import numpy as np
+
+from alternatives import alternative_routes
+from compiled_graph import compiled_dir, graphml_file, load_or_compile
+from edge_risk import accidents_csv, load_edge_risk
+from forest_inference import load_risk_model, model_file, packed_file
+from geocoding import Geocoder, GeocodeCache, cache_file, load_gazetteer
+from metrics import span
+from od_matrix import default_attrs, od_matrix
+from route_cache import RouteCache, route_key
+from route_features import CONGESTION_LABELS, RouteFeatures
+from time_profiles import load_time_profiles
+from traffic import LiveTraffic, current_epoch, simulate_traffic
+
+# Route cache epoch used while live traffic is on: entries then live until a delta touches them
+LIVE_EPOCH = 0
+
+
+def json_matrix(values):
+    """Nested lists for JSON, with unreachable (non-finite) entries as None, i.e. null."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+class SafePathRouter:
+    """Everything the request path needs, loaded once: graph, risk arrays, model, caches.
+
+    All public methods take and return plain JSON-friendly values, so the same
+    object backs the Streamlit app in-process and the HTTP routing service.
+    """
+
+    def __init__(self, graph, edge_risk, model, geocoder=None, route_cache=None, live_traffic=None, profiles=None):
+        self.graph = graph
+        self.edge_risk = edge_risk
+        self.model = model
+        self.profiles = profiles
+        self.features = RouteFeatures(graph, edge_risk, profiles)
+        self.geocoder = geocoder
+        self.route_cache = route_cache if route_cache is not None else RouteCache()
+        self._traffic = {}
+        self._traffic_lock = threading.Lock()
+        self._live_lock = threading.Lock()
+        self.live_traffic = None
+        if live_traffic is not None:
+            self.use_live_traffic(live_traffic)
+
+    @classmethod
+    def load(cls, compiled_path=compiled_dir, graphml_path=graphml_file, accidents_path=accidents_csv,
+             model_path=packed_file, pickle_path=model_file, geocode_cache_path=cache_file):
+        # Compiled CSR arrays are memory-mapped, so every process shares the same pages
+        graph = load_or_compile(graphml_path, compiled_path)
+        graph.spatial_index()
+        # Per-edge accident counts/risk per time bucket (precomputed from the accidents CSV)
+        edge_risk = load_edge_risk(graph, accidents_path)
+        # Travel-time/risk weights per time bucket, so a departure time just selects a row
+        profiles = load_time_profiles(graph, edge_risk)
+        # Packed forest arrays: same predictions as the sklearn model, no sklearn import
+        model = load_risk_model(model_path, pickle_path)
+        gazetteer = load_gazetteer(compiled_path, accidents_path)
+        geocoder = Geocoder(GeocodeCache(geocode_cache_path), gazetteer, user_agent="route_app")
+        return cls(graph, edge_risk, model, geocoder, profiles=profiles)
+
+    def reload_risk(self, accidents_path=accidents_csv):
+        """Pick up edge risk arrays rewritten by accident_ingest.py (and the profiles built on them)."""
+        self.edge_risk = load_edge_risk(self.graph, accidents_path)
+        self.profiles = load_time_profiles(self.graph, self.edge_risk)
+        self.features = RouteFeatures(self.graph, self.edge_risk, self.profiles)
+        self.route_cache.invalidate()
+
+    def geocode(self, place):
+        with span("geocode"):
+            coord = self.geocoder.geocode(place) if self.geocoder is not None else None
+        return tuple(coord) if coord is not None else None
+
+    def snap(self, lats, lons):
+        """Nearest graph node for every point."""
+        nodes, dist = self.graph.spatial_index().nearest_nodes(lats, lons, return_dist=True)
+        return {"nodes": nodes.tolist(),
+                "osm_ids": self.graph.node_id[nodes].tolist(),
+                "lat": self.graph.node_lat[nodes].tolist(),
+                "lon": self.graph.node_lon[nodes].tolist(),
+                "distance_m": dist.tolist()}
+
+    def use_live_traffic(self, live_traffic=None, time_of_travel="Afternoon"):
+        """Route on live congestion from now on (seeded from one simulated scenario if not given)."""
+        if live_traffic is None:
+            live_traffic = LiveTraffic.from_scenario(self.graph, time_of_travel)
+        live_traffic.subscribe(self._traffic_changed)
+        self.live_traffic = live_traffic
+        self.route_cache.invalidate()
+        return live_traffic
+
+    def apply_traffic(self, edge_ids, factors):
+        """Apply sparse congestion deltas (edge id -> factor); only cached routes over those edges are dropped."""
+        if self.live_traffic is None:
+            self.use_live_traffic()
+        return self.live_traffic.apply(edge_ids, factors).tolist()
+
+    def _traffic_changed(self, edge_ids, version):
+        with self._live_lock:
+            self.route_cache.invalidate_edges(edge_ids)
+
+    def traffic(self, time_of_travel, epoch):
+        """(levels, weights) for one traffic epoch, drawn once and reused."""
+        if self.live_traffic is not None:
+            return self.live_traffic.snapshot()[:2]
+        key = (time_of_travel, epoch)
+        with self._traffic_lock:
+            if key not in self._traffic:
+                # Only the current epoch is ever asked for again
+                self._traffic = {k: v for k, v in self._traffic.items() if k[1] >= epoch}
+                self._traffic[key] = simulate_traffic(self.graph, time_of_travel, epoch=epoch)
+            return self._traffic[key]
+
+    def score(self, features):
+        """Risk labels for a batch of [distance_km, congestion, accidents, time] rows."""
+        if not len(features):
+            return []
+        with span("predict"):
+            return [str(label) for label in self.model.predict(features)]
+
+    def search_weights(self, time_of_travel, epoch, traffic=None):
+        """(levels, traffic weights, search weights) for one request; traffic: (levels, weights) to use instead."""
+        # Congestion for this traffic epoch as a weight array; the graph itself is never modified
+        with span("traffic"):
+            levels, traffic_weights = self.traffic(time_of_travel, epoch) if traffic is None else traffic
+
+        # Route on the departure bucket's travel-time/risk profile (or, with live traffic or no
+        # profiles, congested length combined with accident risk), so the search itself finds the
+        # safest route
+        with span("risk_weights"):
+            if self.profiles is not None and traffic is None and self.live_traffic is None:
+                weights = self.profiles.weights(time_of_travel)
+            else:
+                weights = self.edge_risk.weights(traffic_weights, time_of_travel)
+        return levels, traffic_weights, weights
+
+    def describe(self, paths, time_of_travel, levels, traffic_weights):
+        """Route dicts (coords, distance, congestion, accidents, risk) for node-index paths."""
+        routes = []
+        with span("route_features"):
+            # Every feature of every route from the compiled edge arrays in one batch
+            features = self.features.extract(paths, time_of_travel, levels, traffic_weights)
+            offsets = features["edge_offset"]
+            for i, path in enumerate(paths):
+                routes.append({
+                    "nodes": path.tolist(),
+                    "edges": features["edge_ids"][offsets[i]:offsets[i + 1]].tolist(),
+                    "coords": self.graph.path_coords(path),
+                    "distance_km": float(features["distance_km"][i]),
+                    "congested_km": float(features["congested_km"][i]),
+                    "congestion": CONGESTION_LABELS[features["congestion"][i]],
+                    "accidents": int(round(features["accidents"][i])),
+                    "turns": int(features["turns"][i]),
+                })
+                if self.profiles is not None:
+                    routes[-1]["travel_time_min"] = float(features["travel_time_min"][i])
+
+        # Score every route in one vectorized pass
+        for route, risk in zip(routes, self.score(self.features.model_rows(features, time_of_travel))):
+            route["risk"] = risk
+        return routes
+
+    def _compute(self, source_node, dest_node, time_of_travel, epoch, k, traffic=None):
+        levels, traffic_weights, weights = self.search_weights(time_of_travel, epoch, traffic)
+        # Alternatives come from the penalty method (bounded overlap/stretch)
+        with span("alternatives"):
+            paths = alternative_routes(self.graph, source_node, dest_node, k=k, weights=weights)
+        return self.describe(paths, time_of_travel, levels, traffic_weights)
+
+    def alternatives(self, source, destination, time_of_travel="Morning", k=3, epoch=None):
+        """Up to k safe routes between two (lat, lon) points, best first."""
+        with span("snap"):
+            snapped = self.graph.nearest_nodes([source[0], destination[0]], [source[1], destination[1]])
+        source_node, dest_node = int(snapped[0]), int(snapped[1])
+
+        # Repeated queries within one traffic epoch are served from the route cache; with live
+        # traffic, entries stay valid until a delta touches one of their edges
+        live = self.live_traffic
+        if live is not None:
+            epoch = LIVE_EPOCH
+        epoch = current_epoch() if epoch is None else int(epoch)
+        key = route_key(source_node, dest_node, time_of_travel, epoch, k)
+        with span("route_cache"):
+            routes = self.route_cache.get(key)
+        cached = routes is not None
+        version = None
+        if not cached:
+            traffic = None
+            if live is not None:
+                levels, weights, version = live.snapshot()
+                traffic = (levels, weights)
+            routes = self._compute(source_node, dest_node, time_of_travel, epoch, k, traffic)
+            edges = np.concatenate([np.zeros(0, dtype=np.int64)] + [route["edges"] for route in routes])
+            with self._live_lock:
+                # Skip caching if a delta landed mid-computation: its invalidation has already run
+                if live is None or live.version == version:
+                    self.route_cache.put(key, routes, edges=edges)
+        result = {"source_node": source_node, "dest_node": dest_node, "epoch": epoch,
+                  "cached": cached, "routes": routes}
+        if live is not None:
+            result["traffic_version"] = live.version if version is None else version
+        return result
+
+    def matrix(self, sources, targets=None, time_of_travel="Morning", epoch=None, workers=1):
+        """Cost, distance, time and accident matrices between [(lat, lon), ...] points (targets default to sources).
+
+        Every point is snapped in one batch, then one search runs per distinct source node
+        on the same weights as alternatives(); unreachable pairs are None (null in JSON,
+        where inf has no representation).
+        """
+        epoch = current_epoch() if epoch is None else int(epoch)
+        traffic = self.live_traffic.snapshot()[:2] if self.live_traffic is not None else None
+        _, _, weights = self.search_weights(time_of_travel, epoch, traffic)
+        with span("matrix"):
+            result = od_matrix(self.graph, sources, targets, weights,
+                               default_attrs(self.graph, self.edge_risk, self.profiles, time_of_travel), workers)
+        return {"source_nodes": result["source_nodes"].tolist(),
+                "target_nodes": result["target_nodes"].tolist(),
+                "cost": json_matrix(result["cost"]),
+                "distance_km": json_matrix(result["distance_m"] / 1000),
+                "time_min": json_matrix(result["time_s"] / 60),
+                "accidents": json_matrix(result["accidents"])}
+
+    def route(self, source, destination, time_of_travel="Morning", epoch=None):
+        """The single safest route."""
+        return self.alternatives(source, destination, time_of_travel, k=1, epoch=epoch)
+
+    def stats(self):
+        return {"route_cache": self.route_cache.stats(),
+                "num_nodes": self.graph.num_nodes, "num_edges": self.graph.num_edges}
@@ -0,0 +1,41 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+
+def graph_matrix(graph, weights=None, reverse=False):
+    """Wrap the compiled CSR arrays (and a weight array) as a scipy sparse matrix."""
+    weights = graph.edge_length if weights is None else weights
+    n = graph.num_nodes
+    if reverse:
+        return csr_matrix((np.asarray(weights)[graph.rev_edge], graph.edge_source[graph.rev_edge],
+                           graph.rev_offset), shape=(n, n))
+    return csr_matrix((np.asarray(weights), graph.edge_target, graph.edge_offset), shape=(n, n))
+
+
+def shortest_path_tree(graph, source, weights=None, reverse=False, limit=np.inf):
+    """Distances and predecessors from source (or towards it when reverse=True)."""
+    dist, pred = dijkstra(graph_matrix(graph, weights, reverse), directed=True, indices=source,
+                          return_predecessors=True, limit=limit)
+    return dist, pred
+
+
+def path_from_tree(pred, root, node, reverse=False):
+    """Walk a predecessor array back to the root. Returns None if node is unreachable."""
+    if node != root and pred[node] < 0:
+        return None
+    path = [node]
+    while node != root:
+        node = pred[node]
+        path.append(node)
+    if not reverse:
+        path.reverse()
+    return np.array(path, dtype=np.int64)
+
+
+def shortest_path(graph, source, target, weights=None):
+    """(node-index path, cost) from source to target, or (None, inf) if there is none."""
+    dist, pred = shortest_path_tree(graph, source, weights)
+    if not np.isfinite(dist[target]):
+        return None, np.inf
+    return path_from_tree(pred, source, target), float(dist[target])
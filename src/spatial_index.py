@@ -0,0 +1,228 @@
+import json
+import os
+
+import numpy as np
+
+# ---------------- CONFIG ----------------
+CELL_SIZE = 200.0      # grid cell size in meters
+MAX_RING = 16          # widest window (in cells) searched before falling back to brute force
+CHUNK_CELLS = 1 << 20  # max (point, cell) pairs gathered at once
+# ----------------------------------------
+
+M_PER_DEG_LAT = 110540.0
+M_PER_DEG_LON = 111320.0
+
+INDEX_ARRAYS = {
+    "grid_node": np.int32,          # node indices grouped by cell
+    "grid_node_offset": np.int64,   # per cell start into grid_node, len = num_cells + 1
+    "grid_edge": np.int32,          # edge ids grouped by every cell their bbox touches
+    "grid_edge_offset": np.int64,
+}
+
+
+class SpatialIndex:
+    """Uniform grid over node coordinates (and edge bounding boxes) for batched snapping.
+
+    Coordinates are projected to local meters around the graph center, which is
+    accurate to well under a meter at city scale.
+    """
+
+    def __init__(self, graph, arrays, meta):
+        self.graph = graph
+        self.meta = meta
+        for name in INDEX_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.lat0, self.lon0 = meta["lat0"], meta["lon0"]
+        self.kx = M_PER_DEG_LON * np.cos(np.radians(self.lat0))
+        self.cell = meta["cell_size"]
+        self.x0, self.y0 = meta["x0"], meta["y0"]
+        self.ncols, self.nrows = meta["ncols"], meta["nrows"]
+        self.node_x, self.node_y = self.project(graph.node_lat, graph.node_lon)
+        self._edge_segments = None
+
+    def project(self, lats, lons):
+        """(lat, lon) degrees -> local (x, y) meters."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        return (lons - self.lon0) * self.kx, (lats - self.lat0) * M_PER_DEG_LAT
+
+    def unproject(self, x, y):
+        return self.lat0 + np.asarray(y) / M_PER_DEG_LAT, self.lon0 + np.asarray(x) / self.kx
+
+    def _cells(self, x, y):
+        cx = np.clip(((x - self.x0) // self.cell).astype(np.int64), 0, self.ncols - 1)
+        cy = np.clip(((y - self.y0) // self.cell).astype(np.int64), 0, self.nrows - 1)
+        return cx, cy
+
+    def _gather(self, cx, cy, ring, offset):
+        """Candidates in a (2*ring+1)^2 window per point: (point position, slot in grid array)."""
+        d = np.arange(-ring, ring + 1)
+        dx, dy = np.meshgrid(d, d)
+        wx = cx[:, None] + dx.ravel()[None, :]
+        wy = cy[:, None] + dy.ravel()[None, :]
+        valid = (wx >= 0) & (wx < self.ncols) & (wy >= 0) & (wy < self.nrows)
+        cell = np.where(valid, wy * self.ncols + wx, 0)
+        start = offset[cell]
+        count = np.where(valid, offset[cell + 1] - start, 0).ravel()
+        start = start.ravel()
+        total = int(count.sum())
+        owner = np.repeat(np.repeat(np.arange(len(cx)), wx.shape[1]), count)
+        first = np.cumsum(count) - count
+        slot = np.repeat(start - first, count) + np.arange(total)
+        return owner, slot
+
+    def _nearest(self, x, y, offset, items, universe, dist2_fn):
+        """Exact nearest item per point, widening the window only for unresolved points."""
+        m = len(x)
+        best = np.full(m, -1, dtype=np.int64)
+        best_d2 = np.full(m, np.inf)
+        todo = np.arange(m)
+        cx, cy = self._cells(x, y)
+        ring = 1
+        while len(todo) and ring <= MAX_RING:
+            step = max(1, CHUNK_CELLS // (2 * ring + 1) ** 2)
+            for lo in range(0, len(todo), step):
+                chunk = todo[lo:lo + step]
+                owner, slot = self._gather(cx[chunk], cy[chunk], ring, offset)
+                if not len(owner):
+                    continue
+                cand = items[slot].astype(np.int64)
+                d2 = dist2_fn(chunk[owner], cand)
+                order = np.lexsort((d2, owner))
+                owner, cand, d2 = owner[order], cand[order], d2[order]
+                head = np.ones(len(owner), dtype=bool)
+                head[1:] = owner[1:] != owner[:-1]
+                pts = chunk[owner[head]]
+                best[pts], best_d2[pts] = cand[head], d2[head]
+            # Anything outside the window is at least ring * cell away
+            done = best_d2[todo] <= (ring * self.cell) ** 2
+            todo = todo[~done]
+            ring *= 2
+        if len(todo):
+            # Points far outside the graph: brute force over everything
+            universe = np.arange(universe)
+            for p in todo:
+                d2 = dist2_fn(np.full(len(universe), p), universe)
+                best[p] = int(np.argmin(d2))
+                best_d2[p] = d2[best[p]]
+        return best, np.sqrt(best_d2)
+
+    def nearest_nodes(self, lats, lons, return_dist=False):
+        """Nearest node index for every (lat, lon); vectorized over thousands of points."""
+        x, y = self.project(np.atleast_1d(lats), np.atleast_1d(lons))
+
+        def dist2(p, nodes):
+            return (self.node_x[nodes] - x[p]) ** 2 + (self.node_y[nodes] - y[p]) ** 2
+
+        nodes, dist = self._nearest(x, y, self.grid_node_offset, self.grid_node,
+                                    self.graph.num_nodes, dist2)
+        return (nodes, dist) if return_dist else nodes
+
+    def nearest_node(self, lat, lon):
+        return int(self.nearest_nodes([lat], [lon])[0])
+
+    def edges_within(self, lats, lons, radius):
+        """All edges within radius meters of each point: (point positions, edge ids, distances)."""
+        x, y = self.project(np.atleast_1d(lats), np.atleast_1d(lons))
+        cx, cy = self._cells(x, y)
+        ring = int(np.ceil(radius / self.cell))
+        owner, slot = self._gather(cx, cy, ring, self.grid_edge_offset)
+        edges = self.grid_edge[slot].astype(np.int64)
+        # An edge is listed once per cell it touches; keep one copy per point
+        pair = np.unique(owner * self.graph.num_edges + edges)
+        owner, edges = pair // self.graph.num_edges, pair % self.graph.num_edges
+        dist = np.sqrt(self._project_on_edges(x[owner], y[owner], edges)[3])
+        keep = dist <= radius
+        return owner[keep], edges[keep], dist[keep]
+
+    def _segments(self):
+        """Edge start points, direction vectors and squared lengths, built on first use."""
+        if self._edge_segments is None:
+            u, v = self.graph.edge_source, self.graph.edge_target
+            ax, ay = self.node_x[u], self.node_y[u]
+            dx, dy = self.node_x[v] - ax, self.node_y[v] - ay
+            self._edge_segments = (ax, ay, dx, dy, np.maximum(dx * dx + dy * dy, 1e-12))
+        return self._edge_segments
+
+    def _project_on_edges(self, px, py, edges):
+        ax, ay, dx, dy, seg2 = (a[edges] for a in self._segments())
+        t = ((px - ax) * dx + (py - ay) * dy) / seg2
+        t = np.clip(t, 0.0, 1.0)
+        qx, qy = ax + t * dx, ay + t * dy
+        return t, qx, qy, (px - qx) ** 2 + (py - qy) ** 2
+
+    def nearest_edges(self, lats, lons):
+        """Snap points onto the nearest edge (straight segment between its nodes).
+
+        Returns (edge ids, distance in meters, fraction along the edge, snapped lat, snapped lon).
+        """
+        x, y = self.project(np.atleast_1d(lats), np.atleast_1d(lons))
+
+        def dist2(p, edges):
+            return self._project_on_edges(x[p], y[p], edges)[3]
+
+        edges, dist = self._nearest(x, y, self.grid_edge_offset, self.grid_edge,
+                                    self.graph.num_edges, dist2)
+        t, qx, qy, _ = self._project_on_edges(x, y, edges)
+        snap_lat, snap_lon = self.unproject(qx, qy)
+        return edges, dist, t, snap_lat, snap_lon
+
+
+def build_spatial_index(graph, cell_size=CELL_SIZE):
+    lat0 = float((graph.node_lat.min() + graph.node_lat.max()) / 2)
+    lon0 = float((graph.node_lon.min() + graph.node_lon.max()) / 2)
+    kx = M_PER_DEG_LON * np.cos(np.radians(lat0))
+    x = (np.asarray(graph.node_lon) - lon0) * kx
+    y = (np.asarray(graph.node_lat) - lat0) * M_PER_DEG_LAT
+    x0, y0 = float(x.min()), float(y.min())
+    ncols = int((x.max() - x0) // cell_size) + 1
+    nrows = int((y.max() - y0) // cell_size) + 1
+    ncells = ncols * nrows
+
+    cx = ((x - x0) // cell_size).astype(np.int64)
+    cy = ((y - y0) // cell_size).astype(np.int64)
+    node_cell = cy * ncols + cx
+    grid_node = np.argsort(node_cell, kind="stable").astype(np.int32)
+    grid_node_offset = np.zeros(ncells + 1, dtype=np.int64)
+    np.cumsum(np.bincount(node_cell, minlength=ncells), out=grid_node_offset[1:])
+
+    # Every edge is listed in each cell its bounding box touches
+    u, v = graph.edge_source, graph.edge_target
+    x_lo, x_hi = np.minimum(cx[u], cx[v]), np.maximum(cx[u], cx[v])
+    y_lo, y_hi = np.minimum(cy[u], cy[v]), np.maximum(cy[u], cy[v])
+    w, h = x_hi - x_lo + 1, y_hi - y_lo + 1
+    count = w * h
+    edge = np.repeat(np.arange(graph.num_edges), count)
+    k = np.arange(int(count.sum())) - np.repeat(np.cumsum(count) - count, count)
+    edge_cell = (y_lo[edge] + k // w[edge]) * ncols + (x_lo[edge] + k % w[edge])
+    order = np.argsort(edge_cell, kind="stable")
+    grid_edge = edge[order].astype(np.int32)
+    grid_edge_offset = np.zeros(ncells + 1, dtype=np.int64)
+    np.cumsum(np.bincount(edge_cell, minlength=ncells), out=grid_edge_offset[1:])
+
+    meta = {"lat0": lat0, "lon0": lon0, "cell_size": float(cell_size), "x0": x0, "y0": y0,
+            "ncols": ncols, "nrows": nrows}
+    arrays = {"grid_node": grid_node, "grid_node_offset": grid_node_offset,
+              "grid_edge": grid_edge, "grid_edge_offset": grid_edge_offset}
+    return SpatialIndex(graph, arrays, meta)
+
+
+def save_spatial_index(index, path):
+    for name, dtype in INDEX_ARRAYS.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(index, name), dtype=dtype))
+    with open(os.path.join(path, "grid_meta.json"), "w") as f:
+        json.dump(index.meta, f, indent=2)
+
+
+def load_spatial_index(graph):
+    """Index stored next to the compiled graph; built (and saved when possible) if missing."""
+    path = graph.path
+    if path and os.path.exists(os.path.join(path, "grid_meta.json")):
+        with open(os.path.join(path, "grid_meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in INDEX_ARRAYS}
+        return SpatialIndex(graph, arrays, meta)
+    index = build_spatial_index(graph)
+    if path and os.access(path, os.W_OK):
+        save_spatial_index(index, path)
+    return index
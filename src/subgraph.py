@@ -0,0 +1,202 @@
+import itertools
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+from compiled_graph import CompiledGraph, compiled_dir, graphml_file, load_or_compile
+from spatial_index import M_PER_DEG_LAT, M_PER_DEG_LON
+
+# ---------------- CONFIG ----------------
+MAX_EXTRACTS = 32   # recent extracts kept in memory
+# ----------------------------------------
+
+_local_graph = None
+_extracts = OrderedDict()
+_lock = threading.Lock()
+_tokens = weakref.WeakKeyDictionary()   # graph -> token; unlike id(), a token is never reused
+_next_token = itertools.count()
+
+
+def local_graph(path=compiled_dir, graphml_path=graphml_file):
+    """The compiled Chennai graph, opened once per process (memory-mapped)."""
+    global _local_graph
+    if _local_graph is None or _local_graph.path != path:
+        _local_graph = load_or_compile(graphml_path, path)
+    return _local_graph
+
+
+def _nodes_in_box(graph, xmin, ymin, xmax, ymax):
+    """Node indices inside a projected (meters) box, read cell-row by cell-row from the grid."""
+    index = graph.spatial_index()
+    cx0, cy0 = index._cells(np.array([xmin]), np.array([ymin]))
+    cx1, cy1 = index._cells(np.array([xmax]), np.array([ymax]))
+    rows = np.arange(cy0[0], cy1[0] + 1) * index.ncols
+    # Cells of one grid row are contiguous in grid_node, so every row is one slice
+    start = index.grid_node_offset[rows + cx0[0]]
+    stop = index.grid_node_offset[rows + cx1[0] + 1]
+    count = stop - start
+    first = np.cumsum(count) - count
+    slots = np.repeat(start - first, count) + np.arange(int(count.sum()))
+    nodes = np.asarray(index.grid_node[slots], dtype=np.int64)
+    x, y = index.node_x[nodes], index.node_y[nodes]
+    return nodes[(x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)]
+
+
+def nodes_in_bbox(graph, north, south, east, west):
+    index = graph.spatial_index()
+    x, y = index.project([south, north], [west, east])
+    return np.sort(_nodes_in_box(graph, x[0], y[0], x[1], y[1]))
+
+
+def nodes_within(graph, lat, lon, dist):
+    """Nodes within dist meters (straight line) of a point."""
+    index = graph.spatial_index()
+    x, y = index.project(lat, lon)
+    nodes = _nodes_in_box(graph, x - dist, y - dist, x + dist, y + dist)
+    d2 = (index.node_x[nodes] - x) ** 2 + (index.node_y[nodes] - y) ** 2
+    return np.sort(nodes[d2 <= dist * dist])
+
+
+def nodes_in_corridor(graph, coords, width):
+    """Nodes within width meters of a [(lat, lon), ...] polyline, e.g. origin -> destination."""
+    index = graph.spatial_index()
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    px, py = index.project(coords[:, 0], coords[:, 1])
+    if len(px) == 1:
+        return nodes_within(graph, coords[0, 0], coords[0, 1], width)
+    keep = []
+    for ax, ay, bx, by in zip(px[:-1], py[:-1], px[1:], py[1:]):
+        nodes = _nodes_in_box(graph, min(ax, bx) - width, min(ay, by) - width,
+                              max(ax, bx) + width, max(ay, by) + width)
+        dx, dy = bx - ax, by - ay
+        t = ((index.node_x[nodes] - ax) * dx + (index.node_y[nodes] - ay) * dy) / max(dx * dx + dy * dy, 1e-9)
+        t = np.clip(t, 0.0, 1.0)
+        d2 = (index.node_x[nodes] - ax - t * dx) ** 2 + (index.node_y[nodes] - ay - t * dy) ** 2
+        keep.append(nodes[d2 <= width * width])
+    return np.unique(np.concatenate(keep))
+
+
+def _csr_arrays(node_sel, source, target, edge_sel, graph):
+    """CSR arrays of a subgraph from renumbered, (source, target)-sorted edges."""
+    num_nodes = len(node_sel)
+    edge_offset = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=num_nodes), out=edge_offset[1:])
+    rev_offset = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(target, minlength=num_nodes), out=rev_offset[1:])
+    return {
+        "node_id": np.asarray(graph.node_id[node_sel]),
+        "node_lat": np.asarray(graph.node_lat[node_sel]),
+        "node_lon": np.asarray(graph.node_lon[node_sel]),
+        "edge_offset": edge_offset,
+        "edge_source": source.astype(np.int32),
+        "edge_target": target.astype(np.int32),
+        "edge_length": np.asarray(graph.edge_length[edge_sel]),
+        "edge_highway": np.asarray(graph.edge_highway[edge_sel]),
+        "edge_speed_kph": np.asarray(graph.edge_speed_kph[edge_sel]),
+        "edge_travel_time": np.asarray(graph.edge_travel_time[edge_sel]),
+        "rev_offset": rev_offset,
+        "rev_edge": np.lexsort((source, target)).astype(np.int32),
+    }
+
+
+def induced_subgraph(graph, nodes):
+    """CompiledGraph on the given node indices and every edge between them.
+
+    Only the selected rows are read from the (memory-mapped) parent arrays. The
+    result keeps parent_node / parent_edge maps, so per-edge arrays of the parent
+    (risk, traffic weights) can be sliced with weights[sub.parent_edge]. Asking
+    for every node returns the parent graph itself; an empty selection raises
+    ValueError (like osmnx does for an empty area).
+    """
+    nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+    if not len(nodes):
+        raise ValueError("no graph nodes in the requested area")
+    if len(nodes) == graph.num_nodes:
+        return graph
+    new_index = np.full(graph.num_nodes, -1, dtype=np.int64)
+    new_index[nodes] = np.arange(len(nodes))
+
+    # Out-edges of the selected nodes only (CSR rows), then keep those that stay inside
+    start, stop = graph.edge_offset[nodes], graph.edge_offset[nodes + 1]
+    count = stop - start
+    first = np.cumsum(count) - count
+    edges = np.repeat(start - first, count) + np.arange(int(count.sum()))
+    target = new_index[graph.edge_target[edges]]
+    inside = target >= 0
+    edges, target = edges[inside], target[inside]
+    source = new_index[graph.edge_source[edges]]
+
+    # Renumbering is monotone, so edges stay sorted by (source, target)
+    sub = CompiledGraph(_csr_arrays(nodes, source, target, edges, graph), meta=dict(graph.meta))
+    sub.parent_node = nodes
+    sub.parent_edge = edges
+    return sub
+
+
+def bidirectional(graph):
+    """Same graph with every one-way edge also usable backwards (like to_undirected().to_directed())."""
+    source = np.concatenate([graph.edge_source, graph.edge_target]).astype(np.int64)
+    target = np.concatenate([graph.edge_target, graph.edge_source]).astype(np.int64)
+    edges = np.concatenate([np.arange(graph.num_edges)] * 2)
+    # Keep the shortest edge per (source, target), like arrays_from_networkx
+    order = np.lexsort((graph.edge_length[edges], target, source))
+    source, target, edges = source[order], target[order], edges[order]
+    head = np.ones(len(source), dtype=bool)
+    head[1:] = (source[1:] != source[:-1]) | (target[1:] != target[:-1])
+    source, target, edges = source[head], target[head], edges[head]
+    nodes = np.arange(graph.num_nodes)
+    sub = CompiledGraph(_csr_arrays(nodes, source, target, edges, graph), meta=dict(graph.meta))
+    parent_edge = getattr(graph, "parent_edge", None)
+    sub.parent_node = getattr(graph, "parent_node", nodes)
+    sub.parent_edge = edges if parent_edge is None else parent_edge[edges]
+    return sub
+
+
+def _graph_token(graph):
+    """Cache key part for a graph object, valid for as long as the object lives."""
+    with _lock:
+        if graph not in _tokens:
+            _tokens[graph] = next(_next_token)
+        return _tokens[graph]
+
+
+def _cached(key, build):
+    with _lock:
+        if key in _extracts:
+            _extracts.move_to_end(key)
+            return _extracts[key]
+    sub = build()
+    with _lock:
+        _extracts[key] = sub
+        while len(_extracts) > MAX_EXTRACTS:
+            _extracts.popitem(last=False)
+    return sub
+
+
+def graph_from_bbox(north, south, east, west, graph=None):
+    """Offline stand-in for ox.graph_from_bbox: a cached extract of the local graph."""
+    graph = local_graph() if graph is None else graph
+    key = (_graph_token(graph), "bbox", round(north, 6), round(south, 6), round(east, 6), round(west, 6))
+    return _cached(key, lambda: induced_subgraph(graph, nodes_in_bbox(graph, north, south, east, west)))
+
+
+def graph_from_point(center, dist=1000, graph=None, dist_type="bbox"):
+    """Offline stand-in for ox.graph_from_point (dist in meters; dist_type 'bbox' or 'radius')."""
+    graph = local_graph() if graph is None else graph
+    lat, lon = center
+    key = (_graph_token(graph), dist_type, round(lat, 6), round(lon, 6), float(dist))
+    if dist_type == "radius":
+        return _cached(key, lambda: induced_subgraph(graph, nodes_within(graph, lat, lon, dist)))
+    dlat = dist / M_PER_DEG_LAT
+    dlon = dist / (M_PER_DEG_LON * np.cos(np.radians(lat)))
+    return graph_from_bbox(lat + dlat, lat - dlat, lon + dlon, lon - dlon, graph)
+
+
+def graph_from_corridor(coords, width=1000, graph=None):
+    """Extract of every road within width meters of a polyline."""
+    graph = local_graph() if graph is None else graph
+    coords = [tuple(np.round(c, 6)) for c in coords]
+    key = (_graph_token(graph), "corridor", tuple(coords), float(width))
+    return _cached(key, lambda: induced_subgraph(graph, nodes_in_corridor(graph, coords, width)))
@@ -0,0 +1,106 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+from compiled_graph import HIGHWAY_CLASSES, compiled_dir, graph_stamp, load_compiled_graph
+from edge_risk import RISK_WEIGHT, TIME_BUCKETS, load_edge_risk, risk_build_id, save_array
+from traffic import CONGESTION_FACTORS, TIME_PROFILES
+from weight_overlay import frozen
+
+# ---------------- CONFIG ----------------
+# How strongly each road class follows the time-of-day congestion profile (0 = always free flow)
+CLASS_SENSITIVITY = {
+    "motorway": 1.0, "trunk": 1.0, "primary": 1.0, "secondary": 0.9, "tertiary": 0.8,
+    "motorway_link": 0.9, "trunk_link": 0.9, "primary_link": 0.9, "secondary_link": 0.8,
+    "tertiary_link": 0.7, "unclassified": 0.6, "residential": 0.5, "living_street": 0.3,
+    "service": 0.3, "other": 0.5,
+}
+# ----------------------------------------
+
+
+def expected_factor(time_of_travel):
+    """Mean congestion multiplier of a time bucket under its (Low, Medium, High) profile."""
+    probs = np.asarray(TIME_PROFILES[time_of_travel], dtype=np.float64)
+    return float(np.dot(probs / probs.sum(), CONGESTION_FACTORS))
+
+
+def build_time_profiles(graph, edge_risk, safety=RISK_WEIGHT):
+    """Per-bucket routing arrays, shape (len(TIME_BUCKETS), num_edges) float32 each:
+
+      travel_time - free-flow seconds scaled by the bucket's expected congestion for the road class
+      weight      - travel_time * (1 + safety * risk of that bucket), what the search runs on
+    """
+    sensitivity = np.array([CLASS_SENSITIVITY.get(name, 0.5) for name in HIGHWAY_CLASSES], dtype=np.float32)
+    edge_sensitivity = sensitivity[np.asarray(graph.edge_highway)]
+    free_flow = np.asarray(graph.edge_travel_time, dtype=np.float32)
+    travel_time = np.empty((len(TIME_BUCKETS), graph.num_edges), dtype=np.float32)
+    weight = np.empty_like(travel_time)
+    for b, bucket in enumerate(TIME_BUCKETS):
+        travel_time[b] = free_flow * (1 + edge_sensitivity * np.float32(expected_factor(bucket) - 1))
+        weight[b] = edge_risk.weights(travel_time[b], bucket, safety)
+    return travel_time, weight
+
+
+def save_time_profiles(travel_time, weight, graph, path=None, meta=None):
+    """Write the profiles with the graph and the saved risk build they were computed from."""
+    path = graph.path if path is None else path
+    save_array(os.path.join(path, "profile_travel_time.npy"), travel_time.astype(np.float32))
+    save_array(os.path.join(path, "profile_weight.npy"), weight.astype(np.float32))
+    info = {"time_buckets": TIME_BUCKETS, "risk_weight": RISK_WEIGHT, "graph": graph_stamp(graph),
+            "risk_build": risk_build_id(path)}
+    info.update(meta or {})
+    tmp = os.path.join(path, "profile_meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(info, f, indent=2)
+    os.replace(tmp, os.path.join(path, "profile_meta.json"))
+
+
+class TimeProfiles:
+    """Travel-time and routing weights per time bucket; picking a bucket is a row lookup, nothing is copied."""
+
+    def __init__(self, travel_time, weight):
+        self.travel_time = frozen(travel_time)
+        self.weight = frozen(weight)
+
+    def travel_times(self, time_of_travel):
+        return self.travel_time[TIME_BUCKETS.index(time_of_travel)]
+
+    def weights(self, time_of_travel):
+        return self.weight[TIME_BUCKETS.index(time_of_travel)]
+
+    def route_time(self, edge_ids, time_of_travel):
+        """Expected seconds to drive the given edges when departing in that bucket."""
+        return float(self.travel_times(time_of_travel)[edge_ids].sum(dtype=np.float64))
+
+
+def _fresh(graph):
+    """Saved profiles exist and were built for this graph from the risk arrays saved now."""
+    meta_path = os.path.join(graph.path, "profile_meta.json")
+    if not os.path.exists(os.path.join(graph.path, "profile_weight.npy")) or not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta.get("graph") == graph_stamp(graph) and meta.get("risk_build") == risk_build_id(graph.path)
+
+
+def load_time_profiles(graph, edge_risk=None):
+    """Profiles stored with the compiled graph; built from the graph and edge risk if missing or stale."""
+    path = graph.path
+    if path and _fresh(graph):
+        return TimeProfiles(np.load(os.path.join(path, "profile_travel_time.npy"), mmap_mode="r"),
+                            np.load(os.path.join(path, "profile_weight.npy"), mmap_mode="r"))
+    travel_time, weight = build_time_profiles(graph, edge_risk if edge_risk is not None else load_edge_risk(graph))
+    if path and os.access(path, os.W_OK):
+        save_time_profiles(travel_time, weight, graph, path)
+    return TimeProfiles(travel_time, weight)
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else compiled_dir
+    graph = load_compiled_graph(path)
+    travel_time, weight = build_time_profiles(graph, load_edge_risk(graph))
+    save_time_profiles(travel_time, weight, graph, path)
+    print(f"✅ Saved travel-time/weight profiles for {len(TIME_BUCKETS)} time buckets to {path} "
+          f"({travel_time.nbytes * 2 / 2 ** 20:.1f} MB)")
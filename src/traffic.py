@@ -0,0 +1,147 @@
+import threading
+import time
+
+import numpy as np
+
+from weight_overlay import WeightOverlay, frozen
+
+CONGESTION_LEVELS = ["Low", "Medium", "High"]
+CONGESTION_FACTORS = np.array([1.0, 1.5, 2.0], dtype=np.float32)
+
+# Probability of (Low, Medium, High) congestion on an edge for each time of travel
+TIME_PROFILES = {
+    "Morning":   (0.45, 0.35, 0.20),
+    "Afternoon": (0.60, 0.30, 0.10),
+    "Evening":   (0.40, 0.35, 0.25),
+    "Night":     (0.80, 0.15, 0.05),
+}
+
+DEFAULT_SEED = 42
+EPOCH_SECONDS = 300  # a new traffic scenario every 5 minutes
+MIN_FACTOR = 1.0     # live factors never go below free flow, so base-length lower bounds stay valid
+
+
+def current_epoch(now=None, period=EPOCH_SECONDS):
+    """Traffic epoch number; scenarios are stable within one epoch."""
+    return int((time.time() if now is None else now) // period)
+
+
+def draw_congestion(num_edges, time_of_travel="Afternoon", n_scenarios=1, seed=DEFAULT_SEED):
+    """Draw congestion levels (0=Low, 1=Medium, 2=High) for every edge.
+
+    Returns a uint8 array of shape (n_scenarios, num_edges). All scenarios are
+    drawn in one batched call, and the same seed always gives the same traffic.
+    """
+    probs = np.asarray(TIME_PROFILES[time_of_travel], dtype=np.float64)
+    thresholds = np.cumsum(probs)[:-1] / probs.sum()
+    rng = np.random.default_rng(seed)
+    u = rng.random((n_scenarios, num_edges), dtype=np.float32)
+    return np.searchsorted(thresholds, u, side="right").astype(np.uint8)
+
+
+def congestion_factors(levels):
+    """Length multipliers for an array of congestion levels."""
+    return CONGESTION_FACTORS[levels]
+
+
+def factor_levels(factors):
+    """Nearest congestion level (0=Low, 1=Medium, 2=High) for arbitrary length multipliers."""
+    midpoints = (CONGESTION_FACTORS[1:] + CONGESTION_FACTORS[:-1]) / 2
+    return np.searchsorted(midpoints, np.asarray(factors, dtype=np.float32), side="right").astype(np.uint8)
+
+
+def scenario_weights(base_lengths, levels):
+    """Congested weights; base_lengths is never modified."""
+    return np.asarray(base_lengths, dtype=np.float32) * congestion_factors(levels)
+
+
+def route_congestion(edge_ids, levels, base_lengths):
+    """Length-weighted congestion label of a route for a single scenario."""
+    edge_ids = np.asarray(edge_ids, dtype=np.int64)
+    lengths = np.asarray(base_lengths, dtype=np.float64)[edge_ids]
+    if lengths.sum() <= 0:
+        return CONGESTION_LEVELS[0]
+    mean_level = np.average(np.asarray(levels)[edge_ids], weights=lengths)
+    return CONGESTION_LEVELS[int(np.rint(mean_level))]
+
+
+def simulate_traffic(graph, time_of_travel="Afternoon", epoch=None, seed=DEFAULT_SEED):
+    """One scenario for the given epoch: read-only (levels, weights) arrays over graph edges."""
+    epoch = current_epoch() if epoch is None else epoch
+    levels = draw_congestion(graph.num_edges, time_of_travel, 1, seed=(seed, epoch))[0]
+    return frozen(levels), frozen(scenario_weights(graph.edge_length, levels))
+
+
+class LiveTraffic:
+    """Congestion factors fed by a live source and updated by sparse deltas.
+
+    A delta rewrites only its own edges, in a copy of the published arrays that
+    then replaces them (instead of redrawing every edge like simulate_traffic), so
+    a snapshot is one consistent, read-only state that needs no copy. Listeners are
+    called with the ids of the edges whose factor actually changed, so caches
+    can drop just the entries that used them.
+    """
+
+    def __init__(self, base_lengths, factors=None):
+        self.base = frozen(np.asarray(base_lengths, dtype=np.float32))
+        self.factors = np.ones(len(self.base), dtype=np.float32) if factors is None \
+            else np.maximum(np.array(factors, dtype=np.float32), MIN_FACTOR)
+        # Published (levels, weights, version); replaced as a whole, never written in place
+        self._state = (frozen(factor_levels(self.factors)), frozen(self.base * self.factors), 0)
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @classmethod
+    def from_scenario(cls, graph, time_of_travel="Afternoon", epoch=None, seed=DEFAULT_SEED):
+        """Start from one simulated scenario, then follow the live deltas."""
+        levels, _ = simulate_traffic(graph, time_of_travel, epoch, seed)
+        return cls(graph.edge_length, congestion_factors(levels))
+
+    def subscribe(self, callback):
+        """callback(changed_edge_ids, version) after every delta that changed something."""
+        self._listeners.append(callback)
+
+    def apply(self, edge_ids, factors):
+        """Set the factor of each edge (last one wins for repeated ids); returns the changed edge ids."""
+        edge_ids = np.asarray(edge_ids, dtype=np.int64).ravel()
+        factors = np.broadcast_to(np.maximum(np.asarray(factors, dtype=np.float32), MIN_FACTOR), edge_ids.shape)
+        if len(edge_ids) and (edge_ids.min() < 0 or edge_ids.max() >= len(self.base)):
+            raise ValueError("edge id out of range")
+        with self._lock:
+            # Keep only the last update per edge, then only the ones that differ
+            last = len(edge_ids) - 1 - np.unique(edge_ids[::-1], return_index=True)[1]
+            edge_ids, factors = edge_ids[last], factors[last]
+            moved = self.factors[edge_ids] != factors
+            changed, factors = edge_ids[moved], factors[moved]
+            if not len(changed):
+                return changed
+            self.factors[changed] = factors
+            # Copy-on-write: sessions routing on the previous arrays keep a consistent view
+            levels, weights, version = self._state
+            levels = WeightOverlay(levels).set(changed, factor_levels(factors)).freeze()
+            weights = WeightOverlay(weights).set(changed, self.base[changed] * factors).freeze()
+            version += 1
+            self._state = (levels, weights, version)
+        for callback in self._listeners:
+            callback(changed, version)
+        return changed
+
+    def apply_dict(self, deltas):
+        """apply() for a {edge id: factor} mapping."""
+        return self.apply(list(deltas.keys()), list(deltas.values()))
+
+    @property
+    def levels(self):
+        return self._state[0]
+
+    @property
+    def weights(self):
+        return self._state[1]
+
+    @property
+    def version(self):
+        return self._state[2]
+
+    def snapshot(self):
+        """(levels, weights, version) of one consistent state; read-only and shared, so nothing is copied."""
+        return self._state
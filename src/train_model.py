@@ -1,48 +1,242 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-import joblib
 
-# Load the dataset
-df = pd.read_csv("routes_with_paths.csv")
+from forest_inference import export_forest, model_file, packed_file
+from route_features import CONGESTION_LABELS, MODEL_FEATURES, RouteFeatures, congestion_map, time_map
+from route_store import RouteStore
+
+# ---------------- CONFIG ----------------
+routes_file  = "routes_with_paths.csv"
+models_dir   = "models"      # versioned artifacts: models/v0001/{model.pkl, model_forest.npz, report.json}
+CHUNK_ROWS   = 500_000       # dataset rows read per chunk
+TEST_SIZE    = 0.2
+N_ESTIMATORS = 100
+DAILY_TREES  = 20            # trees added per incremental update
+MAX_TREES    = 300           # oldest trees are dropped beyond this, so old days age out
+N_JOBS       = -1            # all cores
+# ----------------------------------------
+
+# Categorical encodings are shared with the router's feature rows (route_features.py)
+FEATURES = MODEL_FEATURES
+TRAFFIC_EPOCH = 0            # simulated traffic scenario used for features computed from paths
+COLUMNS = ["distance_km", "congestion_level", "accidents", "time_of_day"]
+
+
+def risk_labels(accidents, congestion_level):
+    """Risk label from accidents and congestion, for whole columns at once."""
+    accidents = np.asarray(accidents, dtype=np.float64)
+    high = (accidents >= 5) | (np.asarray(congestion_level) == "High")
+    return np.select([high, accidents >= 3], ["High Risk", "Medium Risk"], "Low Risk")
+
+
+def features(chunk):
+    """(X, y) for a DataFrame chunk: float32 feature rows and their labels; unmappable rows are dropped."""
+    X = np.column_stack([
+        chunk["distance_km"].to_numpy(dtype=np.float64),
+        chunk["congestion_level"].map(congestion_map).to_numpy(dtype=np.float64),
+        chunk["accidents"].to_numpy(dtype=np.float64),
+        chunk["time_of_day"].map(time_map).to_numpy(dtype=np.float64),
+    ])
+    ok = np.isfinite(X).all(axis=1)
+    y = risk_labels(X[:, 2], chunk["congestion_level"].to_numpy())
+    return X[ok].astype(np.float32), y[ok]
+
+
+def path_features(extractor, traffic, chunk):
+    """(X, y) for a route store chunk from its node paths, with the router's own extractor.
+
+    Rows are featurized under their time_of_day, or under every time bucket if the
+    store has no such column (one row per route and bucket).
+    """
+    attrs, _, nodes = chunk
+    keep = np.array([len(path) > 0 for path in nodes], dtype=bool)
+    times = attrs["time_of_day"].to_numpy() if "time_of_day" in attrs.columns else None
+    Xs, ys = [], []
+    for time_of_travel in time_map:
+        rows = np.flatnonzero(keep & (times == time_of_travel)) if times is not None else np.flatnonzero(keep)
+        if not len(rows):
+            continue
+        levels, weights = traffic[time_of_travel]
+        extracted = extractor.extract([nodes[i] for i in rows], time_of_travel, levels, weights, osm_ids=True)
+        X = extractor.model_rows(extracted, time_of_travel)
+        Xs.append(X.astype(np.float32))
+        ys.append(risk_labels(X[:, 2], np.asarray(CONGESTION_LABELS)[extracted["congestion"]]))
+    if not Xs:
+        return np.zeros((0, len(FEATURES)), dtype=np.float32), np.zeros(0, dtype=str)
+    return np.vstack(Xs), np.concatenate(ys)
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Scalar columns in chunks from a route store or a CSV; path columns are never parsed."""
+    if os.path.isdir(path):
+        return RouteStore(path).iter_attrs(chunk_rows, COLUMNS)
+    return pd.read_csv(path, usecols=COLUMNS, chunksize=chunk_rows)
 
-# Mapping categorical values
-congestion_map = {"Low": 0, "Medium": 1, "High": 2}
-time_map = {"Morning": 0, "Afternoon": 1, "Evening": 2, "Night": 3}
 
-# Apply mappings
-df["congestion_level_num"] = df["congestion_level"].map(congestion_map)
-df["time_num"] = df["time_of_day"].map(time_map)
+def load_dataset(path, chunk_rows=CHUNK_ROWS, test_size=TEST_SIZE, seed=42, graph=None):
+    """Stream the dataset into compact (X_train, y_train, X_test, y_test) arrays plus timings.
 
-# Define the risk label based on accidents and congestion
-# You can tweak this logic as needed
-def get_risk(row):
-    if row["accidents"] >= 5 or row["congestion_level"] == "High":
-        return "High Risk"
-    elif row["accidents"] >= 3:
-        return "Medium Risk"
+    Each row lands in the test split with probability test_size, drawn per chunk
+    from one seeded generator, so the split is reproducible without holding the
+    raw frame in memory. With a compiled graph, features come from the store's node
+    paths (path_features) instead of its precomputed columns.
+    """
+    if graph is not None:
+        from edge_risk import load_edge_risk
+        from time_profiles import load_time_profiles
+        from traffic import simulate_traffic
+
+        edge_risk = load_edge_risk(graph)
+        extractor = RouteFeatures(graph, edge_risk, load_time_profiles(graph, edge_risk))
+        traffic = {t: simulate_traffic(graph, t, epoch=TRAFFIC_EPOCH) for t in time_map}
+        source = RouteStore(path).iter_chunks(chunk_rows)
+
+        def featurize(chunk):
+            return path_features(extractor, traffic, chunk)
     else:
-        return "Low Risk"
+        source, featurize = read_chunks(path, chunk_rows), features
+    rng = np.random.default_rng(seed)
+    parts = {"train": ([], []), "test": ([], [])}
+    rows, read_s, feature_s = 0, 0.0, 0.0
+    started = time.perf_counter()
+    for chunk in source:
+        read_s += time.perf_counter() - started
+        started = time.perf_counter()
+        X, y = featurize(chunk)
+        test = rng.random(len(X)) < test_size
+        for name, mask in (("train", ~test), ("test", test)):
+            parts[name][0].append(X[mask])
+            parts[name][1].append(y[mask])
+        rows += len(X)
+        feature_s += time.perf_counter() - started
+        started = time.perf_counter()
+    read_s += time.perf_counter() - started
+
+    def stack(name):
+        Xs, ys = parts[name]
+        return (np.vstack(Xs) if Xs else np.zeros((0, len(FEATURES)), dtype=np.float32),
+                np.concatenate(ys) if ys else np.zeros(0, dtype=str))
+
+    (X_train, y_train), (X_test, y_test) = stack("train"), stack("test")
+    return X_train, y_train, X_test, y_test, {"rows": rows, "read_s": read_s, "features_s": feature_s}
+
+
+def default_compiled(data, path):
+    """The router's compiled graph, if data is a route store with node paths it can featurize."""
+    if not os.path.isdir(data) or not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    return path if RouteStore(data).meta["num_nodes"] else None
+
 
-df["risk_label"] = df.apply(get_risk, axis=1)
+def fit(X, y, n_estimators=N_ESTIMATORS, n_jobs=N_JOBS, seed=42):
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=seed, n_jobs=n_jobs)
+    return model.fit(X, y)
 
-# Features and target
-X = df[["distance_km", "congestion_level_num", "accidents", "time_num"]]
-y = df["risk_label"]
 
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def update(model, X, y, n_trees=DAILY_TREES, max_trees=MAX_TREES, n_jobs=N_JOBS, seed=None):
+    """Incremental update: grow n_trees on the new rows only and add them to the forest.
 
-# Model training
-model = RandomForestClassifier(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    Trees beyond max_trees are dropped oldest first, so the forest follows the most
+    recent days. The new rows must cover the model's classes (trees vote over a
+    shared class list). The seed defaults to the number of the version being
+    made, so no two updates grow the same trees (the forest size repeats once
+    max_trees is reached).
+    """
+    seed = int(next_version()[1:]) if seed is None else seed
+    new = fit(X, y, n_trees, n_jobs, seed)
+    if list(new.classes_) != list(model.classes_):
+        raise ValueError(f"update data has classes {list(new.classes_)}, model has {list(model.classes_)}")
+    model.estimators_ = (list(model.estimators_) + list(new.estimators_))[-max_trees:]
+    model.n_estimators = len(model.estimators_)
+    return model
 
-# Evaluation
-y_pred = model.predict(X_test)
-print("Classification Report:\n", classification_report(y_test, y_pred))
 
-# Save the trained model
-joblib.dump(model, "model.pkl")
-print("✅ Model saved as model.pkl")
+def next_version(root=models_dir):
+    versions = [int(name[1:]) for name in os.listdir(root) if name[:1] == "v" and name[1:].isdigit()] \
+        if os.path.isdir(root) else []
+    return f"v{max(versions, default=0) + 1:04d}"
+
+
+def save_artifacts(model, report, root=models_dir, current=(model_file, packed_file)):
+    """Write models/<version>/ and make it the current model.pkl / model_forest.npz."""
+    version = next_version(root)
+    folder = os.path.join(root, version)
+    os.makedirs(folder)
+    joblib.dump(model, os.path.join(folder, "model.pkl"))
+    export_forest(model, os.path.join(folder, "model_forest.npz"))
+    report = dict(report, version=version)
+    with open(os.path.join(folder, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    # Copy then rename, so a router reloading at the same moment never sees half a file
+    for name, target in zip(("model.pkl", "model_forest.npz"), current):
+        shutil.copyfile(os.path.join(folder, name), target + ".tmp")
+        os.replace(target + ".tmp", target)
+    return folder, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train (or incrementally update) the route risk model")
+    parser.add_argument("data", nargs="?", default=routes_file, help="routes CSV or *.routes store")
+    parser.add_argument("--update", action="store_true", help="add trees for this data to the current model.pkl")
+    parser.add_argument("--trees", type=int, default=None, help=f"default {N_ESTIMATORS}, or {DAILY_TREES} with --update")
+    parser.add_argument("--jobs", type=int, default=N_JOBS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--compiled", default=None,
+                        help="compiled graph: compute features from the store's node paths, as the router does "
+                             "(default: the router's graph, when the data is a route store with node paths)")
+    parser.add_argument("--columns", action="store_true",
+                        help="train on the dataset's precomputed columns even if path features are available")
+    args = parser.parse_args()
+
+    from compiled_graph import compiled_dir, load_compiled_graph
+    compiled = None if args.columns else args.compiled or default_compiled(args.data, compiled_dir)
+    graph = load_compiled_graph(compiled) if compiled else None
+    if graph is None:
+        # The router scores features it computes from the route's edges, not these columns
+        print("⚠️ Training on the dataset's precomputed columns; the router computes its features from "
+              "route paths (route_features.py), so predictions may drift from what was evaluated here")
+    X_train, y_train, X_test, y_test, timing = load_dataset(args.data, args.chunk_rows, graph=graph)
+    started = time.perf_counter()
+    if args.update:
+        model = update(joblib.load(model_file), X_train, y_train, args.trees or DAILY_TREES, n_jobs=args.jobs)
+    else:
+        model = fit(X_train, y_train, args.trees or N_ESTIMATORS, args.jobs)
+    timing["fit_s"] = time.perf_counter() - started
+
+    # Evaluation
+    y_pred = model.predict(X_test) if len(X_test) else np.zeros(0, dtype=str)
+    if len(X_test):
+        print("Classification Report:\n", classification_report(y_test, y_pred, zero_division=0))
 
+    report = {
+        "mode": "update" if args.update else "full",
+        "data": os.path.abspath(args.data),
+        "feature_source": "paths" if graph is not None else "columns",
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "features": FEATURES,
+        "classes": [str(c) for c in model.classes_],
+        "n_trees": len(model.estimators_),
+        "train_rows": int(len(X_train)),
+        "test_rows": int(len(X_test)),
+        "accuracy": float(np.mean(y_pred == y_test)) if len(X_test) else None,
+        "timing_s": {k: round(v, 3) for k, v in timing.items() if k.endswith("_s")},
+        "rows_per_s": {
+            "read": round(timing["rows"] / max(timing["read_s"], 1e-9)),
+            "features": round(timing["rows"] / max(timing["features_s"], 1e-9)),
+            "fit": round(len(X_train) / max(timing["fit_s"], 1e-9)),
+        },
+    }
+    folder, report = save_artifacts(model, report)
+    print(f"✅ Model {report['version']} ({report['n_trees']} trees, {report['train_rows']} rows) saved to {folder}")
+    print(f"✅ Current model: {model_file}, packed forest: {packed_file}")
+    print(f"⏱️ read {report['timing_s']['read_s']}s, features {report['timing_s']['features_s']}s, "
+          f"fit {report['timing_s']['fit_s']}s ({report['rows_per_s']['fit']} rows/s)")
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+def frozen(array):
+    """Read-only view of an array (memory-mapped arrays stay memory-mapped); the data is not copied."""
+    view = np.asarray(array).view() if not isinstance(array, np.memmap) else array.view()
+    view.flags.writeable = False
+    return view
+
+
+class WeightOverlay:
+    """Per-request edge weights on top of a shared, read-only base array.
+
+    Reads go straight to the base until the first write, which copies it once
+    (copy-on-write); the base itself is never touched, so any number of requests,
+    threads or processes can share one graph and one set of weight arrays.
+    """
+
+    def __init__(self, base, dtype=None):
+        self.base = frozen(base if dtype is None else np.asarray(base, dtype=dtype))
+        self._own = None
+
+    @property
+    def copied(self):
+        return self._own is not None
+
+    def _writable(self):
+        if self._own is None:
+            self._own = np.array(self.base)
+        return self._own
+
+    def set(self, edge_ids, values):
+        self._writable()[np.asarray(edge_ids, dtype=np.int64)] = values
+        return self
+
+    def multiply(self, edge_ids, factor):
+        edge_ids = np.asarray(edge_ids, dtype=np.int64)
+        own = self._writable()
+        own[edge_ids] = own[edge_ids] * factor
+        return self
+
+    def array(self):
+        """Current weights: the shared base until something was written, this request's copy after."""
+        return self._own if self._own is not None else self.base
+
+    def freeze(self):
+        """Read-only current weights, e.g. to publish as the next shared base."""
+        return frozen(self.array())
@@ -0,0 +1,65 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from accident_ingest import DAY_S, AccidentStore, decay, ingest_files  # noqa: E402
+from benchmark import synthetic_grid  # noqa: E402
+from compiled_graph import arrays_from_networkx, load_compiled_graph, save_compiled_graph  # noqa: E402
+
+
+def make_graph(path):
+    save_compiled_graph(arrays_from_networkx(synthetic_grid(10)), str(path), meta={"source": "grid"})
+    return load_compiled_graph(str(path))
+
+
+def write_accidents(path, graph, stamps):
+    pd.DataFrame({"latitude": [float(graph.node_lat[5])] * len(stamps),
+                  "longitude": [float(graph.node_lon[5])] * len(stamps),
+                  "timestamp": stamps}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_dated_rows_decay_by_their_age(tmp_path):
+    graph = make_graph(tmp_path / "g.compiled")
+    as_of = pd.Timestamp("2026-10-18 12:00").timestamp()
+    csv = write_accidents(tmp_path / "day.csv", graph, ["2026-10-17 12:00", "2026-10-16 12:00"])
+    ingest_files(graph, [csv], as_of=as_of, half_life_days=30)
+
+    expected = decay(DAY_S, 30) + decay(2 * DAY_S, 30)
+    counts = np.load(os.path.join(graph.path, "edge_accidents.npy"))
+    assert np.isclose(counts.sum(), expected, rtol=1e-5)
+    assert 1.9 < counts.sum() < 2.0
+
+
+def test_changed_file_replaces_only_its_own_contribution(tmp_path):
+    graph = make_graph(tmp_path / "g.compiled")
+    as_of = pd.Timestamp("2026-10-18").timestamp()
+    os.makedirs(tmp_path / "a")
+    os.makedirs(tmp_path / "b")
+    a = write_accidents(tmp_path / "a" / "day.csv", graph, ["2026-10-18"] * 3)
+    b = write_accidents(tmp_path / "b" / "day.csv", graph, ["2026-10-18"] * 2)
+    ingest_files(graph, [a, b], as_of=as_of, half_life_days=0)
+    write_accidents(tmp_path / "b" / "day.csv", graph, ["2026-10-18"] * 5)
+    ingest_files(graph, [b], as_of=as_of, half_life_days=0, force=True)
+
+    store = AccidentStore(graph)
+    assert np.isclose(store.counts.sum(), 8)
+
+
+def test_recompiled_graph_starts_a_new_ledger(tmp_path):
+    graph = make_graph(tmp_path / "g.compiled")
+    as_of = pd.Timestamp("2026-10-18").timestamp()
+    csv = write_accidents(tmp_path / "day.csv", graph, ["2026-10-18"] * 3)
+    ingest_files(graph, [csv], as_of=as_of, half_life_days=0)
+
+    graph = make_graph(tmp_path / "g.compiled")
+    assert not AccidentStore(graph).ledger["files"]
+    assert ingest_files(graph, [csv], as_of=as_of, half_life_days=0)[csv] == 3
+    store = AccidentStore(graph)
+    assert store.counts.shape[1] == graph.num_edges
+    assert np.isclose(store.counts.sum(), 3)
+    assert len(os.listdir(os.path.join(graph.path, "accident_parts"))) == 1
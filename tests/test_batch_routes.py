@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import batch_routes  # noqa: E402
+from batch_routes import part_file, run_batch  # noqa: E402
+from benchmark import synthetic_grid  # noqa: E402
+from compiled_graph import arrays_from_networkx, load_compiled_graph, save_compiled_graph  # noqa: E402
+from route_store import RouteStore  # noqa: E402
+
+
+@pytest.fixture
+def batch(tmp_path):
+    compiled = str(tmp_path / "g.compiled")
+    save_compiled_graph(arrays_from_networkx(synthetic_grid(10)), compiled, meta={"source": "grid"})
+    graph = load_compiled_graph(compiled)
+    rng = np.random.default_rng(5)
+    a, b = rng.integers(graph.num_nodes, size=(2, 12))
+    csv = str(tmp_path / "od.csv")
+    pd.DataFrame({"route_id": [f"R{i}" for i in range(12)],
+                  "origin_lat": graph.node_lat[a], "origin_lon": graph.node_lon[a],
+                  "dest_lat": graph.node_lat[b], "dest_lon": graph.node_lon[b]}).to_csv(csv, index=False)
+    return csv, str(tmp_path / "out.routes"), compiled
+
+
+def test_batch_routes_every_pair(batch):
+    csv, out, compiled = batch
+    run_batch(csv, out, compiled, k=2, chunk_size=5, workers=1)
+    store = RouteStore(out)
+    assert set(store.attrs["route_id"].str.split("_").str[0]) == {f"R{i}" for i in range(12)}
+    assert not os.path.exists(out + ".parts")
+
+
+def test_interrupted_batch_resumes_from_its_parts(batch, monkeypatch, capsys):
+    csv, out, compiled = batch
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("interrupted")
+    # Only the merge in this process reads parts back; workers write them with RouteWriter
+    monkeypatch.setattr(batch_routes, "RouteStore", crash)
+    with pytest.raises(RuntimeError):
+        run_batch(csv, out, compiled, k=2, chunk_size=5, workers=1)
+    assert all(os.path.exists(part_file(out + ".parts", i)) for i in range(3))
+    monkeypatch.undo()
+    capsys.readouterr()
+
+    run_batch(csv, out, compiled, k=2, chunk_size=5, workers=1)
+    assert "3 already done" in capsys.readouterr().out
+    assert len(RouteStore(out)) > 0
+
+
+def test_parts_from_other_options_are_not_reused(batch, monkeypatch, capsys):
+    csv, out, compiled = batch
+    monkeypatch.setattr(batch_routes.shutil, "rmtree", lambda *a, **kw: None)
+    run_batch(csv, out, compiled, k=1, chunk_size=5, workers=1)
+    monkeypatch.undo()
+    capsys.readouterr()
+
+    run_batch(csv, out, compiled, k=2, chunk_size=5, workers=1)
+    printed = capsys.readouterr().out
+    assert "starting over" in printed and "0 already done" in printed
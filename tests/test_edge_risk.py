@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from benchmark import synthetic_accidents, synthetic_grid  # noqa: E402
+from compiled_graph import arrays_from_networkx, graph_stamp, load_compiled_graph, save_compiled_graph  # noqa: E402
+from edge_risk import load_edge_risk  # noqa: E402
+
+
+def compile_grid(path, n):
+    save_compiled_graph(arrays_from_networkx(synthetic_grid(n)), str(path), meta={"source": "grid"})
+    return load_compiled_graph(str(path))
+
+
+def test_risk_arrays_are_rebuilt_after_a_recompile(tmp_path):
+    path = tmp_path / "g.compiled"
+    csv = str(tmp_path / "accidents.csv")
+    synthetic_accidents(compile_grid(path, 10)).to_csv(csv, index=False)
+    load_edge_risk(load_compiled_graph(str(path)), csv)
+
+    graph = compile_grid(path, 12)
+    assert load_edge_risk(graph, csv).counts.shape[1] == graph.num_edges
+
+
+def test_same_size_recompile_is_stale_too(tmp_path):
+    path = tmp_path / "g.compiled"
+    csv = str(tmp_path / "accidents.csv")
+    synthetic_accidents(compile_grid(path, 10)).to_csv(csv, index=False)
+    load_edge_risk(load_compiled_graph(str(path)), csv)
+
+    graph = compile_grid(path, 10)
+    load_edge_risk(graph, csv)
+    with open(path / "edge_risk_meta.json") as f:
+        assert json.load(f)["graph"] == graph_stamp(graph)
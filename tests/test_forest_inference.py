@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from forest_inference import PackedForest, export_forest, load_risk_model  # noqa: E402
+
+
+def make_model(seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.uniform(0, 30, 500), rng.integers(0, 3, 500),
+                         rng.integers(0, 10, 500), rng.integers(0, 4, 500)])
+    y = np.select([X[:, 2] >= 5, X[:, 2] >= 3], ["High Risk", "Medium Risk"], "Low Risk")
+    return RandomForestClassifier(n_estimators=15, random_state=seed).fit(X, y), X
+
+
+def test_packed_forest_matches_sklearn(tmp_path):
+    model, X = make_model()
+    forest = PackedForest.load(export_forest(model, str(tmp_path / "forest.npz")))
+    rows = np.vstack([X[:50], [[12.5, 1, 4, 2], [0.0, 0, 0, 0]]])
+    assert np.array_equal(forest.predict_proba(rows), model.predict_proba(rows))
+    assert list(forest.predict(rows)) == list(model.predict(rows))
+    assert list(forest.classes_) == list(model.classes_)
+
+
+def test_risk_model_is_packed_from_the_pickle(tmp_path):
+    import joblib
+
+    model, X = make_model(1)
+    joblib.dump(model, tmp_path / "model.pkl")
+    forest = load_risk_model(str(tmp_path / "forest.npz"), str(tmp_path / "model.pkl"))
+    assert os.path.exists(tmp_path / "forest.npz")
+    assert np.array_equal(forest.predict_proba(X[:20]), model.predict_proba(X[:20]))
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from benchmark import synthetic_grid  # noqa: E402
+from compiled_graph import CompiledGraph  # noqa: E402
+from edge_risk import EdgeRisk, TIME_BUCKETS  # noqa: E402
+from safepath_router import SafePathRouter  # noqa: E402
+
+
+class ConstantModel:
+    def predict(self, X):
+        return np.full(len(X), "Low Risk")
+
+
+def make_router():
+    graph = CompiledGraph.from_networkx(synthetic_grid(20))
+    zeros = np.zeros((len(TIME_BUCKETS), graph.num_edges), dtype=np.float32)
+    return SafePathRouter(graph, EdgeRisk(zeros, zeros), ConstantModel())
+
+
+def test_repeated_live_request_is_cache_hit():
+    router = make_router()
+    g = router.graph
+    source = (float(g.node_lat[0]), float(g.node_lon[0]))
+    dest = (float(g.node_lat[-1]), float(g.node_lon[-1]))
+    # A normal request first moves the cache to the current traffic epoch
+    router.alternatives(source, dest, "Evening")
+    router.use_live_traffic()
+
+    first = router.alternatives(source, dest, "Evening")
+    second = router.alternatives(source, dest, "Evening")
+    assert not first["cached"]
+    assert second["cached"]
+    assert router.route_cache.stats()["hits"] >= 1
+
+
+def test_live_delta_drops_only_touched_routes():
+    router = make_router()
+    g = router.graph
+    source = (float(g.node_lat[0]), float(g.node_lon[0]))
+    dest = (float(g.node_lat[-1]), float(g.node_lon[-1]))
+    router.use_live_traffic()
+    result = router.alternatives(source, dest, "Evening")
+    router.apply_traffic(result["routes"][0]["edges"][:1], 2.0)
+    assert not router.alternatives(source, dest, "Evening")["cached"]
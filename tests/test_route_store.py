@@ -0,0 +1,43 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from route_store import RouteStore, RouteWriter, csv_to_store, write_routes  # noqa: E402
+
+ATTRS = pd.DataFrame({"route_id": ["R1", "R2", "R3"], "distance_km": [1.5, 2.0, 0.7]})
+COORDS = [[(13.0, 80.2), (13.01, 80.21)], [(13.1, 80.3), (13.11, 80.31), (13.12, 80.32)], [(13.2, 80.4)]]
+NODES = [[1, 2], [3, 4, 5], []]
+
+
+def test_routes_round_trip(tmp_path):
+    store = RouteStore(write_routes(str(tmp_path / "r.routes"), ATTRS, COORDS, NODES))
+    assert len(store) == 3
+    pd.testing.assert_frame_equal(store.attrs, ATTRS)
+    for i in range(3):
+        assert np.array_equal(store.coords(i), np.array(COORDS[i]).reshape(-1, 2))
+        assert list(store.nodes(i)) == NODES[i]
+    starts, ends = store.endpoints()
+    assert np.array_equal(starts[1], COORDS[1][0]) and np.array_equal(ends[1], COORDS[1][-1])
+
+
+def test_append_and_chunked_reads(tmp_path):
+    path = str(tmp_path / "r.routes")
+    write_routes(path, ATTRS.iloc[:2], COORDS[:2], NODES[:2])
+    with RouteWriter(path, append=True) as writer:
+        writer.write(ATTRS.iloc[2].to_dict(), COORDS[2], NODES[2])
+    chunks = list(RouteStore(path).iter_chunks(chunk_size=2))
+    assert [len(attrs) for attrs, _, _ in chunks] == [2, 1]
+    assert [len(c) for _, coords, _ in chunks for c in coords] == [2, 3, 1]
+    assert list(chunks[1][0].index) == [2]
+
+
+def test_csv_with_numpy_reprs_converts(tmp_path):
+    csv = tmp_path / "routes.csv"
+    pd.DataFrame({"route_id": ["R1"],
+                  "path": ["[(np.float64(13.0), np.float64(80.2)), (13.01, 80.21)]"]}).to_csv(csv, index=False)
+    store = RouteStore(csv_to_store(str(csv)))
+    assert np.array_equal(store.coords(0), [[13.0, 80.2], [13.01, 80.21]])
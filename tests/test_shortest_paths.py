@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from astar import AStar, build_landmarks  # noqa: E402
+from benchmark import synthetic_grid  # noqa: E402
+from compiled_graph import CompiledGraph  # noqa: E402
+from contraction_hierarchy import ContractionHierarchy  # noqa: E402
+from shortest_path import shortest_path  # noqa: E402
+
+GRAPH = CompiledGraph.from_networkx(synthetic_grid(12))
+PAIRS = np.random.default_rng(3).integers(GRAPH.num_nodes, size=(25, 2))
+
+
+def path_cost(path, weights):
+    return float(np.asarray(weights, dtype=np.float64)[GRAPH.path_edges(path)].sum())
+
+
+def test_contraction_hierarchy_matches_dijkstra():
+    ch = ContractionHierarchy.build(GRAPH)
+    for s, t in PAIRS:
+        expected = shortest_path(GRAPH, s, t)[1]
+        assert np.isclose(ch.distance(s, t), expected)
+        path, cost = ch.path(s, t)
+        if np.isfinite(expected):
+            assert path[0] == s and path[-1] == t
+            assert np.isclose(path_cost(path, GRAPH.edge_length), expected)
+
+
+def test_astar_matches_dijkstra_with_and_without_landmarks():
+    landmarks = {"length": build_landmarks(GRAPH, "length", k=4)[1]}
+    # Risk-like weights: >= length edge by edge, float32 like the router's
+    weights = (GRAPH.edge_length * np.random.default_rng(4).uniform(1, 3, GRAPH.num_edges)).astype(np.float32)
+    for engine in (AStar(GRAPH, {}), AStar(GRAPH, landmarks)):
+        for s, t in PAIRS:
+            for w in (None, weights):
+                expected = shortest_path(GRAPH, s, t, w)[1]
+                path, cost = engine.path(s, t, w)
+                assert np.isclose(cost, expected, rtol=1e-6)
+                if np.isfinite(expected):
+                    assert path[0] == s and path[-1] == t
+                    assert np.isclose(path_cost(path, GRAPH.edge_length if w is None else w), expected, rtol=1e-6)
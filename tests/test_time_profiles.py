@@ -0,0 +1,52 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from benchmark import synthetic_accidents, synthetic_grid  # noqa: E402
+from compiled_graph import arrays_from_networkx, load_compiled_graph, save_compiled_graph  # noqa: E402
+from edge_risk import TIME_BUCKETS, EdgeRisk, build_edge_risk, load_edge_risk, save_edge_risk  # noqa: E402
+from time_profiles import load_time_profiles  # noqa: E402
+
+
+def compile_grid(path, n):
+    save_compiled_graph(arrays_from_networkx(synthetic_grid(n)), str(path), meta={"source": "grid"})
+    return load_compiled_graph(str(path))
+
+
+def test_profiles_follow_a_recompile(tmp_path):
+    path = tmp_path / "g.compiled"
+    csv = str(tmp_path / "accidents.csv")
+    graph = compile_grid(path, 10)
+    synthetic_accidents(graph).to_csv(csv, index=False)
+    load_time_profiles(graph, load_edge_risk(graph, csv))
+
+    graph = compile_grid(path, 12)
+    profiles = load_time_profiles(graph, load_edge_risk(graph, csv))
+    assert profiles.weight.shape == (len(TIME_BUCKETS), graph.num_edges)
+
+
+def test_profiles_without_saved_risk_follow_a_recompile(tmp_path):
+    path = tmp_path / "g.compiled"
+    graph = compile_grid(path, 10)
+    zeros = np.zeros((len(TIME_BUCKETS), graph.num_edges), dtype=np.float32)
+    load_time_profiles(graph, EdgeRisk(zeros, zeros))
+
+    graph = compile_grid(path, 12)
+    zeros = np.zeros((len(TIME_BUCKETS), graph.num_edges), dtype=np.float32)
+    assert load_time_profiles(graph, EdgeRisk(zeros, zeros)).weight.shape[1] == graph.num_edges
+
+
+def test_profiles_follow_a_new_risk_build(tmp_path):
+    graph = compile_grid(tmp_path / "g.compiled", 10)
+    zeros = np.zeros((len(TIME_BUCKETS), graph.num_edges), dtype=np.float32)
+    save_edge_risk(zeros, zeros, graph)
+    before = np.array(load_time_profiles(graph).weight)
+
+    counts, risk = build_edge_risk(graph, synthetic_accidents(graph))
+    save_edge_risk(counts, risk, graph)
+    after = np.array(load_time_profiles(graph).weight)
+    assert (after > before).any()
+    assert np.array_equal(np.array(load_time_profiles(graph).weight), after)